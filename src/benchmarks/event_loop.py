@@ -0,0 +1,141 @@
+"""
+Vergleicht die Event-Loop-Modi aus core.event_loop: Latenz vom Eintreffen eines Ticks am Socket bis zum
+asyncio-Callback bzw. bis zu einem Qt-Slot (wie bei einem Widget-Update) und CPU-Verbrauch im Leerlauf.
+
+Aufruf aus dem Verzeichnis src:
+    python -m benchmarks.event_loop [--ticks 500] [--idle 5]
+
+Jeder Modus läuft in einem eigenen Prozess, da beide Modi globalen Zustand von asyncio bzw. Qt verändern.
+Ein Sender-Thread spielt die Rolle von TWS und schickt Zeitstempel in unregelmäßigen Abständen über TCP.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+
+from core import event_loop
+
+STAMP = struct.Struct("<q")
+
+
+def send_ticks(server, count, spacing):
+    connection, _ = server.accept()
+    with connection:
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        for _ in range(count):
+            time.sleep(random.uniform(0.5, 1.5) * spacing)
+            connection.sendall(STAMP.pack(time.perf_counter_ns()))
+
+
+class TickProtocol(asyncio.Protocol):
+    def __init__(self, latencies, qt_latencies, count, done):
+        self.latencies = latencies
+        self.qt_latencies = qt_latencies
+        self.count = count
+        self.done = done
+        self.buffer = b""
+
+    def data_received(self, data):
+        now = time.perf_counter_ns()
+        self.buffer += data
+        while len(self.buffer) >= STAMP.size:
+            (sent,) = STAMP.unpack_from(self.buffer)
+            self.buffer = self.buffer[STAMP.size:]
+            self.latencies.append((now - sent) / 1e6)
+            # Weitergabe an Qt, wie es ein Widget-Observer tun würde
+            QTimer.singleShot(0, lambda sent=sent: self.on_qt(sent))
+
+    def on_qt(self, sent):
+        self.qt_latencies.append((time.perf_counter_ns() - sent) / 1e6)
+        if len(self.qt_latencies) >= self.count and not self.done.done():
+            self.done.set_result(None)
+
+
+async def measure(loop, ticks, spacing, idle):
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    threading.Thread(target=send_ticks, args=(server, ticks, spacing), daemon=True).start()
+
+    latencies, qt_latencies = [], []
+    done = loop.create_future()
+    transport, _ = await loop.create_connection(
+        lambda: TickProtocol(latencies, qt_latencies, ticks, done), *server.getsockname()
+    )
+    await done
+    transport.close()
+    server.close()
+
+    # Leerlauf: nichts zu tun, gemessen wird nur, wie viel CPU der Loop selbst verbraucht
+    cpu, wall = time.process_time(), time.monotonic()
+    await asyncio.sleep(idle)
+    idle_cpu = (time.process_time() - cpu) / (time.monotonic() - wall) * 100
+
+    result = {'ticks': len(latencies)}
+    for name, samples in (("socket", np.array(latencies)), ("qt", np.array(qt_latencies))):
+        result[f'{name}_ms_avg'] = float(samples.mean())
+        result[f'{name}_ms_p50'] = float(np.percentile(samples, 50))
+        result[f'{name}_ms_p99'] = float(np.percentile(samples, 99))
+        result[f'{name}_ms_max'] = float(samples.max())
+    result['idle_cpu_percent'] = idle_cpu
+    return result
+
+
+def run_mode(mode, ticks, spacing, idle):
+    app = QApplication(sys.argv[:1])
+    loop = event_loop.install(app, mode)
+    result = {}
+
+    async def main():
+        try:
+            result.update(await measure(loop, ticks, spacing, idle))
+        finally:
+            loop.stop()
+
+    loop.call_soon(lambda: asyncio.ensure_future(main()))
+    event_loop.run(loop)
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=event_loop.LOOP_MODES, help="Nur diesen Modus messen (intern)")
+    parser.add_argument("--ticks", type=int, default=500, help="Anzahl der gesendeten Ticks")
+    parser.add_argument("--spacing", type=float, default=0.005, help="Mittlerer Abstand der Ticks in Sekunden")
+    parser.add_argument("--idle", type=float, default=5.0, help="Dauer der Leerlaufmessung in Sekunden")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.ticks, args.spacing, args.idle)
+        return
+
+    results = {}
+    for mode in event_loop.LOOP_MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.event_loop", "--mode", mode, "--ticks", str(args.ticks),
+             "--spacing", str(args.spacing), "--idle", str(args.idle)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    keys = list(results[event_loop.LOOP_MODES[0]])
+    print(f"{'':22}" + "".join(f"{mode:>14}" for mode in results))
+    for key in keys:
+        print(f"{key:22}" + "".join(f"{results[mode][key]:>14.3f}" for mode in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 import asyncio
-from ib_async import util
 
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import  QJsonDocument
+from PySide6.QtCore import  QJsonDocument, QTimer
 
+from core.startup import timeline
 from services.themes.theme_manager import ThemeManager
 from services.settings import Settings
 from services.workspace import WorkspaceSettings
@@ -14,24 +14,31 @@ from services.data_manager import DataManager
 
 class Application(QApplication):
     def __init__(self, argv):
-        super().__init__(argv)
+        with timeline.phase("QApplication"):
+            super().__init__(argv)
+        self.timeline = timeline
 
         # Setze Appzustand auf Startup
         self.setProperty("appState", "Startup")
-        self.theme = Theme()
+        with timeline.phase("Theme (Schriften)"):
+            self.theme = Theme()
 
         # load Settings
-        self.settings = Settings('settings.json')
+        with timeline.phase("Settings"):
+            self.settings = Settings('settings.json')
 
         # selt logger
-        self.logger = Logger()
+        with timeline.phase("Logger"):
+            self.logger = Logger()
 
         # set theme
-        self.theme_manager = ThemeManager()
-        self.theme_manager.setStylesheet()
+        with timeline.phase("ThemeManager (Stylesheet)"):
+            self.theme_manager = ThemeManager()
+            self.theme_manager.setStylesheet()
         
         #self.settings.load_from_file('settings.json')
-        self.data_manager = DataManager()
+        with timeline.phase("DataManager"):
+            self.data_manager = DataManager()
 
         self.is_closing_all = False
         self.aboutToQuit.connect(self.close_app)
@@ -39,17 +46,51 @@ class Application(QApplication):
 
         self.theme.setMode("Production")
 
+    # Dienste des DataManagers, angelegt beim ersten Zugriff
+    @property
+    def bar_store(self):
+        return self.data_manager.service("bar_store")
+
+    @property
+    def tick_recorder(self):
+        return self.data_manager.service("tick_recorder")
+
+    @property
+    def bar_builder(self):
+        return self.data_manager.service("bar_builder")
+
+    @property
+    def conflator(self):
+        return self.data_manager.service("conflator")
+
+    @property
+    def dispatcher(self):
+        return self.data_manager.service("dispatcher")
+
+    @property
+    def warm_start(self):
+        return self.data_manager.service("warm_start")
+
     def startup(self):
         if self.property("appState") == "Production" and self.settings.broker.ib.connect_at_startup:
             #self.broker.connect()
             asyncio.create_task(self.broker.connect())
-        self.settings.workspace.load_workspace()
+        with timeline.phase("Workspace"):
+            self.settings.workspace.load_workspace()
+        # Läuft, sobald Qt die ausstehenden Show- und Paint-Events der Fenster abgearbeitet hat
+        QTimer.singleShot(0, self.startup_finished)
+
+    def startup_finished(self):
+        timeline.mark("Erstes Fenster sichtbar")
+        print(timeline.report())
+        timeline.save()
 
     def close_app(self):
         try:
             self.broker.disconnect()
         except Exception as e:
             print("Fehler beim Disconnect:", e)
+        self.data_manager.shutdown()
         self.settings.workspace.save_workspace()
         self.settings.save_to_file()
-        util.getLoop().stop()
+        asyncio.get_event_loop().stop()
@@ -0,0 +1,40 @@
+import asyncio
+
+# "integrated": asyncio läuft direkt auf dem Qt-Event-Dispatcher (qasync). Sockets werden über QSocketNotifier
+#               überwacht, Timer über QTimer; es gibt kein festes Abfrageintervall und keine Leerlauf-Wakeups.
+# "legacy":     bisheriger Aufbau mit util.patchAsyncio() und util.useQt(), bei dem asyncio alle 10 ms
+#               die Qt-Events abarbeitet.
+LOOP_MODES = ("integrated", "legacy")
+
+
+def install(app, mode="integrated"):
+    """
+    Richtet den gemeinsamen Event-Loop für Qt und asyncio ein.
+    :param app: QApplication-Instanz.
+    :param mode: Einer der LOOP_MODES.
+    :return: Der asyncio Event-Loop.
+    """
+    if mode == "integrated":
+        import qasync
+        loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(loop)
+        return loop
+    if mode == "legacy":
+        from ib_async import util
+        util.patchAsyncio()
+        loop = util.getLoop()
+        try:
+            util.useQt('PySide6', qtContext=app)
+        except TypeError:
+            # ib_async ohne qtContext-Parameter
+            util.useQt('PySide6')
+        return loop
+    raise ValueError(f"Unbekannter Event-Loop-Modus: {mode}")
+
+
+def run(loop):
+    """
+    Führt den Event-Loop aus, bis er gestoppt wird (z. B. in Application.close_app).
+    """
+    loop.run_forever()
+    return 0
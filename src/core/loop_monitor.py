@@ -0,0 +1,49 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LoopLagMonitor:
+    """
+    Misst, wie verspätet der Event-Loop einen Timer ausführt. Die Verspätung ist die Zeit, die ein
+    eingehendes Socket-Paket (z. B. ein Tick von IB) mindestens warten muss, bis es gelesen wird.
+    """
+    def __init__(self, interval=0.1, window=600):
+        """
+        :param interval: Sekunden zwischen zwei Messungen.
+        :param window: Anzahl der Messungen, über die die Kennzahlen gebildet werden.
+        """
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.monotonic() - started - self.interval, 0.0))
+
+    def status(self):
+        """
+        :return: Dictionary mit mittlerer, 99%- und maximaler Verspätung in Sekunden.
+        """
+        if not self.samples:
+            return {'samples': 0, 'avg': 0.0, 'p99': 0.0, 'max': 0.0}
+        samples = np.fromiter(self.samples, dtype=float)
+        return {
+            'samples': len(samples),
+            'avg': float(samples.mean()),
+            'p99': float(np.percentile(samples, 99)),
+            'max': float(samples.max()),
+        }
@@ -0,0 +1,81 @@
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class StartupTimeline:
+    """
+    Zeichnet die Phasen des Programmstarts mit Beginn und Dauer auf.
+    Bezugspunkt ist der Import dieses Moduls, das main.py als Erstes lädt.
+    """
+    def __init__(self, path="data/startup.json", history=50):
+        """
+        :param path: Datei, in der die letzten Starts gespeichert werden.
+        :param history: Anzahl der gespeicherten Starts.
+        """
+        self.path = Path(path)
+        self.history = history
+        self.origin = time.perf_counter()
+        self.phases = []
+        self.marks = {}
+        self._depth = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.origin
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Misst einen Abschnitt des Starts. Phasen dürfen verschachtelt werden.
+        :param name: Bezeichnung der Phase.
+        """
+        entry = {'name': name, 'depth': self._depth, 'start': self.elapsed(), 'duration': None}
+        self.phases.append(entry)
+        self._depth += 1
+        try:
+            yield entry
+        finally:
+            self._depth -= 1
+            entry['duration'] = self.elapsed() - entry['start']
+
+    def mark(self, name):
+        """
+        Hält einen Zeitpunkt fest (z. B. das erste sichtbare Fenster). Nur der erste Aufruf je Name zählt.
+        """
+        self.marks.setdefault(name, self.elapsed())
+
+    def report(self):
+        lines = ["Startzeiten:"]
+        for entry in self.phases:
+            duration = entry['duration'] if entry['duration'] is not None else self.elapsed() - entry['start']
+            label = "  " * entry['depth'] + entry['name']
+            lines.append(f"  {label:<36} {entry['start'] * 1000:8.1f} ms  +{duration * 1000:8.1f} ms")
+        for name, at in self.marks.items():
+            lines.append(f"  {name:<36} {at * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {
+            'time': time.time(),
+            'phases': [dict(entry) for entry in self.phases],
+            'marks': dict(self.marks),
+        }
+
+    def save(self):
+        """
+        Hängt diesen Start an die Datei an, damit sich Starts über mehrere Tage vergleichen lassen.
+        """
+        try:
+            runs = json.loads(self.path.read_text()) if self.path.exists() else []
+        except (OSError, ValueError):
+            runs = []
+        runs = (runs + [self.to_dict()])[-self.history:]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(runs, indent=2))
+        except OSError as e:
+            print(f"Startzeiten konnten nicht gespeichert werden: {e}")
+
+
+timeline = StartupTimeline()
@@ -0,0 +1,282 @@
+import json
+import os
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from database.resampler import resample
+from services.broker.contracts import contract_key
+from services.broker.historical import bar_size_seconds
+
+BAR_SCHEMA = pa.schema([
+    ("time", pa.int64()),  # Beginn der Bar in Epoch-Sekunden (UTC)
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+    ("average", pa.float64()),
+    ("bar_count", pa.int64()),
+])
+
+SECONDS_PER_DAY = 86400
+ROW_GROUP_SIZE = 4096  # Kleine Row Groups, damit Zeitbereiche innerhalb eines Tages übersprungen werden können
+
+
+def live_series(what_to_show):
+    """
+    Datentyp der Serie, in der lokal aus Ticks gebaute Bars gespeichert werden. Sie liegt neben der Serie des Brokers,
+    damit dessen Bars nie durch Live-Bars (ohne average, evtl. mit fehlenden Ticks) überschrieben werden.
+    """
+    return f"{what_to_show}-live"
+
+
+def merge_intervals(intervals):
+    """
+    Fasst überlappende oder aneinandergrenzende Intervalle [start, end) zusammen.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_intervals(start, end, covered):
+    """
+    Liefert die Teilintervalle von [start, end), die nicht in covered enthalten sind.
+    :param covered: Sortierte, zusammengefasste Intervalle.
+    """
+    gaps = []
+    cursor = start
+    for c_start, c_end in covered:
+        if c_end <= cursor:
+            continue
+        if c_start >= end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, c_start))
+        cursor = max(cursor, c_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class BarStore:
+    """
+    Spaltenorientierter Speicher für historische Bars im Parquet-Format.
+    Layout: <root>/<contract>/<barsize>-<what_to_show>[-rth]/<YYYY-MM-DD>.parquet
+    Zu jeder Serie wird in _coverage.json festgehalten, welche Zeiträume bereits vollständig geladen wurden,
+    damit nur fehlende Zeiträume beim Broker angefragt werden müssen.
+    Abfragen überspringen Dateien anhand des Tages im Dateinamen und Row Groups anhand der min/max-Statistik
+    der time-Spalte, sodass nur die tatsächlich benötigten Daten gelesen werden.
+    """
+    COVERAGE_FILE = "_coverage.json"
+
+    def __init__(self, root="data/bars"):
+        self.root = Path(root)
+        self._coverage_cache = {}
+        self._partitions = {}  # Serienpfad -> sortierte Liste der vorhandenen Tage
+        self._row_group_stats = {}  # Dateipfad -> [(min_time, max_time), ...]
+
+    def series_path(self, contract, bar_size, what_to_show="MIDPOINT", use_rth=False):
+        series = f"{bar_size.replace(' ', '_')}-{what_to_show}"
+        if use_rth:
+            series += "-rth"
+        return self.root / contract_key(contract) / series
+
+    # --- Abdeckung ---
+    def coverage(self, contract, bar_size, what_to_show="MIDPOINT", use_rth=False):
+        """
+        Liefert die bereits vollständig gespeicherten Zeiträume einer Serie als Liste von (start, end).
+        """
+        path = self.series_path(contract, bar_size, what_to_show, use_rth)
+        if path not in self._coverage_cache:
+            coverage_file = path / self.COVERAGE_FILE
+            intervals = []
+            if coverage_file.exists():
+                with open(coverage_file, 'r') as f:
+                    intervals = [tuple(i) for i in json.load(f)]
+            self._coverage_cache[path] = merge_intervals(intervals)
+        return self._coverage_cache[path]
+
+    def missing(self, contract, bar_size, start, end, what_to_show="MIDPOINT", use_rth=False):
+        """
+        Liefert die Zeiträume in [start, end), die noch nicht gespeichert sind.
+        """
+        return subtract_intervals(start, end, self.coverage(contract, bar_size, what_to_show, use_rth))
+
+    def _mark_covered(self, path, start, end):
+        intervals = merge_intervals(list(self._coverage_cache.get(path, [])) + [(start, end)])
+        self._coverage_cache[path] = intervals
+        self._atomic_write(path / self.COVERAGE_FILE, lambda tmp: tmp.write_text(json.dumps(intervals)))
+
+    # --- Schreiben ---
+    def write_bars(self, contract, bar_size, columns, start=None, end=None, what_to_show="MIDPOINT", use_rth=False):
+        """
+        Speichert Bars und markiert [start, end) als vollständig geladen.
+        Bereits vorhandene Bars mit gleichem Zeitstempel werden überschrieben.
+        :param columns: Dictionary Spaltenname -> Liste/Array (siehe BAR_SCHEMA).
+        """
+        path = self.series_path(contract, bar_size, what_to_show, use_rth)
+        self.coverage(contract, bar_size, what_to_show, use_rth)  # Cache befüllen
+        table = pa.Table.from_pydict({name: columns[name] for name in BAR_SCHEMA.names}, schema=BAR_SCHEMA)
+        if table.num_rows:
+            days = table["time"].to_numpy() // SECONDS_PER_DAY
+            for day in np.unique(days):
+                self._write_day(path, int(day), table.filter(pa.array(days == day)))
+        if start is not None and end is not None and start < end:
+            self._mark_covered(path, start, end)
+
+    def _write_day(self, path, day, table):
+        day_file = path / self._day_name(day)
+        if day_file.exists():
+            table = pa.concat_tables([pq.read_table(day_file, schema=BAR_SCHEMA), table])
+        times = table["time"].to_numpy()
+        order = np.argsort(times, kind="stable")
+        sorted_times = times[order]
+        # Bei doppelten Zeitstempeln gewinnt die zuletzt geschriebene Bar
+        keep = np.append(sorted_times[1:] != sorted_times[:-1], True)
+        table = table.take(pa.array(order[keep]))
+        self._atomic_write(day_file, lambda tmp: pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE))
+        self._row_group_stats.pop(day_file, None)
+        days = self._list_partitions(path)
+        i = bisect_left(days, day)
+        if i == len(days) or days[i] != day:
+            days.insert(i, day)
+
+    def _atomic_write(self, target, write):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        write(tmp)
+        os.replace(tmp, target)
+
+    @staticmethod
+    def _day_name(day):
+        return np.datetime_as_string(np.datetime64(day, "D")) + ".parquet"
+
+    # --- Lesen ---
+    def _list_partitions(self, path):
+        days = self._partitions.get(path)
+        if days is None:
+            days = []
+            if path.exists():
+                for name in os.listdir(path):
+                    if name.endswith(".parquet"):
+                        days.append(int(np.datetime64(name[:-len(".parquet")], "D").astype(np.int64)))
+            days.sort()
+            self._partitions[path] = days
+        return days
+
+    def _file_stats(self, day_file):
+        """
+        Liefert die min/max-Zeitstempel je Row Group aus den Parquet-Metadaten (gecacht).
+        """
+        stats = self._row_group_stats.get(day_file)
+        if stats is None:
+            metadata = pq.read_metadata(day_file)
+            time_index = metadata.schema.to_arrow_schema().get_field_index("time")
+            stats = []
+            for i in range(metadata.num_row_groups):
+                column = metadata.row_group(i).column(time_index)
+                if column.statistics is not None and column.statistics.has_min_max:
+                    stats.append((column.statistics.min, column.statistics.max))
+                else:
+                    stats.append((None, None))
+            self._row_group_stats[day_file] = stats
+        return stats
+
+    def _scan(self, path, start, end, columns):
+        """
+        Liest die Row Groups aller Dateien, die [start, end) überschneiden können.
+        """
+        days = self._list_partitions(path)
+        first = bisect_left(days, start // SECONDS_PER_DAY)
+        last = bisect_right(days, (end - 1) // SECONDS_PER_DAY)
+        tables = []
+        for day in days[first:last]:
+            day_file = path / self._day_name(day)
+            row_groups = [
+                i for i, (rg_min, rg_max) in enumerate(self._file_stats(day_file))
+                if rg_min is None or (rg_max >= start and rg_min < end)
+            ]
+            if row_groups:
+                tables.append(pq.ParquetFile(day_file).read_row_groups(row_groups, columns=columns))
+        return tables
+
+    def query(self, contract, bar_size, start, end, columns=None, what_to_show="MIDPOINT", use_rth=False):
+        """
+        Liefert die Bars mit start <= time < end spaltenweise als numpy-Arrays.
+        Es werden nur die benötigten Dateien, Row Groups und Spalten gelesen.
+        :param columns: Gewünschte Spalten (z. B. ["close"]); None liefert alle. "time" ist immer enthalten.
+        :return: Dictionary Spaltenname -> numpy-Array.
+        """
+        columns = list(BAR_SCHEMA.names) if columns is None else ["time"] + [c for c in columns if c != "time"]
+        table = self._select(self.series_path(contract, bar_size, what_to_show, use_rth), start, end, columns)
+        return {name: table[name].to_numpy() for name in columns}
+
+    def read_bars(self, contract, bar_size, start, end, what_to_show="MIDPOINT", use_rth=False):
+        """
+        Liest alle gespeicherten Bars mit start <= time < end.
+        :return: pyarrow Table nach BAR_SCHEMA, aufsteigend sortiert.
+        """
+        return self._select(self.series_path(contract, bar_size, what_to_show, use_rth), start, end, BAR_SCHEMA.names)
+
+    def _select(self, path, start, end, columns):
+        tables = self._scan(path, start, end, list(columns))
+        if not tables:
+            return pa.schema([BAR_SCHEMA.field(name) for name in columns]).empty_table()
+        table = pa.concat_tables(tables)
+        times = table["time"].to_numpy()
+        return table.filter(pa.array((times >= start) & (times < end)))
+
+    # --- Abgeleitete Barsizes ---
+    def stored_bar_sizes(self, contract, what_to_show="MIDPOINT", use_rth=False):
+        """
+        Liefert alle Barsizes, für die zu diesem Contract eine Serie gespeichert ist.
+        """
+        directory = self.root / contract_key(contract)
+        if not directory.exists():
+            return []
+        suffix = f"-{what_to_show}" + ("-rth" if use_rth else "")
+        return [name[:-len(suffix)].replace("_", " ") for name in os.listdir(directory) if name.endswith(suffix)]
+
+    def derive(self, contract, bar_size, start, end, what_to_show="MIDPOINT", use_rth=False, utc_offset=0):
+        """
+        Berechnet Bars einer größeren Barsize aus einer feineren Serie, die den Zeitraum vollständig abdeckt,
+        z. B. 1 h aus 1 min. Dadurch ist für einen Wechsel des Zeitrahmens keine Broker-Abfrage nötig.
+        Wochen- und Monatsbars richten sich bei IB nach dem Kalender und werden nicht abgeleitet.
+        :param utc_offset: Versatz der Börsenzeit zu UTC in Sekunden (Raster der Tages- und Stundenbars).
+        :return: pyarrow Table nach BAR_SCHEMA oder None, falls keine passende feinere Serie vorhanden ist.
+        """
+        target = bar_size_seconds(bar_size)
+        if target > SECONDS_PER_DAY:
+            return None
+        # Den ersten Bucket vollständig einbeziehen; die Basis-Serie muss ihn daher ebenfalls abdecken
+        aligned_start = (start + utc_offset) // target * target - utc_offset
+        candidates = []
+        for base_size in self.stored_bar_sizes(contract, what_to_show, use_rth):
+            try:
+                base = bar_size_seconds(base_size)
+            except ValueError:
+                continue
+            if base < target and target % base == 0:
+                candidates.append((base, base_size))
+        # Die gröbste passende Serie zuerst, sie enthält die wenigsten Zeilen
+        for base, base_size in sorted(candidates, reverse=True):
+            if self.missing(contract, base_size, aligned_start, end, what_to_show, use_rth):
+                continue
+            columns = self.query(contract, base_size, aligned_start, end, None, what_to_show, use_rth)
+            if len(columns["time"]) == 0:
+                return BAR_SCHEMA.empty_table()
+            return pa.Table.from_pydict(resample(columns, target, utc_offset=utc_offset), schema=BAR_SCHEMA)
+        return None
@@ -0,0 +1,157 @@
+import math
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+DEFAULT_SESSION_GAP = 3600  # Eine Lücke von mehr als einer Stunde beginnt eine neue Handelssitzung
+
+
+def _bucket_starts(times, interval, session_gap, utc_offset):
+    """
+    Liefert die Indizes, an denen ein neuer Ziel-Bucket beginnt, dessen Zeitstempel sowie den Sitzungsbeginn je Bar.
+    Intraday-Buckets liegen auf dem Uhrzeit-Raster (wie bei IB), überspannen aber nie eine Sitzungsgrenze;
+    der erste Bucket einer Sitzung beginnt mit deren erster Bar. Tages-Buckets fassen alle Sitzungen zusammen,
+    die am selben Kalendertag (in Börsenzeit, utc_offset) beginnen, und tragen wie die Tagesbars des Brokers
+    (siehe to_timestamp) das Handelsdatum um Mitternacht UTC.
+    """
+    new_session = np.empty(len(times), dtype=bool)
+    new_session[0] = True
+    np.greater(np.diff(times), session_gap, out=new_session[1:])
+    session_start = times[new_session][np.cumsum(new_session) - 1]
+
+    starts = np.empty(len(times), dtype=bool)
+    starts[0] = True
+    if interval >= SECONDS_PER_DAY:
+        clock = (session_start + utc_offset) // interval
+        starts[1:] = clock[1:] != clock[:-1]
+    else:
+        clock = (times + utc_offset) // interval
+        starts[1:] = new_session[1:] | (clock[1:] != clock[:-1])
+    index = np.flatnonzero(starts)
+
+    if interval >= SECONDS_PER_DAY:
+        labels = clock[index] * interval
+    else:
+        labels = np.maximum(clock[index] * interval - utc_offset, times[index])
+    return index, labels, session_start
+
+
+def _resample(columns, interval, session_gap, utc_offset):
+    times = np.asarray(columns["time"], dtype=np.int64)
+    index, labels, session_start = _bucket_starts(times, interval, session_gap, utc_offset)
+    last = np.append(index[1:] - 1, len(times) - 1)
+    result = {"time": labels}
+    if "open" in columns:
+        result["open"] = np.asarray(columns["open"])[index]
+    if "high" in columns:
+        result["high"] = np.maximum.reduceat(np.asarray(columns["high"]), index)
+    if "low" in columns:
+        result["low"] = np.minimum.reduceat(np.asarray(columns["low"]), index)
+    if "close" in columns:
+        result["close"] = np.asarray(columns["close"])[last]
+    if "volume" in columns:
+        volume = np.asarray(columns["volume"], dtype=np.float64)
+        result["volume"] = np.add.reduceat(volume, index)
+        if "average" in columns:
+            # Volumengewichteter Durchschnittspreis
+            weighted = np.add.reduceat(np.nan_to_num(np.asarray(columns["average"]) * volume), index)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result["average"] = np.where(result["volume"] > 0, weighted / result["volume"], np.nan)
+    if "bar_count" in columns:
+        result["bar_count"] = np.add.reduceat(np.asarray(columns["bar_count"]), index)
+    return result, session_start
+
+
+def resample(columns, interval, session_gap=DEFAULT_SESSION_GAP, utc_offset=0):
+    """
+    Fasst Bars in einem numpy-Durchlauf zu größeren Bars zusammen (z. B. 1 min -> 1 h).
+    :param columns: Dictionary Spaltenname -> numpy-Array (BAR_SCHEMA), aufsteigend nach time sortiert.
+    :param interval: Ziel-Intervall in Sekunden.
+    :param session_gap: Zeitlücke in Sekunden, ab der eine neue Handelssitzung beginnt.
+    :param utc_offset: Versatz der Börsenzeit zu UTC in Sekunden (für das Tages-/Stundenraster).
+    :return: Dictionary Spaltenname -> numpy-Array.
+    """
+    if len(columns["time"]) == 0:
+        return {name: np.asarray(values)[:0] for name, values in columns.items()}
+    return _resample(columns, interval, session_gap, utc_offset)[0]
+
+
+class IncrementalResampler:
+    """
+    Hält eine resampelte Serie aktuell: Der Bestand wird einmalig vektorisiert berechnet,
+    danach wird jede neue Basis-Bar (z. B. aus dem BarBuilderService) in O(1) in die laufende Ziel-Bar eingerechnet.
+    Buckets und Zeitstempel entsprechen resample().
+    """
+    def __init__(self, interval, session_gap=DEFAULT_SESSION_GAP, utc_offset=0):
+        self.interval = interval
+        self.session_gap = session_gap
+        self.utc_offset = utc_offset
+        self.current = None  # Laufende (noch nicht abgeschlossene) Ziel-Bar
+        self._key = None
+        self._session_start = None
+        self._last_time = None
+        self._weighted = 0.0
+
+    def load(self, columns):
+        """
+        Berechnet die Ziel-Bars aus einer Basis-Serie. Die letzte Ziel-Bar bleibt als laufende Bar offen.
+        :return: Dictionary Spaltenname -> numpy-Array der abgeschlossenen Ziel-Bars.
+        """
+        if len(columns["time"]) == 0:
+            return resample(columns, self.interval)
+        result, session_start = _resample(columns, self.interval, self.session_gap, self.utc_offset)
+        self.current = {name: values[-1].item() for name, values in result.items()}
+        self.current.setdefault("volume", 0.0)
+        self.current.setdefault("average", math.nan)
+        self.current.setdefault("bar_count", 0)
+        self._last_time = int(columns["time"][-1])
+        self._session_start = int(session_start[-1])
+        self._key = self._key_for(self._last_time)
+        average = self.current["average"]
+        self._weighted = 0.0 if math.isnan(average) else average * self.current["volume"]
+        return {name: values[:-1] for name, values in result.items()}
+
+    def _key_for(self, time):
+        if self.interval >= SECONDS_PER_DAY:
+            return (self._session_start + self.utc_offset) // self.interval
+        return self._session_start, (time + self.utc_offset) // self.interval
+
+    def _bucket(self, time):
+        if self._last_time is None or time - self._last_time > self.session_gap:
+            self._session_start = time
+        key = self._key_for(time)
+        if self.interval >= SECONDS_PER_DAY:
+            return key, key * self.interval
+        return key, max(key[1] * self.interval - self.utc_offset, self._session_start)
+
+    def update(self, time, open, high, low, close, volume=0.0, average=math.nan, bar_count=0):
+        """
+        Rechnet eine neue Basis-Bar ein.
+        :return: Die abgeschlossene Ziel-Bar (Dictionary), falls die neue Basis-Bar einen neuen Bucket beginnt, sonst None.
+        """
+        if self._last_time is not None and time <= self._last_time:
+            return None  # Bereits verarbeitet
+        key, label = self._bucket(time)
+        self._last_time = time
+        finished = None
+        if self.current is not None and key == self._key:
+            bar = self.current
+            bar["high"] = max(bar["high"], high)
+            bar["low"] = min(bar["low"], low)
+            bar["close"] = close
+            bar["volume"] += volume
+            bar["bar_count"] += bar_count
+        else:
+            finished = self.current
+            self._key = key
+            self._weighted = 0.0
+            bar = self.current = {
+                "time": label, "open": open, "high": high, "low": low, "close": close,
+                "volume": volume, "average": math.nan, "bar_count": bar_count,
+            }
+        if volume and not math.isnan(average):
+            self._weighted += average * volume
+        if bar["volume"] > 0:
+            bar["average"] = self._weighted / bar["volume"]
+        return finished
+
@@ -0,0 +1,211 @@
+import mmap
+import struct
+import time
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+import numpy as np
+
+from services.broker.contracts import contract_key
+
+# Header: Magic, Recordgröße, Anzahl geschriebener Records
+HEADER = struct.Struct("<8sQQ")
+HEADER_SIZE = 64
+MAGIC = b"MSISTCK1"
+
+# Record: Empfangszeit (ns), bid, ask, last, bidSize, askSize, lastSize, volume
+RECORD = struct.Struct("<qddddddd")
+RECORD_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+    ("last", "<f8"),
+    ("bid_size", "<f8"),
+    ("ask_size", "<f8"),
+    ("last_size", "<f8"),
+    ("volume", "<f8"),
+])
+
+GROW_RECORDS = 65536  # Datei wird in Blöcken von 4 MiB vergrößert
+INDEX_STRIDE = 1024  # Jeder 1024. Record wird in den Zeitindex aufgenommen
+INDEX_ENTRY = struct.Struct("<qq")
+NS_PER_DAY = 86400 * 10**9
+
+
+class TickJournal:
+    """
+    Append-only Tick-Journal für ein Instrument und einen Tag mit festen Records in einer memory-mapped Datei.
+    Ein Tick wird per struct.pack_into direkt in die Map geschrieben, es entstehen keine Python-Objekte pro Tick.
+    Neben der Datei liegt ein kleiner Zeitindex (.idx), über den beim Lesen gezielt gesprungen werden kann.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".idx")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        exists = self.path.exists() and self.path.stat().st_size >= HEADER_SIZE
+        self._file = open(self.path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(HEADER_SIZE + GROW_RECORDS * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        if exists:
+            magic, record_size, self.count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"{self.path} ist kein gültiges Tick-Journal.")
+        else:
+            self.count = 0
+            HEADER.pack_into(self._map, 0, MAGIC, RECORD.size, 0)
+        self.capacity = (len(self._map) - HEADER_SIZE) // RECORD.size
+
+        self._index_times = array("q")
+        self._index_positions = array("q")
+        self._load_index()
+        self._index_file = open(self.index_path, "ab")
+
+    def _load_index(self):
+        if not self.index_path.exists():
+            return
+        data = self.index_path.read_bytes()
+        for ts, position in INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % INDEX_ENTRY.size]):
+            if position < self.count:
+                self._index_times.append(ts)
+                self._index_positions.append(position)
+
+    def _grow(self):
+        self._map.flush()
+        self._map.close()
+        self.capacity += GROW_RECORDS
+        self._file.truncate(HEADER_SIZE + self.capacity * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def append(self, time_ns, bid, ask, last, bid_size, ask_size, last_size, volume):
+        """
+        Hängt einen Tick an das Journal an.
+        """
+        if self.count == self.capacity:
+            self._grow()
+        position = self.count
+        RECORD.pack_into(
+            self._map, HEADER_SIZE + position * RECORD.size,
+            time_ns, bid, ask, last, bid_size, ask_size, last_size, volume
+        )
+        self.count = position + 1
+        # Anzahl zuletzt schreiben, damit nach einem Absturz nur vollständige Records sichtbar sind
+        struct.pack_into("<Q", self._map, 16, self.count)
+        if position % INDEX_STRIDE == 0:
+            self._index_times.append(time_ns)
+            self._index_positions.append(position)
+            self._index_file.write(INDEX_ENTRY.pack(time_ns, position))
+            self._index_file.flush()
+
+    def _records(self):
+        # Sicht auf die Map ohne Kopie; darf nicht über ein append hinaus gehalten werden
+        return np.frombuffer(self._map, dtype=RECORD_DTYPE, count=self.count, offset=HEADER_SIZE)
+
+    def read(self, start_ns=None, end_ns=None):
+        """
+        Liefert eine Kopie aller Ticks mit start_ns <= time < end_ns.
+        Über den Zeitindex wird direkt zum passenden Block gesprungen.
+        """
+        first = 0
+        if start_ns is not None:
+            block = bisect_right(self._index_times, start_ns) - 1
+            if block > 0:
+                first = self._index_positions[block]
+        records = self._records()[first:]
+        times = records["time"]
+        lo = 0 if start_ns is None else np.searchsorted(times, start_ns, side="left")
+        hi = len(records) if end_ns is None else np.searchsorted(times, end_ns, side="left")
+        return records[lo:hi].copy()
+
+    @property
+    def closed(self):
+        return self._map.closed
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self._map.flush()
+        self._map.close()
+        # Ungenutzten vorab reservierten Platz wieder freigeben
+        self._file.truncate(HEADER_SIZE + self.count * RECORD.size)
+        self._file.close()
+        self._index_file.close()
+
+
+class TickRecorder:
+    """
+    Verwaltet die Tick-Journale aller Instrumente.
+    Layout: <root>/<contract>/<YYYY-MM-DD>.ticks (+ .idx)
+    """
+    def __init__(self, root="data/ticks"):
+        self.root = Path(root)
+        self.journals = {}
+        # Tag ("YYYY-MM-DD") der zuletzt geöffneten Journale
+        self.day = None
+
+    def writer(self, contract):
+        """
+        Liefert eine Funktion write(ticker), die einen ib_async Ticker in das Journal des Instruments schreibt.
+        Die Funktion wird einmal pro Abo erzeugt und im Callback pro Tick aufgerufen.
+        """
+        directory = self.root / contract_key(contract)
+        state = {"journal": None, "day_end": 0}
+
+        def write(ticker):
+            now = time.time_ns()
+            journal = state["journal"]
+            if now >= state["day_end"] or journal.closed:
+                journal = state["journal"] = self._open(directory, now)
+                state["day_end"] = (now // NS_PER_DAY + 1) * NS_PER_DAY
+            # Fehlende Werte sind im Ticker bereits NaN
+            journal.append(
+                now, ticker.bid, ticker.ask, ticker.last,
+                ticker.bidSize, ticker.askSize, ticker.lastSize, ticker.volume
+            )
+
+        return write
+
+    def _open(self, directory, time_ns):
+        day = np.datetime_as_string(np.datetime64(time_ns // NS_PER_DAY, "D"))
+        if self.day is None or day > self.day:
+            self.day = day
+            self._close_before(day)
+        path = directory / f"{day}.ticks"
+        journal = self.journals.get(path)
+        if journal is None:
+            journal = self.journals[path] = TickJournal(path)
+        return journal
+
+    def _close_before(self, day):
+        """
+        Schließt beim Tageswechsel die Journale der Vortage, damit Maps und Dateihandles nicht
+        über die gesamte Laufzeit offen bleiben.
+        """
+        for path in [path for path in self.journals if path.stem < day]:
+            self.journals.pop(path).close()
+
+    def read(self, contract, day, start_ns=None, end_ns=None):
+        """
+        Liest die Ticks eines Instruments für einen Tag ("YYYY-MM-DD").
+        """
+        path = self.root / contract_key(contract) / f"{day}.ticks"
+        journal = self.journals.get(path)
+        if journal is not None:
+            return journal.read(start_ns, end_ns)
+        if not path.exists():
+            return np.empty(0, dtype=RECORD_DTYPE)
+        journal = TickJournal(path)
+        try:
+            return journal.read(start_ns, end_ns)
+        finally:
+            journal.close()
+
+    def close(self):
+        for journal in self.journals.values():
+            journal.close()
+        self.journals.clear()
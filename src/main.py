@@ -1,14 +1,16 @@
 import sys
-import asyncio
-from ib_async import IB, util
-from PySide6.QtCore import QTimer
-from core.application import Application
 
 if __name__ == "__main__":
-    util.patchAsyncio()
+    # Alle Importe erst hier: Der Broker-Prozess ("spawn") lädt dieses Modul erneut als __mp_main__
+    # und darf dabei weder Qt noch die GUI-Module importieren.
+    from core.startup import timeline
+
+    with timeline.phase("Imports"):
+        from core import event_loop
+        from core.application import Application
+
     app = Application(sys.argv)
-    util.useQt('PySide6', qtContext=app)
-    loop = asyncio.get_event_loop()
+    with timeline.phase("Event-Loop"):
+        loop = event_loop.install(app)
     loop.call_soon(app.startup)
-    sys.exit(IB.run())
-
+    sys.exit(event_loop.run(loop))
@@ -1,9 +1,10 @@
 from PySide6.QtCore import Signal
 
-from services.broker.ib.ib import IbSettings
-from services.broker.simulator.simulator import SimulatorSettings
+from services.broker.ib.ib_settings import IbSettings
+from services.broker.simulator.simulator_settings import SimulatorSettings
+from services.persistence import TrackedSettings
 
-class BrokerSettings:
+class BrokerSettings(TrackedSettings):
     broker_settings_updated = Signal(dict)
     def __init__(self):
         self.selected_broker = None
@@ -0,0 +1,56 @@
+import re
+
+# Felder, die einen Contract beschreiben. Bewusst ohne conId, localSymbol etc.,
+# damit ein qualifizierter und ein unqualifizierter Contract denselben Schlüssel erhalten.
+CONTRACT_KEY_FIELDS = (
+    "secType",
+    "symbol",
+    "lastTradeDateOrContractMonth",
+    "strike",
+    "right",
+    "exchange",
+    "currency",
+)
+
+
+def normalize_contract(contract):
+    """
+    Liefert ein hashbares Tupel, das einen Contract unabhängig von der Objektidentität beschreibt.
+    Funktioniert mit ib_async Contracts, Dictionaries (Simulator) und einfachen Strings.
+    :param contract: Contract, Dictionary oder Symbol.
+    :return: Tupel aus (Feldname, Wert)-Paaren.
+    """
+    if isinstance(contract, str):
+        return (("symbol", contract.upper()),)
+    if isinstance(contract, dict):
+        get = contract.get
+    else:
+        get = lambda name, default=None: getattr(contract, name, default)
+
+    key = []
+    for field in CONTRACT_KEY_FIELDS:
+        value = get(field, None)
+        if value in (None, "", 0, 0.0):
+            continue
+        if isinstance(value, str):
+            value = value.upper()
+        elif isinstance(value, float):
+            value = round(value, 6)
+        key.append((field, value))
+    if not key and get("conId", 0):
+        # Nur eine conId bekannt (z. B. aus Positionsdaten)
+        key.append(("conId", int(get("conId"))))
+    return tuple(key)
+
+
+def contract_key(contract):
+    """
+    Liefert einen dateisystemtauglichen Schlüssel für einen Contract, z. B. "STK_AAPL_SMART_USD".
+    :param contract: Contract, Dictionary oder Symbol.
+    :return: String-Schlüssel.
+    """
+    parts = [str(value) for _, value in normalize_contract(contract)]
+    if not parts:
+        raise ValueError(f"Contract {contract!r} enthält keine identifizierenden Felder.")
+    key = "_".join(parts)
+    return re.sub(r"[^A-Za-z0-9.\-]+", "-", key)
@@ -0,0 +1,231 @@
+import datetime
+import math
+import re
+import time
+import zoneinfo
+
+# Sekunden pro Einheit der IB-Durations ("S", "D", "W", "M", "Y").
+# Monate und Jahre werden großzügig abgerundet nach oben, damit das angefragte Fenster vollständig abgedeckt ist.
+DURATION_UNITS = {
+    "S": 1,
+    "D": 86400,
+    "W": 7 * 86400,
+    "M": 31 * 86400,
+    "Y": 366 * 86400,
+}
+
+# Sekunden pro Einheit der IB-Barsizes ("1 min", "5 secs", "1 hour", ...).
+BAR_SIZE_UNITS = {
+    "sec": 1,
+    "secs": 1,
+    "min": 60,
+    "mins": 60,
+    "hour": 3600,
+    "hours": 3600,
+    "day": 86400,
+    "days": 86400,
+    "week": 7 * 86400,
+    "weeks": 7 * 86400,
+    "month": 30 * 86400,
+    "months": 30 * 86400,
+}
+
+BAR_COLUMNS = ("time", "open", "high", "low", "close", "volume", "average", "bar_count")
+
+
+def duration_seconds(duration_str):
+    """
+    Wandelt einen IB-Duration-String (z. B. "50 D", "3600 S", "1 Y") in Sekunden um.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([SDWMY])\s*", duration_str.upper())
+    if not match:
+        raise ValueError(f"Ungültige Duration: {duration_str!r}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def format_duration(seconds):
+    """
+    Bildet eine Sekundenanzahl auf den kleinsten IB-Duration-String ab, der sie vollständig abdeckt.
+    IB akzeptiert "S" nur bis zu einem Tag und "D" nur bis zu einem Jahr.
+    """
+    seconds = max(int(math.ceil(seconds)), 1)
+    if seconds <= 86400:
+        return f"{seconds} S"
+    days = math.ceil(seconds / 86400)
+    if days <= 365:
+        return f"{days} D"
+    return f"{math.ceil(days / 365)} Y"
+
+
+def bar_size_seconds(bar_size):
+    """
+    Wandelt eine IB-Barsize (z. B. "1 min", "5 secs", "1 day") in Sekunden um.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([a-z]+)\s*", bar_size.lower())
+    if not match or match.group(2) not in BAR_SIZE_UNITS:
+        raise ValueError(f"Ungültige Barsize: {bar_size!r}")
+    return int(match.group(1)) * BAR_SIZE_UNITS[match.group(2)]
+
+
+def format_bar_size(seconds):
+    """
+    Wandelt ein Intervall in Sekunden in eine IB-Barsize um (z. B. 5 -> "5 secs", 60 -> "1 min").
+    """
+    for unit, name in ((86400, "day"), (3600, "hour"), (60, "min"), (1, "sec")):
+        if seconds % unit == 0:
+            count = seconds // unit
+            if name == "sec":
+                return f"{count} secs"
+            return f"{count} {name}" if count == 1 else f"{count} {name}s"
+
+
+def to_timestamp(value):
+    """
+    Wandelt datetime, date oder Epoch-Sekunden in Epoch-Sekunden (UTC) um.
+    Naive datetimes werden wie bisher als lokale Zeit interpretiert.
+    """
+    if isinstance(value, datetime.datetime):
+        return int(value.timestamp())
+    if isinstance(value, datetime.date):
+        return int(datetime.datetime(value.year, value.month, value.day, tzinfo=datetime.timezone.utc).timestamp())
+    return int(value)
+
+
+def utc_offset(time_zone, timestamp):
+    """
+    Versatz einer Zeitzone zu UTC in Sekunden zum angegebenen Zeitpunkt.
+    :param time_zone: Name der Zeitzone, z. B. timeZoneId aus den Contract Details ("US/Eastern").
+    :return: Versatz in Sekunden, 0 für unbekannte Zeitzonen.
+    """
+    try:
+        zone = zoneinfo.ZoneInfo(time_zone)
+    except (KeyError, ValueError, TypeError):
+        return 0
+    return int(datetime.datetime.fromtimestamp(timestamp, tz=zone).utcoffset().total_seconds())
+
+
+def completed_until(end, bar_size):
+    """
+    Begrenzt end auf den Beginn der laufenden Bar, damit eine noch unvollständige Bar nicht als gespeichert gilt.
+    """
+    step = bar_size_seconds(bar_size)
+    return min(end, int(time.time()) // step * step)
+
+
+class HistoricalBars(list):
+    """
+    Ergebnis einer historischen Abfrage, das mit dem Kennzeichen complete über Prozessgrenzen übertragen werden kann
+    (ib_async liefert eine BarDataList, die als einfache Liste im GUI-Prozess ankommt).
+    """
+    def __init__(self, bars, complete):
+        super().__init__(bars)
+        self.complete = complete
+
+
+def is_complete(bars):
+    """
+    True, wenn eine Abfrage den angefragten Zeitraum nachweislich vollständig geliefert hat.
+    Der Broker kennzeichnet fehlgeschlagene oder abgebrochene Abfragen mit complete = False;
+    nur vollständige Abfragen dürfen im Datastore als abgedeckt markiert werden.
+    """
+    return bars is not None and getattr(bars, "complete", True)
+
+
+def bars_to_columns(bars):
+    """
+    Wandelt eine Liste von Bars (ib_async BarData oder Dictionaries) in spaltenweise Listen um.
+    :return: Dictionary Spaltenname -> Liste.
+    """
+    columns = {name: [] for name in BAR_COLUMNS}
+    for bar in bars:
+        if isinstance(bar, dict):
+            get = bar.get
+        else:
+            get = lambda name, default=None: getattr(bar, name, default)
+        columns["time"].append(to_timestamp(get("date")))
+        columns["open"].append(float(get("open", math.nan)))
+        columns["high"].append(float(get("high", math.nan)))
+        columns["low"].append(float(get("low", math.nan)))
+        columns["close"].append(float(get("close", math.nan)))
+        columns["volume"].append(float(get("volume", 0) or 0))
+        columns["average"].append(float(get("average", math.nan) or math.nan))
+        columns["bar_count"].append(int(get("barCount", 0) or 0))
+    return columns
+
+
+def table_to_rows(table, bar_size):
+    """
+    Wandelt eine Bar-Tabelle aus dem Datastore in Dictionaries im Format von ib_async BarData um.
+    Tages- und größere Bars erhalten ein date, Intraday-Bars ein datetime in UTC.
+    """
+    daily = bar_size_seconds(bar_size) >= 86400
+    data = table.to_pydict()
+    rows = []
+    for i, ts in enumerate(data["time"]):
+        date = datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc)
+        rows.append({
+            "date": date.date() if daily else date,
+            "open": data["open"][i],
+            "high": data["high"][i],
+            "low": data["low"][i],
+            "close": data["close"][i],
+            "volume": data["volume"][i],
+            "average": data["average"][i],
+            "barCount": data["bar_count"][i],
+        })
+    return rows
+
+
+async def derive_bars(store, instrument, bar_size, start, end, what_to_show, use_rth, exchange_offset):
+    """
+    Berechnet größere Barsizes möglichst lokal aus feineren gespeicherten Bars (BarStore.derive), im Raster
+    der Börsenzeit. Alle Broker leiten so für denselben Contract dieselben Tages- und Stundenbars ab.
+    :param exchange_offset: Coroutine exchange_offset(instrument, timestamp) -> Versatz der Börsenzeit zu UTC in Sekunden.
+    :return: pyarrow Table oder None, falls keine passende feinere Serie vorhanden ist.
+    """
+    offset = await exchange_offset(instrument, end)
+    return store.derive(instrument, bar_size, start, end, what_to_show, use_rth, utc_offset=offset)
+
+
+async def read_through(store, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth, fetch,
+                       exchange_offset):
+    """
+    Liest historische Bars über den Datastore: Nur fehlende Zeiträume werden über fetch beim Broker
+    angefragt und anschließend gespeichert, der Rest kommt direkt von der Platte.
+    :param store: BarStore.
+    :param fetch: Coroutine fetch(instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth) -> Bars oder None.
+    :param exchange_offset: Coroutine für den Versatz der Börsenzeit (siehe derive_bars).
+    :return: pyarrow Table mit den Bars im angefragten Fenster oder None bei Fehlern.
+    """
+    end = to_timestamp(end_datetime)
+    start = end - duration_seconds(duration_str)
+    gaps = store.missing(instrument, bar_size, start, end, what_to_show, use_rth)
+    if gaps:
+        table = await derive_bars(store, instrument, bar_size, start, end, what_to_show, use_rth, exchange_offset)
+        if table is not None:
+            return table
+        # Jede Lücke einzeln laden, damit dazwischen gespeicherte Zeiträume nicht erneut angefragt werden
+        loaded = 0
+        for gap_start, gap_end in gaps:
+            bars = await fetch(
+                instrument,
+                datetime.datetime.fromtimestamp(gap_end, tz=datetime.timezone.utc),
+                format_duration(gap_end - gap_start),
+                bar_size,
+                what_to_show,
+                use_rth,
+            )
+            if bars is None:
+                continue
+            if is_complete(bars):
+                store.write_bars(
+                    instrument, bar_size, bars_to_columns(bars), gap_start, completed_until(gap_end, bar_size),
+                    what_to_show, use_rth
+                )
+                loaded += 1
+            else:
+                # Teilergebnis speichern, die Lücke bleibt offen und wird beim nächsten Aufruf erneut angefragt
+                store.write_bars(instrument, bar_size, bars_to_columns(bars), None, None, what_to_show, use_rth)
+        if not loaded:
+            return None
+    return store.read_bars(instrument, bar_size, start, end, what_to_show, use_rth)
@@ -0,0 +1,120 @@
+import asyncio
+import datetime
+
+from services.broker.historical import bar_size_seconds, bars_to_columns, completed_until, format_duration, is_complete
+from services.broker.ib.request_scheduler import RequestLane
+
+DAY = 86400
+
+# Maximale Dauer einer einzelnen reqHistoricalData-Abfrage je Barsize (in Sekunden der Barsize -> Sekunden),
+# angelehnt an die Limits aus der IB-Dokumentation ("Valid Duration and Bar Size Settings").
+MAX_REQUEST_SECONDS = (
+    (1, 1800),
+    (5, 7200),
+    (15, 14400),
+    (30, 28800),
+    (60, DAY),
+    (120, 2 * DAY),
+    (300, 7 * DAY),
+    (3600, 30 * DAY),
+    (DAY, 365 * DAY),
+)
+
+
+def max_request_seconds(bar_size):
+    """
+    Liefert die maximale Dauer, die IB für eine Abfrage mit dieser Barsize akzeptiert.
+    """
+    step = bar_size_seconds(bar_size)
+    for max_step, seconds in MAX_REQUEST_SECONDS:
+        if step <= max_step:
+            return seconds
+    return 365 * DAY
+
+
+def split_interval(start, end, chunk_seconds):
+    """
+    Teilt [start, end) in Teilstücke von höchstens chunk_seconds. Die Grenzen liegen auf einem festen
+    Raster (Vielfache von chunk_seconds), damit spätere Abfragen dieselben Stücke wiederverwenden.
+    """
+    chunks = []
+    cursor = start
+    boundary = (start // chunk_seconds + 1) * chunk_seconds
+    while cursor < end:
+        chunk_end = min(boundary, end)
+        chunks.append((cursor, chunk_end))
+        cursor = chunk_end
+        boundary += chunk_seconds
+    return chunks
+
+
+class BackfillPlanner:
+    """
+    Plant historische Abfragen anhand der im Datastore bereits vorhandenen Daten:
+    Fehlende Zeiträume werden ermittelt, in IB-konforme Stücke zerlegt, mit begrenzter Parallelität geladen
+    und einzeln gespeichert. Dadurch ist ein abgebrochener Backfill beim nächsten Aufruf fortsetzbar.
+    """
+    def __init__(self, store, fetch, max_concurrency=3):
+        """
+        :param store: BarStore.
+        :param fetch: Coroutine fetch(instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth, lane=...) -> Bars oder None;
+            Bars mit complete = False gelten als fehlgeschlagen (siehe is_complete).
+        :param max_concurrency: Maximale Anzahl gleichzeitig laufender Abfragen.
+        """
+        self.store = store
+        self.fetch = fetch
+        self.max_concurrency = max_concurrency
+
+    def plan(self, instrument, start, end, bar_size, what_to_show="MIDPOINT", use_rth=False):
+        """
+        Liefert die Liste der noch zu ladenden Stücke (start, end) in aufsteigender Reihenfolge.
+        """
+        chunk_seconds = max_request_seconds(bar_size)
+        chunks = []
+        for gap_start, gap_end in self.store.missing(instrument, bar_size, start, end, what_to_show, use_rth):
+            chunks.extend(split_interval(gap_start, gap_end, chunk_seconds))
+        return chunks
+
+    async def run(self, instrument, start, end, bar_size, what_to_show="MIDPOINT", use_rth=False, lane=RequestLane.INTERACTIVE):
+        """
+        Lädt alle fehlenden Stücke in [start, end) und liefert anschließend die Bars aus dem Datastore.
+        :param start: Beginn in Epoch-Sekunden.
+        :param end: Ende in Epoch-Sekunden.
+        :param lane: RequestLane, mit der die Abfragen beim Request-Scheduler eingereiht werden.
+        :return: pyarrow Table, oder None, wenn keine einzige Abfrage erfolgreich war.
+        """
+        chunks = self.plan(instrument, start, end, bar_size, what_to_show, use_rth)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def load_chunk(chunk_start, chunk_end):
+            async with semaphore:
+                bars = await self.fetch(
+                    instrument,
+                    datetime.datetime.fromtimestamp(chunk_end, tz=datetime.timezone.utc),
+                    format_duration(chunk_end - chunk_start),
+                    bar_size,
+                    what_to_show,
+                    use_rth,
+                    lane=lane,
+                )
+            if bars is None:
+                return False
+            if not is_complete(bars):
+                # Fehler oder Timeout: erhaltene Bars speichern, das Stück aber nicht als abgedeckt markieren,
+                # damit es beim nächsten Backfill erneut angefragt wird
+                self.store.write_bars(instrument, bar_size, bars_to_columns(bars), None, None, what_to_show, use_rth)
+                return False
+            # IB liefert ggf. etwas mehr als angefragt; nur das Stück selbst gilt als abgedeckt
+            self.store.write_bars(
+                instrument, bar_size, bars_to_columns(bars),
+                chunk_start, completed_until(chunk_end, bar_size), what_to_show, use_rth
+            )
+            return True
+
+        results = await asyncio.gather(*(load_chunk(s, e) for s, e in chunks))
+        failed = results.count(False)
+        if failed:
+            print(f"Backfill: {failed} von {len(chunks)} Abfragen fehlgeschlagen.")
+            if failed == len(chunks):
+                return None
+        return self.store.read_bars(instrument, bar_size, start, end, what_to_show, use_rth)
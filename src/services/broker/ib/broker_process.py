@@ -0,0 +1,205 @@
+import asyncio
+import inspect
+import math
+import threading
+import time
+from types import SimpleNamespace
+
+from ib_async import IB, Ticker
+
+from core.loop_monitor import LoopLagMonitor
+from database.tick_journal import TickRecorder
+from services.broker.historical import HistoricalBars
+from services.broker.ib.connection import ConnectionManager
+from services.broker.ib.historical_request import request_historical_data
+from services.broker.ib.pool import ConnectionPool
+from services.broker.ib.tick_ring import KIND_QUOTE, KIND_TRADE, TickRing
+from services.market_data.ticks import TRADE_TICK_TYPES, quote_dict
+
+# Dieses Modul läuft im Broker-Prozess und darf weder Qt noch die GUI-Module importieren.
+
+
+def main(settings, ring_name, conn):
+    """
+    Einstiegspunkt des Broker-Prozesses.
+    :param settings: IbSettings als Dictionary.
+    :param ring_name: Name des Tick-Ringpuffers im Shared Memory.
+    :param conn: Ende der Pipe für Befehle und Antworten.
+    """
+    asyncio.run(BrokerWorker(settings, ring_name, conn).run())
+
+
+def portable(value):
+    """
+    Bereitet ein Ergebnis von ib_async für die Übertragung per Pipe vor:
+    Ticker werden zu Dictionaries, Listen-Unterklassen (z. B. BarDataList) zu einfachen Listen.
+    """
+    if isinstance(value, Ticker):
+        return quote_dict(value)
+    if isinstance(value, list):
+        return [portable(item) for item in value]
+    return value
+
+
+class BrokerWorker:
+    """
+    Hält die IB-Verbindungen im Broker-Prozess. Der Socket wird hier gelesen, unabhängig von der Last der GUI.
+    Ticks gehen über den TickRing an die GUI, alle übrigen Anfragen werden über die Pipe beantwortet.
+    Pacing, Caching und Leitungsbudget bleiben in RemoteIb im GUI-Prozess.
+    """
+    def __init__(self, settings, ring_name, conn):
+        self.setting = SimpleNamespace(broker=SimpleNamespace(ib=SimpleNamespace(**settings)))
+        self.conn = conn
+        self.ring = TickRing(ring_name)
+        self.recorder = TickRecorder() if settings.get("record_ticks") else None
+        # Nur mit IbSettings.monitor_loop_lag, gestartet beim Verbinden
+        self.loop_monitor = LoopLagMonitor()
+        self.monitor_loop_lag = settings.get("monitor_loop_lag", False)
+        # slot -> {'contract', 'ticker', 'handler', 'record'}
+        self.subscriptions = {}
+
+        self.ib = IB()
+        self.connection = ConnectionManager(self, self.ib, settings["clientId"], max_delay=settings["reconnect_max_delay"])
+        self.pool = ConnectionPool(self, self.connection)
+        for member in self.pool.members.values():
+            member.client.errorEvent += self._on_error
+        self.ib.disconnectedEvent += lambda: self._send_event("disconnected", "streaming")
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        threading.Thread(target=self._read_commands, name="broker-commands", daemon=True).start()
+        await self.stopped.wait()
+        for slot in list(self.subscriptions):
+            self._cancel(slot)
+        self.loop_monitor.stop()
+        self.pool.disconnect()
+        if self.recorder is not None:
+            self.recorder.close()
+        self.ring.close()
+
+    def _read_commands(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                # GUI-Prozess beendet
+                message = (None, "shutdown", {})
+            self.loop.call_soon_threadsafe(self._dispatch, message)
+            if message[1] == "shutdown":
+                return
+
+    def _dispatch(self, message):
+        asyncio.ensure_future(self._handle(*message))
+
+    async def _handle(self, msg_id, command, args):
+        try:
+            result = await getattr(self, "cmd_" + command)(**args)
+            ok = True
+        except Exception as e:
+            result, ok = f"{type(e).__name__}: {e}", False
+        if msg_id is not None:
+            self._send((msg_id, ok, result))
+
+    def _send(self, message):
+        try:
+            self.conn.send(message)
+        except (OSError, ValueError) as e:
+            print(f"Broker-Prozess konnte nicht an die GUI senden: {e}")
+
+    def _send_event(self, name, payload):
+        self._send((None, name, payload))
+
+    async def _on_connected(self, member, reconnected):
+        if member is self.connection:
+            asyncio.ensure_future(self.pool.connect_secondary())
+        if member is self.connection and reconnected:
+            # IB hat alle Leitungen verworfen; die GUI bestellt sie neu
+            for subscription in self.subscriptions.values():
+                subscription['ticker'].updateEvent -= subscription['handler']
+            self.subscriptions.clear()
+        self._send_event("connected", (member.name, reconnected))
+
+    def _on_error(self, req_id, error_code, error_string, contract):
+        self._send_event("error", (req_id, error_code, error_string))
+
+    def _on_ticker(self, slot, ticker):
+        subscription = self.subscriptions.get(slot)
+        if subscription is None:
+            return
+        if subscription['record'] is not None:
+            subscription['record'](ticker)
+        nan = math.nan
+        for tick in ticker.ticks:
+            if tick.tickType in TRADE_TICK_TYPES and not math.isnan(tick.price):
+                self.ring.write(
+                    slot, KIND_TRADE, int(tick.time.timestamp() * 1e9), nan, nan, tick.price, nan, nan, tick.size, nan
+                )
+        self.ring.write(
+            slot, KIND_QUOTE, time.time_ns(), ticker.bid, ticker.ask, ticker.last,
+            ticker.bidSize, ticker.askSize, ticker.lastSize, ticker.volume
+        )
+        if self.ring.take_signal():
+            # Die GUI hat den Ringpuffer geleert und wartet; höchstens ein Wecksignal pro Lesedurchgang
+            self._send_event("ticks", None)
+
+    def _cancel(self, slot):
+        subscription = self.subscriptions.pop(slot, None)
+        if subscription is None:
+            return
+        subscription['ticker'].updateEvent -= subscription['handler']
+        if self.ib.isConnected():
+            self.ib.cancelMktData(subscription['contract'])
+
+    # --- Befehle der GUI ---
+    async def cmd_connect(self):
+        if self.monitor_loop_lag:
+            self.loop_monitor.start()
+        return await self.connection.connect()
+
+    async def cmd_disconnect(self):
+        self.loop_monitor.stop()
+        self.pool.disconnect()
+
+    async def cmd_call(self, traffic, method, args, kwargs):
+        """
+        Führt eine Methode des IB-Clients der Verkehrsklasse aus.
+        """
+        result = getattr(self.pool.member(traffic).client, method)(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return portable(result)
+
+    async def cmd_historical(self, traffic, contract, end_datetime, duration_str, bar_size, what_to_show, use_rth):
+        """
+        Historische Abfrage mit Fehlerauswertung im Broker-Prozess, da errorEvent und reqId nur hier verfügbar sind.
+        """
+        bars = await request_historical_data(
+            self.pool.member(traffic).client, contract, end_datetime, duration_str, bar_size, what_to_show, use_rth
+        )
+        return HistoricalBars(portable(bars), bars.complete)
+
+    async def cmd_subscribe(self, slot, contract):
+        self._cancel(slot)
+        ticker = self.ib.reqMktData(contract, "", False, False)
+        handler = lambda t: self._on_ticker(slot, t)
+        ticker.updateEvent += handler
+        self.subscriptions[slot] = {
+            'contract': contract,
+            'ticker': ticker,
+            'handler': handler,
+            'record': self.recorder.writer(contract) if self.recorder is not None else None,
+        }
+
+    async def cmd_unsubscribe(self, slot):
+        self._cancel(slot)
+
+    async def cmd_status(self):
+        return {
+            'loop_lag': self.loop_monitor.status(),
+            'pool': {name: member.status() for name, member in self.pool.members.items()},
+            'subscriptions': len(self.subscriptions),
+        }
+
+    async def cmd_shutdown(self):
+        self.stopped.set()
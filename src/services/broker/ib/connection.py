@@ -0,0 +1,180 @@
+import asyncio
+import random
+import time
+
+
+async def probe(host, port, timeout=0.5):
+    """
+    Prüft per TCP-Verbindungsaufbau, ob auf host:port ein API-Port (TWS / IB Gateway) lauscht.
+    Blockiert den Event-Loop nicht und ersetzt Ping- und Prozessprüfungen.
+    """
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+class ConnectionManager:
+    """
+    Verwaltet eine Verbindung (IB-Client mit eigener Client-ID) zu TWS / IB Gateway: schnelle Erreichbarkeitsprüfung,
+    Verbindungsaufbau und automatischer Reconnect mit exponentiellem Backoff und Jitter. Nach jedem (Re-)Connect wird
+    Ib._on_connected aufgerufen, das u. a. die aktiven Marktdaten-Abos wiederherstellt.
+    Zusätzlich werden die über die Verbindung laufenden Anfragen gezählt und ihre Laufzeit gemessen.
+    """
+    def __init__(self, ib_instance, client, client_id, name="streaming", probe_timeout=0.5, initial_delay=1.0, max_delay=60.0):
+        """
+        :param ib_instance: Instanz der Ib-Klasse.
+        :param client: ib_async IB-Client der Verbindung.
+        :param client_id: Client-ID, mit der sich der Client anmeldet.
+        :param name: Verkehrsklasse der Verbindung ("streaming", "historical" oder "account").
+        :param probe_timeout: Timeout der TCP-Prüfung in Sekunden.
+        :param initial_delay: Wartezeit vor dem ersten Reconnect-Versuch in Sekunden.
+        :param max_delay: Obergrenze der Wartezeit zwischen zwei Versuchen.
+        """
+        self.ib = ib_instance
+        self.client = client
+        self.client_id = client_id
+        self.name = name
+        self.probe_timeout = probe_timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.state = "disconnected"
+        self.attempts = 0
+        # True, solange der Benutzer verbunden sein möchte; steuert den automatischen Reconnect
+        self._wanted = False
+        self._has_connected = False
+        self._reconnect_task = None
+        self.reconnects = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.client.disconnectedEvent += self._on_disconnected
+
+    @property
+    def settings(self):
+        return self.ib.setting.broker.ib
+
+    async def connect(self):
+        """
+        Baut die Verbindung auf. Schlägt der erste Versuch fehl, wird bei aktivem auto_reconnect
+        im Hintergrund weiter versucht.
+        :return: True, wenn die Verbindung sofort steht.
+        """
+        self._wanted = True
+        if self.client.isConnected():
+            return True
+        if await self._attempt():
+            return True
+        self._schedule_reconnect()
+        return False
+
+    def disconnect(self):
+        self._wanted = False
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self.client.isConnected():
+            self.client.disconnect()
+            print(f"Verbindung {self.name} zur Interactive Brokers API getrennt.")
+        self.state = "disconnected"
+
+    async def _attempt(self):
+        settings = self.settings
+        self.state = "connecting"
+        if not await probe(settings.ip, settings.port, self.probe_timeout):
+            print(f"TWS / IB Gateway unter {settings.ip}:{settings.port} ist nicht erreichbar.")
+            self.state = "disconnected"
+            return False
+        try:
+            await self.client.connectAsync(
+                settings.ip,
+                settings.port,
+                clientId=self.client_id,
+                readonly=settings.read_only,
+                timeout=4
+            )
+        except Exception as e:
+            print(f"Fehler beim Verbinden mit IB ({self.name}, Client-ID {self.client_id}): {e}")
+            self.state = "disconnected"
+            return False
+        print(f"Verbunden mit Interactive Brokers API ({self.name}, Client-ID {self.client_id}).")
+        self.state = "connected"
+        self.attempts = 0
+        reconnected = self._has_connected
+        self._has_connected = True
+        if reconnected:
+            self.reconnects += 1
+        await self.ib._on_connected(self, reconnected)
+        return True
+
+    def _on_disconnected(self):
+        if self.state == "connected":
+            self.state = "disconnected"
+            if self._wanted:
+                print(f"Verbindung {self.name} zu IB verloren, Reconnect wird versucht.")
+                self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if not self._wanted or not self.settings.auto_reconnect:
+            return
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    def next_delay(self):
+        """
+        Wartezeit vor dem nächsten Versuch: exponentiell wachsend, zufällig gestreut
+        ("Full Jitter"), damit mehrere Clients TWS nicht gleichzeitig bestürmen.
+        """
+        ceiling = min(self.max_delay, self.initial_delay * 2 ** self.attempts)
+        return random.uniform(self.initial_delay, max(ceiling, self.initial_delay))
+
+    async def _reconnect(self):
+        self.state = "reconnecting"
+        while self._wanted and not self.client.isConnected():
+            await asyncio.sleep(self.next_delay())
+            self.attempts += 1
+            if await self._attempt():
+                return
+            self.state = "reconnecting"
+
+    async def call(self, factory):
+        """
+        Führt eine Anfrage über diese Verbindung aus und erfasst Laufzeit und Fehler.
+        :param factory: Funktion client -> Coroutine der Anfrage.
+        """
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            return await factory(self.client)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.requests += 1
+            self.last_latency = time.monotonic() - started
+            self.total_latency += self.last_latency
+
+    def status(self):
+        """
+        :return: Dictionary mit Zustand, Reconnects, laufenden Anfragen und Latenzen (Sekunden) der Verbindung.
+        """
+        return {
+            'client_id': self.client_id,
+            'state': self.state,
+            'connected': self.client.isConnected(),
+            'reconnects': self.reconnects,
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'errors': self.errors,
+            'last_latency': self.last_latency,
+            'avg_latency': self.total_latency / max(self.requests, 1),
+        }
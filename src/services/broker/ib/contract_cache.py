@@ -0,0 +1,116 @@
+import asyncio
+import os
+import pickle
+import time
+from pathlib import Path
+
+from services.broker.contracts import normalize_contract
+
+
+class ContractCache:
+    """
+    Cache für Contract Details und qualifizierte Contracts, im Speicher und auf der Platte.
+    Einträge sind über die normalisierten Contract-Felder und die Art der Abfrage adressiert und haben eine eigene TTL.
+    Abgelaufene Einträge werden sofort zurückgegeben und im Hintergrund neu geladen,
+    sodass bekannte Instrumente nach einem Neustart ohne Broker-Roundtrip verfügbar sind.
+    """
+    def __init__(self, path="data/contracts.pkl", default_ttl=24 * 3600):
+        self.path = Path(path)
+        self.default_ttl = default_ttl
+        # (Art, normalisierter Contract) -> {'value', 'fetched', 'ttl'}
+        self.entries = {}
+        # Laufende Ladevorgänge, damit parallele Anfragen nur einmal beim Broker landen
+        self._loading = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                self.entries = pickle.load(f)
+        except Exception as e:
+            print(f"Contract-Cache konnte nicht geladen werden: {e}")
+            self.entries = {}
+
+    def save(self):
+        """
+        Schreibt den Cache atomar auf die Platte, sofern sich etwas geändert hat.
+        """
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, 'wb') as f:
+            pickle.dump(self.entries, f)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def get(self, kind, contract):
+        """
+        :return: (Wert, abgelaufen) oder None, falls nichts im Cache ist.
+        """
+        entry = self.entries.get((kind, normalize_contract(contract)))
+        if entry is None:
+            return None
+        return entry['value'], time.time() - entry['fetched'] > entry['ttl']
+
+    def put(self, kind, contract, value, ttl=None):
+        self.entries[(kind, normalize_contract(contract))] = {
+            'value': value,
+            'fetched': time.time(),
+            'ttl': self.default_ttl if ttl is None else ttl,
+        }
+        self._dirty = True
+
+    async def resolve(self, kind, contract, loader, ttl=None, refresh=False):
+        """
+        Liefert den Wert aus dem Cache oder lädt ihn über loader.
+        :param kind: Art der Abfrage, z. B. "details" oder "qualify".
+        :param loader: Funktion ohne Argumente, die eine Coroutine mit dem Ergebnis liefert.
+        :param ttl: Gültigkeit des Eintrags in Sekunden (Standard: default_ttl).
+        :param refresh: Eintrag in jedem Fall neu laden.
+        """
+        cached = None if refresh else self.get(kind, contract)
+        if cached is not None:
+            value, stale = cached
+            if stale:
+                # Veralteten Wert sofort liefern und im Hintergrund aktualisieren
+                self._load(kind, contract, loader, ttl)
+            return value
+        return await asyncio.shield(self._load(kind, contract, loader, ttl))
+
+    async def prewarm(self, contracts, loader_factory, kind="qualify"):
+        """
+        Lädt fehlende oder veraltete Einträge für die übergebenen Contracts, z. B. beim Start für den gespeicherten Workspace.
+        :param loader_factory: Funktion contract -> loader.
+        """
+        tasks = []
+        for contract in contracts:
+            cached = self.get(kind, contract)
+            if cached is None or cached[1]:
+                tasks.append(self._load(kind, contract, loader_factory(contract), None))
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.save()
+
+    def _load(self, kind, contract, loader, ttl):
+        key = (kind, normalize_contract(contract))
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.ensure_future(self._run_loader(kind, contract, loader, ttl))
+            task.add_done_callback(lambda t: self._on_loaded(key, t))
+        return task
+
+    def _on_loaded(self, key, task):
+        self._loading.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Fehler beim Laden von {key[0]} für {dict(key[1])}: {task.exception()}")
+
+    async def _run_loader(self, kind, contract, loader, ttl):
+        value = await loader()
+        # Leere Ergebnisse (unbekannter Contract, Verbindungsfehler) nicht cachen
+        if value:
+            self.put(kind, contract, value, ttl)
+        return value
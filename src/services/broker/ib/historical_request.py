@@ -0,0 +1,46 @@
+# Läuft im GUI-Prozess (Ib) und im Broker-Prozess (RemoteIb); darf daher weder Qt noch die GUI-Module importieren.
+
+# Fehlercode von IB für Probleme historischer Abfragen (u. a. "HMDS query returned no data" und Pacing Violations)
+HISTORICAL_DATA_ERROR = 162
+
+
+async def request_historical_data(ib, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth):
+    """
+    Führt reqHistoricalData auf einer Verbindung aus und kennzeichnet das Ergebnis mit complete:
+    False, wenn IB für diese Abfrage einen Fehler gemeldet hat oder sie ohne Antwort abgelaufen ist (leeres Ergebnis
+    ohne "returned no data"). Nur vollständige Ergebnisse werden im Datastore als abgedeckt markiert.
+    :param ib: IB-Client der Verbindung.
+    :return: BarDataList mit dem Attribut complete.
+    """
+    errors = []
+
+    def on_error(req_id, error_code, error_string, contract):
+        errors.append((req_id, error_code, error_string))
+
+    ib.errorEvent += on_error
+    try:
+        bars = await ib.reqHistoricalDataAsync(
+            instrument,
+            endDateTime=end_datetime,
+            durationStr=duration_str,
+            barSizeSetting=bar_size,
+            whatToShow=what_to_show,
+            useRTH=use_rth,
+            formatDate=1
+        )
+    finally:
+        ib.errorEvent -= on_error
+    no_data = False
+    failed = []
+    for req_id, code, text in errors:
+        if req_id != bars.reqId:
+            continue
+        if code == HISTORICAL_DATA_ERROR and "returned no data" in text.lower():
+            # Der Zeitraum ist vollständig abgefragt, enthält aber keine Bars
+            no_data = True
+        else:
+            failed.append((code, text))
+    if failed:
+        print(f"Historical data for {instrument} incomplete: {failed}")
+    bars.complete = not failed and (bool(bars) or no_data)
+    return bars
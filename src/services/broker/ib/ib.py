@@ -1,180 +1,477 @@
 import asyncio
 import datetime
-import psutil
-import os
-import subprocess
-from ib_async import IB, util
+import itertools
+import time
+from bisect import bisect_left, bisect_right
+from ib_async import IB, util, BarData
 from ib_async.contract import *
 
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import QTimer
 
-class IbSettings:
-    def __init__(self):
-        self.ip = "127.0.0.1"
-        self.port = 7496 #4001
-        self.clientId = 1
-        self.read_only = True
-        self.connect_at_startup = False
+from core.loop_monitor import LoopLagMonitor
+from services.broker.contracts import normalize_contract
+from services.broker.historical import (
+    bar_size_seconds, derive_bars, duration_seconds, table_to_rows, to_timestamp, utc_offset
+)
+from services.broker.single_flight import SingleFlight
+from services.broker.ib.backfill import BackfillPlanner
+from services.broker.ib.connection import ConnectionManager
+from services.broker.ib.contract_cache import ContractCache
+from services.broker.ib.historical_request import HISTORICAL_DATA_ERROR, request_historical_data
+from services.broker.ib.ib_settings import IbSettings
+from services.broker.ib.line_scheduler import LinePriority, MarketDataLineScheduler
+from services.broker.ib.pool import TRAFFIC_CLASSES, ConnectionPool
+from services.broker.ib.request_scheduler import RequestLane, RequestScheduler
+from services.market_data.dispatch import DispatchPolicy
+from services.market_data.ticks import ticker_updates
 
-    def to_dict(self):
-        return self.__dict__
+# Pause nach einer von IB gemeldeten Pacing Violation (Sekunden)
+PACING_PENALTY_SECONDS = 60
 
-    def update_from_dict(self, data):
-        self.__dict__.update(data)
-        
 class Ib:
     def __init__(self, settings=None):
         self.app = QApplication.instance()
         self.setting = self.app.settings
-        self.ib = IB()
-        # Dictionary zur Verwaltung aktiver Live-Daten-Abonnements.
-        # key: request_id, value: { 'instrument': Contract, 'observers': [callback, ...] }
+        # Dictionary zur Verwaltung aktiver Live-Daten-Abonnements, höchstens eine IB-Marktdatenleitung pro Contract.
+        # key: normalisierter Contract,
+        # value: { 'instrument': Contract, 'line_id': request_id der Leitung, 'ticker': Ticker, 'handler': Callback,
+        #          'mode': "stream" | "rotation", 'since': Reihenfolge, 'observers': [ObserverChannel, ...] (jeder Tick),
+        #          'conflated': [callback, ...] (höchstens ein Update pro Frame), 'requests': { request_id: [callback, ...] },
+        #          'priorities': { request_id: LinePriority } }
         self.active_market_data = {}
+        # request_id -> normalisierter Contract, damit Aufrufer weiterhin per request_id abbestellen können
+        self.market_data_requests = {}
+        self._subscription_order = itertools.count()
+        # Verteilt das Leitungsbudget; nicht gestreamte Contracts werden per Snapshot rotiert
+        self.line_scheduler = MarketDataLineScheduler(
+            self,
+            max_lines=self.setting.broker.ib.market_data_lines,
+            snapshot_lines=self.setting.broker.ib.snapshot_lines,
+            snapshot_interval=self.setting.broker.ib.snapshot_interval,
+        )
         self.subscription_lock = asyncio.Lock()
+        # Alle Anfragen an IB laufen über den Scheduler, damit die Pacing-Limits eingehalten werden
+        self.request_scheduler = RequestScheduler()
+        # Gleichzeitige identische Anfragen teilen sich eine laufende Anfrage
+        self.single_flight = SingleFlight()
+        # Zerlegt große historische Abfragen in IB-konforme Stücke und lädt nur fehlende Zeiträume (siehe backfill_planner)
+        self._backfill_planner = None
+        # Contract Details und qualifizierte Contracts, persistent über Neustarts hinweg
+        self.contract_cache = ContractCache()
+        # Verspätung des Event-Loops, d. h. wie lange eingehende Ticks mindestens auf das Lesen warten
+        # (nur mit IbSettings.monitor_loop_lag)
+        self.loop_monitor = LoopLagMonitor()
+        self._init_connections()
+
+    def _init_connections(self):
+        # Verbindungsaufbau mit TCP-Prüfung und automatischem Reconnect; self.ib ist der Client der Streaming-Verbindung
+        self.ib = IB()
+        self.connection = ConnectionManager(
+            self, self.ib, self.setting.broker.ib.clientId, max_delay=self.setting.broker.ib.reconnect_max_delay
+        )
+        # Weitere Verbindungen für historische Daten und Kontodaten
+        self.pool = ConnectionPool(self, self.connection)
+        for member in self.pool.members.values():
+            member.client.errorEvent += self._on_ib_error
+
+    @property
+    def bar_store(self):
+        # Gemeinsamer Datastore der echten Broker
+        return self.app.bar_store
+
+    @property
+    def backfill_planner(self):
+        # Erst bei der ersten historischen Abfrage anlegen, damit der Bar-Speicher nicht schon beim Start geladen wird
+        if self._backfill_planner is None:
+            self._backfill_planner = BackfillPlanner(self.bar_store, self._request_historical_data)
+        return self._backfill_planner
+
+    def is_connected(self):
+        return self.ib.isConnected()
 
     async def connect(self):
-        if self.setting.broker.ib.ip == "127.0.0.1":
-            # Prüfen, ob TWS oder IBGateway läuft
-            if not self.is_ib_gateway_running():
-                print("TWS oder IBGateway ist nicht geöffnet!")
-                return
-        else:
-            # Prüfen, ob die IP erreichbar ist (ping)
-            if not await self.is_ip_reachable(self.setting.broker.ib.ip):
-                print(f"Die IP {self.setting.broker.ib.ip} ist nicht erreichbar.")
-                return
+        """
+        Verbindet mit TWS / IB Gateway, ohne den Event-Loop zu blockieren.
+        Die zusätzlichen Verbindungen des Pools werden nach dem Verbindungsaufbau im Hintergrund aufgebaut (_on_connected).
+        Ist die Gegenstelle nicht erreichbar, wird (sofern aktiviert) im Hintergrund erneut versucht.
+        """
+        if self.setting.broker.ib.monitor_loop_lag:
+            self.loop_monitor.start()
+        return await self.connection.connect()
 
-        try:
-            await self.ib.connectAsync(
-                self.setting.broker.ib.ip,
-                self.setting.broker.ib.port,
-                clientId=self.setting.broker.ib.clientId,
-                readonly=self.setting.broker.ib.read_only,
-                timeout=4
-            )
-            print("Verbunden mit Interactive Brokers API.")
-        except Exception as e:
-            print(f"Fehler beim Verbinden mit IB: {e}")
+    async def _on_connected(self, member, reconnected):
+        """
+        Wird vom ConnectionManager nach jedem erfolgreichen Verbindungsaufbau aufgerufen.
+        :param member: ConnectionManager der Verbindung.
+        :param reconnected: True, wenn die Verbindung zuvor schon einmal bestand.
+        """
+        if member is self.connection:
+            # Auch wenn die Streaming-Verbindung erst durch einen Reconnect im Hintergrund zustande kommt
+            asyncio.create_task(self.pool.connect_secondary())
+            await self._after_connect(reconnected)
+
+    async def _after_connect(self, reconnected):
+        # Contracts der im Workspace gespeicherten Instrumente im Hintergrund vorladen
+        asyncio.create_task(self.prewarm_contracts(self.setting.workspace.instruments()))
+        # Auch beim ersten Verbindungsaufbau: Abos, die offline registriert wurden, erhalten jetzt ihre Leitungen
+        await self.restore_market_data()
+
+    def _on_ib_error(self, req_id, error_code, error_string, contract):
+        if error_code == HISTORICAL_DATA_ERROR and "pacing violation" in error_string.lower():
+            # IB sperrt weitere historische Abfragen; lieber selbst pausieren als die Strafzeit zu verlängern
+            print("IB meldet eine Pacing Violation, historische Abfragen pausieren.")
+            self.request_scheduler.penalize("historical_fine", PACING_PENALTY_SECONDS)
+            self.request_scheduler.penalize("historical", PACING_PENALTY_SECONDS)
 
     def disconnect(self):
-        if self.ib.isConnected():
-            self.ib.disconnect()
-            print("Verbindung zur Interactive Brokers API getrennt.")
+        self.contract_cache.save()
+        self.loop_monitor.stop()
+        self.pool.disconnect()
 
-    def is_ib_gateway_running(self):
+    async def _request(self, request_class, factory, lane=RequestLane.INTERACTIVE, owner=None):
         """
-        Prüft, ob TWS oder IBGateway als Prozess läuft.
+        Reiht eine Anfrage beim Request-Scheduler ein und führt sie über die passende Verbindung des Pools aus.
+        :param request_class: Anfrageklasse des Request-Schedulers.
+        :param factory: Funktion client -> Coroutine der Anfrage.
         """
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            if 'java' in proc.info['name'].lower():
-                for cmd in proc.info['cmdline']:
-                    if '-DproductName=IB Gateway' in cmd or '-DproductName=Trader Workstation' in cmd:
-                        return True
-        return False
+        return await self.request_scheduler.submit(
+            request_class, lambda: self.pool.call(TRAFFIC_CLASSES[request_class], factory), lane, owner
+        )
 
-    async def is_ip_reachable(self, ip):
+    # --- Contracts ---
+    async def qualify_contract(self, contract, refresh=False):
         """
-        Prüft, ob eine IP-Adresse erreichbar ist (ping).
+        Liefert den qualifizierten Contract (mit conId) aus dem Contract-Cache oder qualifiziert ihn bei IB.
+        :return: Qualifizierter Contract oder der übergebene Contract, falls die Qualifizierung fehlschlägt
+            (z. B. ohne Verbindung; das Abo wird dann nach dem Verbindungsaufbau wiederhergestellt).
         """
         try:
-            # Ping-Befehl je nach Betriebssystem
-            if os.name == 'nt':
-                # Windows: Verwendung von 'ping -n 1'
-                cmd = ['ping', '-n', '1', ip]
-            else:
-                # Unix (Linux/Mac): Verwendung von 'ping -c 1'
-                cmd = ['ping', '-c', '1', ip]
-                
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            return result.returncode == 0  # Rückgabewert 0 bedeutet erfolgreich
-        except Exception as e:
-            print(f"Fehler beim Pingen der IP {ip}: {e}")
-            return False
+            qualified = await self.contract_cache.resolve(
+                "qualify", contract, lambda: self._qualify(contract, RequestLane.INTERACTIVE), refresh=refresh
+            )
+        except ConnectionError as e:
+            print(f"Contract {contract} could not be qualified: {e}")
+            return contract
+        return qualified or contract
+
+    async def _qualify(self, contract, lane=RequestLane.BACKGROUND):
+        contracts = await self._request(
+            "contract", lambda ib: ib.qualifyContractsAsync(contract), lane, normalize_contract(contract)
+        )
+        return contracts[0] if contracts and contracts[0] else None
+
+    async def fetch_contract_details(self, contract, ttl=None, refresh=False):
+        """
+        Liefert die Contract Details aus dem Contract-Cache oder fragt sie bei IB ab.
+        :param ttl: Gültigkeit des Cache-Eintrags in Sekunden (Standard: ein Tag).
+        :return: Liste von ContractDetails.
+        """
+        return await self.contract_cache.resolve(
+            "details", contract, lambda: self._request_contract_details(contract), ttl=ttl, refresh=refresh
+        ) or []
+
+    async def _request_contract_details(self, contract, lane=RequestLane.INTERACTIVE):
+        # Mehrfachabfragen desselben Contracts fasst bereits der Contract-Cache zusammen
+        return await self._request(
+            "contract", lambda ib: ib.reqContractDetailsAsync(contract), lane, normalize_contract(contract)
+        )
+
+    async def prewarm_contracts(self, instruments):
+        """
+        Qualifiziert die übergebenen Instrumente (Dictionaries mit Contract-Feldern), soweit sie noch nicht
+        oder nicht mehr aktuell im Cache liegen.
+        """
+        contracts = []
+        for fields in instruments:
+            try:
+                contracts.append(Contract.create(**fields))
+            except Exception as e:
+                print(f"Ungültiges Instrument im Workspace {fields}: {e}")
+        await self.contract_cache.prewarm(contracts, lambda contract: lambda: self._qualify(contract))
 
     # --- Live Market Data Methoden ---
-    async def subscribe_market_data(self, instrument, callback, request_id):
+    async def subscribe_market_data(self, instrument, callback, request_id, priority=LinePriority.VISIBLE, conflate=True,
+                                    policy=DispatchPolicy.DROP_OLDEST, executor=None):
         """
         Abonnieren von Echtzeit-Marktdaten für das angegebene Instrument.
-        Falls bereits ein Abo für den request_id existiert, wird der neue Observer hinzugefügt.
-        :param instrument: IB Contract (z. B. Aktie, Option, etc.)
-        :param callback: Funktion, die mit den aktuellen Marktdaten aufgerufen wird.
+        Pro Contract wird höchstens eine IB-Marktdatenleitung geöffnet; weitere Abos desselben Contracts
+        (auch mit anderer request_id) hängen sich als Observer an. Ist das Leitungsbudget erschöpft,
+        werden Contracts niedriger Priorität per Snapshot-Rotation statt per Stream versorgt.
+        :param instrument: IB Contract (z. B. Aktie, Option, etc.)
+        :param callback: Funktion, die mit jedem Marktdaten-Update aufgerufen wird (Dictionary, siehe
+            services.market_data.ticks.tick; bei conflate=True höchstens das letzte Update pro Frame).
         :param request_id: Eindeutige ID, die auch zum Abbestellen benötigt wird.
+        :param priority: LinePriority des Abos (sichtbares Widget, Alarm, Hintergrund-Watchlist).
+        :param conflate: True für Widgets (höchstens ein Update pro Frame), False für Verbraucher, die jeden Tick benötigen.
+        :param policy: DispatchPolicy des eigenen Observer-Kanals (nur bei conflate=False).
+        :param executor: None, "thread" oder "process" für rechenintensive Verbraucher (nur bei conflate=False).
         """
+        if not conflate:
+            # Eigener Kanal, damit ein langsamer Verbraucher den Feed nicht aufhält
+            callback = self.app.dispatcher.channel(callback, policy=policy, executor=executor)
+        else:
+            # Widgets zeigen sofort den (als veraltet markierten) Stand der letzten Sitzung
+            self.app.warm_start.deliver(instrument, callback)
         async with self.subscription_lock:
-            if request_id in self.active_market_data:
-                # Observer zur bestehenden Subscription hinzufügen.
-                self.active_market_data[request_id]['observers'].append(callback)
-                return
-            else:
-                self.active_market_data[request_id] = {
+            # Contract aus dem Cache qualifizieren, statt ihn bei jedem Abo neu aufzulösen
+            instrument = await self.qualify_contract(instrument)
+            key = normalize_contract(instrument)
+            subscription = self.active_market_data.get(key)
+            if subscription is None:
+                subscription = self.active_market_data[key] = {
                     'instrument': instrument,
-                    'observers': [callback]
+                    'line_id': request_id,
+                    'ticker': None,
+                    'mode': None,
+                    'since': next(self._subscription_order),
+                    'observers': [],
+                    'conflated': [],
+                    'requests': {},
+                    'priorities': {},
                 }
-                try:
-                    # Abonnieren der Marktdaten via IB-API.
-                    # Hier wird ein asynchroner Aufruf getätigt – passe ggf. den Parameter "genericTickList" an.
-                    ticker = await self.ib.reqMktDataAsync(instrument, "", False, False, requestId=request_id)
-                    # Bei Updates wird unser interner Callback aufgerufen.
-                    ticker.updateEvent += lambda data: self._market_data_callback(request_id, data)
-                except Exception as e:
-                    print(f"Error subscribing to market data for request_id {request_id}: {e}")
-                    del self.active_market_data[request_id]
-
-    def _market_data_callback(self, request_id, data):
-        """
-        Interner Callback, der bei neuen Marktdaten alle registrierten Observer benachrichtigt.
-        """
-        if request_id in self.active_market_data:
-            for observer in self.active_market_data[request_id]['observers']:
-                try:
-                    observer(data)
-                except Exception as e:
-                    print(f"Error in market data observer: {e}")
+                record = self._tick_writer(instrument)
+                if record is not None:
+                    subscription['record'] = record
+            # Observer zur (ggf. bestehenden) Leitung hinzufügen.
+            subscription['conflated' if conflate else 'observers'].append(callback)
+            subscription['requests'].setdefault(request_id, []).append(callback)
+            subscription['priorities'][request_id] = min(priority, subscription['priorities'].get(request_id, priority))
+            self.market_data_requests[request_id] = key
+            await self.line_scheduler.rebalance()
+
+    def _tick_writer(self, instrument):
+        if self.setting.broker.ib.record_ticks:
+            # Schreibt jeden Tick in das Tick-Journal des Instruments
+            return self.app.tick_recorder.writer(instrument)
+        return None
+
+    async def _open_line(self, key):
+        """
+        Öffnet die Streaming-Leitung für einen Contract.
+        """
+        subscription = self.active_market_data[key]
+        try:
+            # Abonnieren der Marktdaten via IB-API.
+            # Hier wird ein asynchroner Aufruf getätigt – passe ggf. den Parameter "genericTickList" an.
+            ticker = await self.ib.reqMktDataAsync(subscription['instrument'], "", False, False, requestId=subscription['line_id'])
+            # Bei Updates wird unser interner Callback aufgerufen.
+            subscription['ticker'] = ticker
+            subscription['handler'] = lambda data: self._market_data_callback(key, data)
+            ticker.updateEvent += subscription['handler']
+            subscription['mode'] = "stream"
+        except Exception as e:
+            print(f"Error subscribing to market data for request_id {subscription['line_id']}: {e}")
+            # Ohne Leitung wird der Contract zumindest per Snapshot versorgt
+            subscription['mode'] = "rotation"
+
+    async def _close_line(self, key):
+        """
+        Schließt die Streaming-Leitung eines Contracts; die Observer bleiben registriert.
+        """
+        subscription = self.active_market_data[key]
+        subscription['mode'] = "rotation"
+        if subscription['ticker'] is None:
+            return
+        try:
+            subscription['ticker'].updateEvent -= subscription['handler']
+            subscription['ticker'] = None
+            await self.ib.cancelMktDataAsync(subscription['line_id'])
+        except Exception as e:
+            print(f"Error unsubscribing market data for request_id {subscription['line_id']}: {e}")
+
+    def _market_data_callback(self, key, ticker):
+        """
+        Interner Callback eines ib_async Tickers (Stream oder Snapshot). Die Observer erhalten dieselben
+        Dictionaries wie beim Broker-Prozess (siehe services.market_data.ticks), nie den veränderlichen Ticker.
+        """
+        subscription = self.active_market_data.get(key)
+        if subscription is None:
+            return
+        record = subscription.get('record')
+        if record is not None:
+            try:
+                record(ticker)
+            except Exception as e:
+                print(f"Error recording tick for {subscription['instrument']}: {e}")
+        for data in ticker_updates(ticker):
+            self._publish(key, subscription, data)
+
+    def _publish(self, key, subscription, data):
+        """
+        Verteilt ein Marktdaten-Update (Dictionary) an alle registrierten Observer.
+        """
+        self.app.warm_start.record_quote(key, data)
+        # Observer-Kanäle legen das Update nur in ihre Queue und kehren sofort zurück
+        for channel in subscription['observers']:
+            channel.publish(data)
+        if subscription['conflated']:
+            self.app.conflator.publish(key, data, subscription['conflated'])
 
     async def unsubscribe_market_data(self, request_id):
         """
         Beendet das Abonnement von Echtzeit-Marktdaten anhand der request_id.
+        Die IB-Marktdatenleitung wird erst gekündigt, wenn sich der letzte Observer des Contracts abgemeldet hat.
         """
         async with self.subscription_lock:
-            if request_id in self.active_market_data:
-                try:
-                    await self.ib.cancelMktDataAsync(request_id)
-                    del self.active_market_data[request_id]
-                except Exception as e:
-                    print(f"Error unsubscribing market data for request_id {request_id}: {e}")
-            else:
+            key = self.market_data_requests.pop(request_id, None)
+            if key is None:
                 print(f"No active subscription with request_id {request_id}")
+                return
+            subscription = self.active_market_data[key]
+            for callback in subscription['requests'].pop(request_id, []):
+                if callback in subscription['observers']:
+                    subscription['observers'].remove(callback)
+                    self.app.dispatcher.close(callback)
+                else:
+                    subscription['conflated'].remove(callback)
+            subscription['priorities'].pop(request_id, None)
+            if subscription['requests']:
+                # Priorität des Contracts kann gesunken sein
+                await self.line_scheduler.rebalance()
+                return
+            await self._close_line(key)
+            del self.active_market_data[key]
+            self.app.conflator.discard(key)
+            await self.line_scheduler.rebalance()
+
+    async def restore_market_data(self):
+        """
+        Stellt nach jedem Verbindungsaufbau alle Marktdaten-Abos in einem Durchgang wieder her.
+        IB verwirft bei einem Verbindungsabbruch sämtliche Leitungen, die Observer bleiben jedoch registriert;
+        ohne Verbindung angelegte Abos erhalten so ihre erste Leitung.
+        """
+        if not self.active_market_data:
+            return
+        async with self.subscription_lock:
+            for subscription in self.active_market_data.values():
+                if subscription['ticker'] is not None:
+                    subscription['ticker'].updateEvent -= subscription['handler']
+                    subscription['ticker'] = None
+                subscription['mode'] = None
+            await self.line_scheduler.rebalance()
+        print(f"{len(self.active_market_data)} Marktdaten-Abos nach dem Verbindungsaufbau wiederhergestellt.")
+
+    def latency_status(self):
+        """
+        Kennzahlen zur Verarbeitungslatenz: Verspätung des Event-Loops, der die IB-Sockets liest.
+        """
+        return {'loop_lag': self.loop_monitor.status()}
 
     # --- Historische Daten ---
     async def fetch_historical_data(self, instrument, end_datetime: datetime.datetime, duration_str: str, bar_size: str, what_to_show="MIDPOINT", use_rth=False):
         """
         Abfrage historischer Daten für ein Instrument.
+        Bereits gespeicherte Zeiträume werden aus dem Datastore gelesen, nur fehlende Zeiträume werden bei IB angefragt
+        und anschließend gespeichert. Gleichzeitige identische Aufrufe teilen sich eine Abfrage.
         :param instrument: IB Contract.
         :param end_datetime: Endzeitpunkt als datetime.
-        :param duration_str: Dauerangabe, z. B. "50 D" für 50 Tage.
-        :param bar_size: Zeitintervall, z. B. "1 min", "5 mins", "1 day", "tick", etc.
+        :param duration_str: Dauerangabe, z. B. "50 D" für 50 Tage.
+        :param bar_size: Zeitintervall, z. B. "1 min", "5 mins", "1 day", "tick", etc.
         :param what_to_show: Datentyp (Standard: "MIDPOINT").
         :param use_rth: Nur reguläre Handelszeiten verwenden.
-        :return: Historische Daten (z. B. als Liste von Bars).
+        :return: Historische Daten (z. B. als Liste von Bars).
+        """
+        try:
+            step = bar_size_seconds(bar_size)
+        except ValueError:
+            step = 1
+        # Endzeitpunkte innerhalb derselben Bar liefern dieselben Bars und werden zusammengefasst
+        key = (
+            "historical", normalize_contract(instrument), to_timestamp(end_datetime) // step,
+            duration_str, bar_size, what_to_show, use_rth,
+        )
+        bars = await self.single_flight.do(
+            key,
+            lambda: self._fetch_historical_data(instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth),
+            ttl=self.setting.broker.ib.request_result_ttl,
+        )
+        # Jeder Aufrufer erhält eine eigene Liste
+        return None if bars is None else list(bars)
+
+    async def _fetch_historical_data(self, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth):
+        try:
+            bar_size_seconds(bar_size)
+        except ValueError:
+            # Nicht speicherbare Abfragen (z. B. "tick") direkt weiterreichen
+            return await self._request_historical_data(instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth)
+        try:
+            end = to_timestamp(end_datetime)
+            start = end - duration_seconds(duration_str)
+            store = self.bar_store
+            table = None
+            if store.missing(instrument, bar_size, start, end, what_to_show, use_rth):
+                table = await derive_bars(
+                    store, instrument, bar_size, start, end, what_to_show, use_rth, self._exchange_utc_offset
+                )
+            if table is None:
+                table = await self.backfill_planner.run(instrument, start, end, bar_size, what_to_show, use_rth)
+            if table is None:
+                return None
+            return [BarData(**row) for row in table_to_rows(table, bar_size)]
+        except Exception as e:
+            print(f"Error fetching historical data: {e}")
+            return None
+
+    async def _exchange_utc_offset(self, instrument, timestamp):
+        """
+        Versatz der Börsenzeit zu UTC laut Contract Details (aus dem Contract-Cache), 0 falls nicht ermittelbar.
         """
         try:
-            # Format: "YYYYMMDD HH:MM:SS"
-            end_str = end_datetime.strftime("%Y%m%d %H:%M:%S")
-            data = await self.ib.reqHistoricalDataAsync(
-                instrument,
-                endDateTime=end_str,
-                durationStr=duration_str,
-                barSizeSetting=bar_size,
-                whatToShow=what_to_show,
-                useRTH=use_rth,
-                formatDate=1
+            details = await self.fetch_contract_details(instrument)
+        except Exception as e:
+            print(f"Error fetching contract details for {instrument}: {e}")
+            return 0
+        return utc_offset(details[0].timeZoneId, timestamp) if details else 0
+
+    async def backfill(self, instrument, start_datetime: datetime.datetime, end_datetime: datetime.datetime, bar_size: str, what_to_show="MIDPOINT", use_rth=False):
+        """
+        Lädt einen beliebig großen Zeitraum in den Datastore (z. B. ein Jahr 1-Minuten-Bars).
+        Bereits vorhandene Zeiträume werden übersprungen, ein abgebrochener Backfill kann einfach erneut gestartet werden.
+        :return: Anzahl der Bars im Zeitraum oder None bei Fehlern.
+        """
+        try:
+            table = await self.backfill_planner.run(
+                instrument, to_timestamp(start_datetime), to_timestamp(end_datetime), bar_size, what_to_show, use_rth,
+                lane=RequestLane.BACKGROUND
+            )
+            return None if table is None else table.num_rows
+        except Exception as e:
+            print(f"Error during backfill: {e}")
+            return None
+
+    async def _request_historical_data(self, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth,
+                                       lane=RequestLane.INTERACTIVE):
+        """
+        Direkte Abfrage historischer Daten bei IB, ohne Datastore.
+        :param lane: RequestLane der Abfrage (interaktiv oder Hintergrund-Backfill).
+        """
+        try:
+            bar_seconds = bar_size_seconds(bar_size)
+        except ValueError:
+            bar_seconds = 0
+        # Für feine Barsizes gelten die strengen Pacing-Regeln von IB
+        request_class = "historical_fine" if bar_seconds <= 30 else "historical"
+        try:
+            # ib_async formatiert naive (lokale) und zeitzonenbehaftete datetimes passend für IB
+            data = await self._request(
+                request_class,
+                lambda ib: self._historical_request(ib, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth),
+                lane,
+                normalize_contract(instrument),
             )
             return data
         except Exception as e:
             print(f"Error fetching historical data: {e}")
             return None
 
+    @staticmethod
+    async def _historical_request(ib, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth):
+        """
+        Historische Abfrage auf einer Verbindung; das Ergebnis trägt das Kennzeichen complete (siehe is_complete).
+        """
+        return await request_historical_data(ib, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth)
+
     # --- Konto- und Portfoliodaten ---
     async def fetch_account_info(self):
         """
@@ -182,7 +479,12 @@ class Ib:
         :return: Account-Daten (z. B. als Dictionary).
         """
         try:
-            account_info = await self.ib.reqAccountUpdatesAsync(subscribe=False)
+            account_info = await self.single_flight.do(
+                ("account",),
+                lambda: self._request("account", lambda ib: ib.reqAccountUpdatesAsync(subscribe=False)),
+                ttl=self.setting.broker.ib.request_result_ttl,
+            )
+            self.app.warm_start.record("account", account_info)
             return account_info
         except Exception as e:
             print(f"Error fetching account info: {e}")
@@ -194,21 +496,114 @@ class Ib:
         :return: Portfolio-Daten.
         """
         try:
-            portfolio = await self.ib.reqPositionsAsync()
+            portfolio = await self.single_flight.do(
+                ("portfolio",),
+                lambda: self._request("account", lambda ib: ib.reqPositionsAsync()),
+                ttl=self.setting.broker.ib.request_result_ttl,
+            )
+            self.app.warm_start.record("portfolio", portfolio)
             return portfolio
         except Exception as e:
             print(f"Error fetching portfolio: {e}")
             return None
 
 # --- Dediziertes Interface für Optionsdaten ---
+class OptionChainSnapshot:
+    """
+    Vollständige Option Chain eines Underlyings, einmalig per reqContractDetails geladen.
+    Die Contract Details sind nach (Expiration, Right) gruppiert und nach Strike sortiert,
+    sodass Strike-Bereiche per bisect statt per linearer Schleife ermittelt werden.
+    """
+    def __init__(self, details):
+        self.created = time.monotonic()
+        groups = {}
+        for d in details:
+            groups.setdefault((d.contract.lastTradeDateOrContractMonth, d.contract.right), []).append(d)
+        # (Expiration, Right) -> (sortierte Strikes, Contract Details in derselben Reihenfolge)
+        self.index = {}
+        for key, group in groups.items():
+            group.sort(key=lambda d: d.contract.strike)
+            self.index[key] = ([d.contract.strike for d in group], group)
+        self.expirations = sorted({expiration for expiration, _ in self.index})
+        self._strikes = {}
+        for (expiration, _), (strikes, _) in self.index.items():
+            self._strikes.setdefault(expiration, set()).update(strikes)
+        self._strikes = {expiration: sorted(strikes) for expiration, strikes in self._strikes.items()}
+
+    def age(self):
+        return time.monotonic() - self.created
+
+    def strikes(self, expiration):
+        """
+        Liefert alle Strikes (Calls und Puts) eines Expiration Dates, aufsteigend sortiert.
+        """
+        return list(self._strikes.get(expiration, []))
+
+    def query(self, expiration, strike_min=None, strike_max=None, right=None):
+        """
+        Liefert die Contract Details eines Expiration Dates im Strike-Bereich [strike_min, strike_max].
+        :param right: "C", "P" oder None für beide.
+        """
+        rights = [right] if right in ["C", "P"] else ["C", "P"]
+        result = []
+        for r in rights:
+            strikes, details = self.index.get((expiration, r), ([], []))
+            lo = 0 if strike_min is None else bisect_left(strikes, strike_min)
+            hi = len(strikes) if strike_max is None else bisect_right(strikes, strike_max)
+            result.extend(details[lo:hi])
+        if len(rights) > 1:
+            result.sort(key=lambda d: d.contract.strike)
+        return result
+
+
 class OptionChain:
     """
     Diese Klasse kapselt die Abfrage von Optionsdaten für ein zugrundeliegendes Instrument.
-    Zunächst werden alle verfügbaren Expiration Dates und Strike-Preise abgefragt,
-    sodass anschließend detaillierte Contract Details ermittelt werden können.
+    Die komplette Chain wird einmal je Underlying als OptionChainSnapshot geladen;
+    Expiration Dates, Strikes und Contract Details werden anschließend ohne weitere Broker-Abfragen beantwortet.
     """
-    def __init__(self, ib_instance: Ib):
+    def __init__(self, ib_instance: Ib, max_age=6 * 3600):
+        """
+        :param ib_instance: Instanz der Ib-Klasse.
+        :param max_age: Sekunden, nach denen ein Snapshot neu geladen wird.
+        """
         self.ib = ib_instance  # Instanz der Ib-Klasse
+        self.max_age = max_age
+        # normalisiertes Underlying -> OptionChainSnapshot
+        self.snapshots = {}
+        # normalisiertes Underlying -> laufender Ladevorgang, damit parallele Aufrufe nur einmal laden
+        self._loading = {}
+
+    async def get_snapshot(self, underlying: Contract, refresh=False):
+        """
+        Liefert den Snapshot der Option Chain, lädt ihn bei Bedarf (einmalig, auch bei parallelen Aufrufen).
+        """
+        key = normalize_contract(underlying)
+        snapshot = self.snapshots.get(key)
+        if snapshot is not None and not refresh and snapshot.age() < self.max_age:
+            return snapshot
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.ensure_future(self._load_snapshot(underlying, refresh))
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        snapshot = await asyncio.shield(task)
+        if self.snapshots.get(key) is not snapshot:
+            self.snapshots[key] = snapshot
+            self.ib.app.warm_start.record_chain(
+                underlying, snapshot.expirations, {expiration: snapshot.strikes(expiration) for expiration in snapshot.expirations}
+            )
+        return snapshot
+
+    async def _load_snapshot(self, underlying: Contract, refresh=False):
+        # Options-Template ohne Expiration, Strike und Right liefert die komplette Chain
+        option = Option(
+            symbol=underlying.symbol,
+            exchange=underlying.exchange,
+            currency=underlying.currency,
+            lastTradeDateOrContractMonth=""
+        )
+        details = await self.ib.fetch_contract_details(option, ttl=self.max_age, refresh=refresh)
+        return OptionChainSnapshot(details)
 
     async def fetch_available_expirations(self, underlying: Contract):
         """
@@ -217,16 +612,8 @@ class OptionChain:
         :return: Liste von Expiration Dates (als Strings).
         """
         try:
-            # Erzeugen eines Options-Templates ohne spezifiziertes Ablaufdatum
-            option = Option(
-                symbol=underlying.symbol,
-                exchange=underlying.exchange,
-                currency=underlying.currency,
-                lastTradeDateOrContractMonth=""
-            )
-            details = await self.ib.ib.reqContractDetailsAsync(option)
-            expirations = {d.contract.lastTradeDateOrContractMonth for d in details}
-            return sorted(list(expirations))
+            snapshot = await self.get_snapshot(underlying)
+            return list(snapshot.expirations)
         except Exception as e:
             print(f"Error fetching available expirations: {e}")
             return []
@@ -239,16 +626,8 @@ class OptionChain:
         :return: Liste von Strike-Preisen.
         """
         try:
-            option = Option(
-                symbol=underlying.symbol,
-                exchange=underlying.exchange,
-                currency=underlying.currency,
-                lastTradeDateOrContractMonth=expiration,
-                right=""  # Beide Optionstypen (Call & Put)
-            )
-            details = await self.ib.ib.reqContractDetailsAsync(option)
-            strikes = {d.contract.strike for d in details}
-            return sorted(list(strikes))
+            snapshot = await self.get_snapshot(underlying)
+            return snapshot.strikes(expiration)
         except Exception as e:
             print(f"Error fetching available strikes: {e}")
             return []
@@ -264,24 +643,8 @@ class OptionChain:
         :return: Liste von Contract Details für Optionen.
         """
         try:
-            option = Option(
-                symbol=underlying.symbol,
-                exchange=underlying.exchange,
-                currency=underlying.currency,
-                lastTradeDateOrContractMonth=expiration,
-                right=right if right in ["C", "P"] else ""
-            )
-            details = await self.ib.ib.reqContractDetailsAsync(option)
-            if strike_min is not None or strike_max is not None:
-                filtered = []
-                for d in details:
-                    if strike_min is not None and d.contract.strike < strike_min:
-                        continue
-                    if strike_max is not None and d.contract.strike > strike_max:
-                        continue
-                    filtered.append(d)
-                details = filtered
-            return details
+            snapshot = await self.get_snapshot(underlying)
+            return snapshot.query(expiration, strike_min, strike_max, right)
         except Exception as e:
             print(f"Error fetching option chain: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -0,0 +1,30 @@
+from services.persistence import TrackedSettings
+
+
+class IbSettings(TrackedSettings):
+    def __init__(self):
+        self.ip = "127.0.0.1"
+        self.port = 7496 #4001
+        self.clientId = 1
+        # Client-IDs der zusätzlichen Verbindungen; None bzw. die Haupt-ID legt den Verkehr auf die Streaming-Verbindung
+        self.pool_client_ids = {"historical": 2, "account": 3}
+        self.read_only = True
+        self.connect_at_startup = False
+        # Jeden Tick im Tick-Journal speichern (data/ticks); kostet Plattenplatz, daher standardmäßig aus
+        self.record_ticks = False
+        self.market_data_lines = 100
+        self.snapshot_lines = 10
+        self.snapshot_interval = 5.0
+        self.request_result_ttl = 1.0
+        self.auto_reconnect = True
+        self.reconnect_max_delay = 60.0
+        # IB-Verbindungen in einem eigenen Prozess betreiben (Ticks per Shared Memory an die GUI)
+        self.separate_process = False
+        # Verspätung des Event-Loops messen, der die IB-Sockets liest (weckt den Loop alle 100 ms, nur zur Diagnose)
+        self.monitor_loop_lag = False
+
+    def to_dict(self):
+        return self.__dict__
+
+    def update_from_dict(self, data):
+        self.__dict__.update(data)
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import deque
+from enum import IntEnum
+
+from services.broker.ib.request_scheduler import RequestLane
+
+
+class LinePriority(IntEnum):
+    """
+    Priorität eines Marktdaten-Abos; kleinere Werte werden zuerst mit einer Streaming-Leitung versorgt.
+    """
+    VISIBLE = 0  # Sichtbares Widget
+    ALERT = 1  # Alarm / Strategie
+    BACKGROUND = 2  # Watchlist im Hintergrund
+
+
+class MarketDataLineScheduler:
+    """
+    Verteilt das Budget an IB-Marktdatenleitungen auf die aktiven Abos.
+    Die wichtigsten Contracts (nach Priorität, dann Reihenfolge des Abos) erhalten eine Streaming-Leitung.
+    Alle übrigen Contracts werden reihum über Snapshot-Abfragen in einer kleinen Zahl reservierter Leitungen
+    aktualisiert, sodass kein Abo stillschweigend verloren geht.
+    """
+    def __init__(self, ib_instance, max_lines=100, snapshot_lines=10, snapshot_interval=5.0):
+        """
+        :param ib_instance: Instanz der Ib-Klasse.
+        :param max_lines: Anzahl der Marktdatenleitungen des Kontos.
+        :param snapshot_lines: Davon für Snapshot-Rotation reservierte Leitungen.
+        :param snapshot_interval: Sekunden zwischen zwei Rotationsrunden.
+        """
+        self.ib = ib_instance
+        self.max_lines = max_lines
+        self.snapshot_lines = snapshot_lines
+        self.snapshot_interval = snapshot_interval
+        self._rotation = deque()
+        self._rotation_task = None
+
+    @property
+    def stream_budget(self):
+        return max(self.max_lines - self.snapshot_lines, 0)
+
+    async def rebalance(self):
+        """
+        Ordnet die Streaming-Leitungen neu zu, nachdem Abos hinzugekommen, weggefallen oder umpriorisiert wurden.
+        """
+        subscriptions = self.ib.active_market_data
+        ranked = sorted(
+            subscriptions,
+            key=lambda key: (min(subscriptions[key]['priorities'].values()), subscriptions[key]['since'])
+        )
+        streaming = set(ranked[:self.stream_budget])
+
+        # Erst Leitungen freigeben, dann neue öffnen, damit das Limit nie überschritten wird
+        for key in ranked:
+            if key not in streaming and subscriptions[key]['mode'] == "stream":
+                print(f"Marktdaten für {subscriptions[key]['instrument'].symbol} werden auf Snapshot-Rotation umgestellt.")
+                await self.ib._close_line(key)
+        opening = []
+        for key in ranked:
+            if key in streaming and subscriptions[key]['mode'] != "stream":
+                opening.append(key)
+            elif key not in streaming:
+                subscriptions[key]['mode'] = "rotation"
+        # Neue Leitungen gemeinsam öffnen (z. B. alle Abos nach einem Reconnect)
+        await asyncio.gather(*(self.ib._open_line(key) for key in opening))
+
+        # Enthält auch Contracts, deren Leitung sich nicht öffnen ließ
+        self._rotation = deque(key for key in ranked if subscriptions[key]['mode'] == "rotation")
+        if self._rotation and (self._rotation_task is None or self._rotation_task.done()):
+            self._rotation_task = asyncio.create_task(self._rotate())
+
+    async def _rotate(self):
+        """
+        Aktualisiert die nicht gestreamten Contracts reihum per Snapshot.
+        """
+        while self._rotation:
+            started = time.monotonic()
+            batch = []
+            for _ in range(min(len(self._rotation), max(self.snapshot_lines, 1))):
+                key = self._rotation.popleft()
+                self._rotation.append(key)
+                batch.append(key)
+            subscriptions = self.ib.active_market_data
+            batch = [key for key in batch if key in subscriptions and subscriptions[key]['mode'] == "rotation"]
+            if batch and self.ib.is_connected():
+                try:
+                    contracts = [subscriptions[key]['instrument'] for key in batch]
+                    tickers = await self.ib._request(
+                        "snapshot", lambda ib: ib.reqTickersAsync(*contracts), RequestLane.BACKGROUND
+                    )
+                    for key, ticker in zip(batch, tickers):
+                        subscriptions[key]['last_snapshot'] = time.time()
+                        self.ib._market_data_callback(key, ticker)
+                except Exception as e:
+                    print(f"Error requesting market data snapshots: {e}")
+            await asyncio.sleep(max(self.snapshot_interval - (time.monotonic() - started), 0))
+
+    def status(self):
+        """
+        Liefert eine Übersicht über die Leitungsbelegung.
+        :return: Dictionary mit Anzahl gestreamter und rotierender Contracts sowie der Zykluszeit der Rotation.
+        """
+        modes = [subscription['mode'] for subscription in self.ib.active_market_data.values()]
+        rotating = modes.count("rotation")
+        batch = max(self.snapshot_lines, 1)
+        return {
+            'max_lines': self.max_lines,
+            'streaming': modes.count("stream"),
+            'rotating': rotating,
+            # Ungefähre Zeit, bis jeder rotierende Contract einmal aktualisiert wurde
+            'rotation_cycle_seconds': -(-rotating // batch) * self.snapshot_interval,
+        }
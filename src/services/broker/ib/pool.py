@@ -0,0 +1,79 @@
+import asyncio
+
+from ib_async import IB
+
+from services.broker.ib.connection import ConnectionManager
+
+# Anfrageklasse des Request-Schedulers -> Verkehrsklasse bzw. Verbindung des Pools
+TRAFFIC_CLASSES = {
+    "historical_fine": "historical",
+    "historical": "historical",
+    "contract": "historical",
+    "snapshot": "streaming",
+    "account": "account",
+}
+
+
+class ConnectionPool:
+    """
+    Verteilt den Verkehr zu IB auf mehrere Verbindungen mit eigenen Client-IDs:
+    Live-Marktdaten ("streaming"), historische und Referenzdaten ("historical") sowie Konto und Orders ("account").
+    Ein großer Backfill belegt dadurch nicht den Socket, über den die Live-Ticks kommen.
+    Ist eine zusätzliche Verbindung nicht konfiguriert oder getrennt, läuft ihr Verkehr über die Streaming-Verbindung.
+    """
+    def __init__(self, ib_instance, primary):
+        """
+        :param ib_instance: Instanz der Ib-Klasse.
+        :param primary: ConnectionManager der Streaming-Verbindung.
+        """
+        self.ib = ib_instance
+        self.primary = primary
+        self.members = {primary.name: primary}
+        settings = ib_instance.setting.broker.ib
+        for name, client_id in settings.pool_client_ids.items():
+            if client_id is None or client_id == settings.clientId:
+                continue
+            self.members[name] = ConnectionManager(
+                ib_instance, IB(), client_id, name, max_delay=settings.reconnect_max_delay
+            )
+
+    def member(self, traffic_class):
+        member = self.members.get(traffic_class)
+        if member is None or not member.client.isConnected():
+            return self.primary
+        return member
+
+    async def call(self, traffic_class, factory):
+        """
+        Führt eine Anfrage über die Verbindung der Verkehrsklasse aus. Die Verbindung wird erst bei der
+        Ausführung gewählt, sodass zwischenzeitlich getrennte Verbindungen übersprungen werden.
+        :param factory: Funktion client -> Coroutine der Anfrage.
+        """
+        return await self.member(traffic_class).call(factory)
+
+    async def connect_secondary(self):
+        """
+        Verbindet alle zusätzlichen Verbindungen parallel. Wird nach jedem Verbindungsaufbau der Streaming-Verbindung
+        aufgerufen; Verbindungen, die bereits stehen oder selbst einen Reconnect versuchen, bleiben unberührt.
+        """
+        await asyncio.gather(*(
+            member.connect() for member in self.members.values()
+            if member is not self.primary and member.state == "disconnected"
+        ))
+
+    def disconnect(self):
+        for member in self.members.values():
+            member.disconnect()
+
+    def status(self):
+        """
+        Liefert je Verbindung Zustand, Latenzen und die beim Request-Scheduler wartenden Anfragen.
+        """
+        scheduler = self.ib.request_scheduler.status()
+        status = {}
+        for name, member in self.members.items():
+            status[name] = member.status()
+            classes = [c for c, traffic in TRAFFIC_CLASSES.items() if traffic == name and c in scheduler]
+            status[name]['queued'] = sum(sum(scheduler[c]['pending'].values()) for c in classes)
+            status[name]['max_wait'] = max((scheduler[c]['max_wait'] for c in classes), default=0.0)
+        return status
@@ -0,0 +1,274 @@
+import asyncio
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PySide6.QtCore import QTimer
+
+from services.broker.ib import broker_process
+from services.broker.ib.ib import Ib
+from services.broker.ib.pool import TRAFFIC_CLASSES
+from services.broker.ib.request_scheduler import RequestLane
+from services.broker.ib.tick_ring import TickRing, tick_dict
+
+# Neue Ticks meldet der Broker-Prozess per Pipe ("ticks"); das Abfrageintervall in Millisekunden ist nur ein
+# Sicherheitsnetz, falls ein Wecksignal verloren geht
+FALLBACK_POLL_INTERVAL = 100
+
+
+class BrokerProcess:
+    """
+    Startet den Broker-Prozess und stellt den Befehlskanal (Pipe) sowie den Tick-Ringpuffer bereit.
+    Antworten und Ereignisse des Prozesses werden von einem Thread empfangen und im Event-Loop zugestellt.
+    """
+    def __init__(self, settings, on_event, capacity=65536):
+        """
+        :param settings: IbSettings als Dictionary.
+        :param on_event: Funktion (Name, Daten) für Ereignisse des Prozesses (connected, disconnected, error, exited).
+        :param capacity: Anzahl der Records im Tick-Ringpuffer.
+        """
+        self.settings = settings
+        self.on_event = on_event
+        self.capacity = capacity
+        self.process = None
+        self.ring = None
+        self.conn = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        self.loop = asyncio.get_event_loop()
+        # "spawn", damit der Broker-Prozess keinen Qt-Zustand der GUI erbt
+        context = multiprocessing.get_context("spawn")
+        self.ring = TickRing(capacity=self.capacity, create=True)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=broker_process.main, args=(dict(self.settings), self.ring.name, child_conn),
+            name="ib-broker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        threading.Thread(target=self._read_responses, name="broker-responses", daemon=True).start()
+
+    async def call(self, command, **args):
+        """
+        Schickt einen Befehl an den Broker-Prozess und wartet auf die Antwort.
+        """
+        if not self.running:
+            raise RuntimeError("Broker-Prozess läuft nicht.")
+        msg_id = next(self._ids)
+        future = self.loop.create_future()
+        self._pending[msg_id] = future
+        self.conn.send((msg_id, command, args))
+        try:
+            return await future
+        finally:
+            self._pending.pop(msg_id, None)
+
+    def _read_responses(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                self.loop.call_soon_threadsafe(self._on_exit)
+                return
+            self.loop.call_soon_threadsafe(self._on_message, message)
+
+    def _on_message(self, message):
+        msg_id, ok, result = message
+        if msg_id is None:
+            # Ereignis: ok ist der Name, result die Daten
+            self.on_event(ok, result)
+            return
+        future = self._pending.pop(msg_id, None)
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(result)
+        else:
+            future.set_exception(RuntimeError(result))
+
+    def _on_exit(self):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Broker-Prozess beendet."))
+        self._pending.clear()
+        self.on_event("exited", None)
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            try:
+                self.conn.send((None, "shutdown", {}))
+            except OSError:
+                pass
+            self.process.join(2)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.conn.close()
+        self.ring.close()
+        self.ring.unlink()
+        self.ring = None
+        self.process = None
+
+
+class RemoteClient:
+    """
+    Stellvertreter eines IB-Clients im Broker-Prozess: Jeder Methodenaufruf wird als Befehl übertragen
+    und liefert eine Coroutine mit dem Ergebnis.
+    """
+    def __init__(self, process, traffic_class):
+        self.process = process
+        self.traffic_class = traffic_class
+
+    def __getattr__(self, method):
+        return lambda *args, **kwargs: self.process.call(
+            "call", traffic=self.traffic_class, method=method, args=args, kwargs=kwargs
+        )
+
+
+class RemoteIb(Ib):
+    """
+    Ib mit den IB-Verbindungen in einem eigenen Prozess (IbSettings.separate_process).
+    Der Socket wird dort unabhängig von der Last der GUI gelesen; Ticks kommen über einen Ringpuffer
+    im Shared Memory, alle übrigen Anfragen über eine Pipe. Request-Scheduler, Caches, Datastore und
+    Leitungsbudget arbeiten unverändert im GUI-Prozess.
+    """
+    def _init_connections(self):
+        self.ib = None
+        self.process = BrokerProcess(self.setting.broker.ib.to_dict(), self._on_process_event)
+        self.clients = {traffic: RemoteClient(self.process, traffic) for traffic in set(TRAFFIC_CLASSES.values())}
+        # Slot (line_id) -> normalisierter Contract
+        self._slots = {}
+        self._connected = False
+        # Sekunden vom Schreiben im Broker-Prozess bis zur Zustellung in der GUI
+        self.transport_latency = deque(maxlen=10000)
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self._poll_ticks)
+
+    def is_connected(self):
+        return self._connected
+
+    async def connect(self):
+        # Die IB-Sockets liest der Broker-Prozess; dort wird auch die Verspätung seines Event-Loops gemessen
+        if not self.process.running:
+            self.process.start()
+            self.timer.start(FALLBACK_POLL_INTERVAL)
+            self._poll_ticks()
+        self._connected = await self.process.call("connect")
+        return self._connected
+
+    def disconnect(self):
+        self.contract_cache.save()
+        self.timer.stop()
+        self.process.stop()
+        self._connected = False
+
+    async def _request(self, request_class, factory, lane=RequestLane.INTERACTIVE, owner=None):
+        return await self.request_scheduler.submit(
+            request_class, lambda: factory(self.clients[TRAFFIC_CLASSES[request_class]]), lane, owner
+        )
+
+    async def _historical_request(self, client, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth):
+        # Fehler und reqId der Abfrage sind nur im Broker-Prozess bekannt; er liefert das Kennzeichen complete mit
+        return await self.process.call(
+            "historical", traffic=client.traffic_class, contract=instrument, end_datetime=end_datetime,
+            duration_str=duration_str, bar_size=bar_size, what_to_show=what_to_show, use_rth=use_rth
+        )
+
+    def _on_process_event(self, name, payload):
+        if name == "connected":
+            member, reconnected = payload
+            if member == "streaming":
+                self._connected = True
+                asyncio.ensure_future(self._after_connect(reconnected))
+        elif name == "ticks":
+            self._poll_ticks()
+        elif name == "disconnected":
+            self._connected = False
+        elif name == "error":
+            self._on_ib_error(*payload, None)
+        elif name == "exited":
+            self._connected = False
+            print("Broker-Prozess wurde beendet.")
+
+    def _tick_writer(self, instrument):
+        # Ticks werden im Broker-Prozess aufgezeichnet
+        return None
+
+    def _market_data_callback(self, key, data):
+        # Ticks und Snapshots kommen bereits als einheitliche Dictionaries aus dem Broker-Prozess
+        subscription = self.active_market_data.get(key)
+        if subscription is not None:
+            self._publish(key, subscription, data)
+
+    async def _open_line(self, key):
+        subscription = self.active_market_data[key]
+        slot = subscription['line_id']
+        try:
+            await self.process.call("subscribe", slot=slot, contract=subscription['instrument'])
+            self._slots[slot] = key
+            subscription['mode'] = "stream"
+        except Exception as e:
+            print(f"Error subscribing to market data for request_id {slot}: {e}")
+            subscription['mode'] = "rotation"
+
+    async def _close_line(self, key):
+        subscription = self.active_market_data[key]
+        subscription['mode'] = "rotation"
+        slot = subscription['line_id']
+        if self._slots.pop(slot, None) is None:
+            return
+        try:
+            await self.process.call("unsubscribe", slot=slot)
+        except Exception as e:
+            print(f"Error unsubscribing market data for request_id {slot}: {e}")
+
+    def _poll_ticks(self):
+        """
+        Liest neue Ticks aus dem Ringpuffer und verteilt sie an die Observer.
+        Wird vom Wecksignal des Broker-Prozesses ausgelöst; danach wartet der Leser auf das nächste Signal.
+        """
+        ring = self.process.ring
+        if ring is None:
+            return
+        ring.request_signal()
+        batch = ring.read()
+        if not len(batch):
+            return
+        self.transport_latency.extend(((time.time_ns() - batch["sent"]) / 1e9).tolist())
+        for _, slot, kind, time_ns, _, bid, ask, last, bid_size, ask_size, last_size, volume in batch.tolist():
+            key = self._slots.get(slot)
+            if key is not None:
+                self._market_data_callback(key, tick_dict(kind, time_ns, bid, ask, last, bid_size, ask_size, last_size, volume))
+
+    def latency_status(self):
+        """
+        Ergänzt die Kennzahlen um die Übertragungszeit der Ticks aus dem Broker-Prozess und verlorene Ticks.
+        Die Verspätung des Broker-Prozesses selbst liefert broker_status().
+        """
+        status = super().latency_status()
+        samples = np.fromiter(self.transport_latency, dtype=float)
+        status['transport'] = {
+            'samples': len(samples),
+            'avg': float(samples.mean()) if len(samples) else 0.0,
+            'p99': float(np.percentile(samples, 99)) if len(samples) else 0.0,
+            'max': float(samples.max()) if len(samples) else 0.0,
+        }
+        status['lost_ticks'] = self.process.ring.lost if self.process.ring is not None else 0
+        return status
+
+    async def broker_status(self):
+        """
+        :return: Verspätung des Event-Loops im Broker-Prozess und Zustand seiner Verbindungen.
+        """
+        return await self.process.call("status")
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+
+
+class RequestLane(IntEnum):
+    """
+    Priorität einer Broker-Anfrage; kleinere Werte werden zuerst bedient.
+    """
+    INTERACTIVE = 0  # Ein Widget wartet auf das Ergebnis
+    BACKGROUND = 1  # Backfill, Snapshot-Rotation, Vorladen
+
+
+# Anfrageklasse -> (Tokens pro Sekunde, Burst, maximal gleichzeitig laufende Anfragen).
+# "historical_fine" gilt für Barsizes bis 30 Sekunden: IB erlaubt dort höchstens 60 Abfragen in 10 Minuten,
+# daher gilt Burst + Rate * 600 <= 60, und höchstens 5 Abfragen desselben Contracts innerhalb von 2 Sekunden
+# (ab der sechsten droht eine Pacing Violation), daher Burst <= 5. Gröbere Barsizes werden von IB nur weich gedrosselt.
+REQUEST_CLASSES = {
+    "historical_fine": (55 / 600, 5, 5),
+    "historical": (1.0, 10, 50),
+    "contract": (10.0, 20, 20),
+    "snapshot": (20.0, 50, 50),
+    "account": (1.0, 2, 1),
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def delay(self):
+        """
+        :return: Sekunden, bis ein Token verfügbar ist (0, wenn sofort).
+        """
+        now = self._refill()
+        wait = max(self.paused_until - now, 0.0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        """
+        Leert den Bucket und sperrt ihn, z. B. nach einer Pacing Violation.
+        """
+        self._refill()
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RequestClassQueue:
+    """
+    Warteschlange einer Anfrageklasse: Priorität nach Lane, innerhalb einer Lane reihum nach Eigentümer
+    (z. B. Contract), sodass ein großer Backfill nicht alle anderen Instrumente aushungert.
+    """
+    def __init__(self, name, rate, capacity, max_concurrent):
+        self.name = name
+        self.bucket = TokenBucket(rate, capacity)
+        self.max_concurrent = max_concurrent
+        # Lane -> OrderedDict(Eigentümer -> deque[Job])
+        self.lanes = {lane: OrderedDict() for lane in RequestLane}
+        self.running = 0
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    def pending(self, lane=None):
+        lanes = self.lanes.values() if lane is None else (self.lanes[lane],)
+        return sum(len(jobs) for owners in lanes for jobs in owners.values())
+
+    def push(self, job, lane, owner):
+        self.lanes[lane].setdefault(owner, deque()).append(job)
+        self.submitted += 1
+        self.wakeup.set()
+
+    def pop(self):
+        for lane in RequestLane:
+            owners = self.lanes[lane]
+            if owners:
+                owner, jobs = next(iter(owners.items()))
+                job = jobs.popleft()
+                # Eigentümer ans Ende, damit der nächste an die Reihe kommt
+                del owners[owner]
+                if jobs:
+                    owners[owner] = jobs
+                return job
+        return None
+
+
+class RequestScheduler:
+    """
+    Zentrale Ablaufsteuerung für Anfragen an IB. Jede Anfrageklasse hat einen eigenen Token Bucket
+    und eine Obergrenze für gleichzeitig laufende Anfragen, sodass die Pacing-Limits von IB eingehalten werden,
+    auch wenn viele Widgets gleichzeitig laden. Interaktive Anfragen werden vor Hintergrundarbeit bedient.
+    """
+    def __init__(self, classes=None):
+        self.queues = {
+            name: RequestClassQueue(name, *limits) for name, limits in (classes or REQUEST_CLASSES).items()
+        }
+
+    async def submit(self, request_class, factory, lane=RequestLane.INTERACTIVE, owner=None):
+        """
+        Reiht eine Anfrage ein und wartet auf ihr Ergebnis.
+        :param request_class: Schlüssel aus REQUEST_CLASSES.
+        :param factory: Funktion ohne Argumente, die die Coroutine der eigentlichen Anfrage liefert.
+        :param lane: RequestLane der Anfrage.
+        :param owner: Eigentümer für die faire Reihenfolge innerhalb der Lane (z. B. normalisierter Contract).
+        """
+        queue = self.queues[request_class]
+        future = asyncio.get_event_loop().create_future()
+        queue.push((time.monotonic(), factory, future), lane, owner)
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.ensure_future(self._pump(queue))
+        return await future
+
+    async def _pump(self, queue):
+        while queue.pending():
+            if queue.running >= queue.max_concurrent:
+                queue.wakeup.clear()
+                await queue.wakeup.wait()
+                continue
+            delay = queue.bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            job = queue.pop()
+            enqueued, factory, future = job
+            if future.done():
+                # Aufrufer hat inzwischen abgebrochen
+                continue
+            queue.bucket.take()
+            wait = time.monotonic() - enqueued
+            queue.last_wait = wait
+            queue.total_wait += wait
+            queue.max_wait = max(queue.max_wait, wait)
+            queue.running += 1
+            asyncio.ensure_future(self._execute(queue, factory, future))
+
+    async def _execute(self, queue, factory, future):
+        try:
+            result = await factory()
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            queue.running -= 1
+            queue.completed += 1
+            queue.wakeup.set()
+
+    def penalize(self, request_class, seconds):
+        """
+        Sperrt eine Anfrageklasse, z. B. nachdem IB eine Pacing Violation gemeldet hat.
+        """
+        queue = self.queues.get(request_class)
+        if queue is not None:
+            queue.bucket.pause(seconds)
+
+    def status(self):
+        """
+        Liefert je Anfrageklasse die wartenden Anfragen pro Lane, die laufenden Anfragen und die Wartezeiten in Sekunden.
+        """
+        status = {}
+        for name, queue in self.queues.items():
+            started = max(queue.completed + queue.running, 1)
+            status[name] = {
+                'pending': {lane.name.lower(): queue.pending(lane) for lane in RequestLane},
+                'running': queue.running,
+                'submitted': queue.submitted,
+                'last_wait': queue.last_wait,
+                'avg_wait': queue.total_wait / started,
+                'max_wait': queue.max_wait,
+                'paused_for': max(queue.bucket.paused_until - time.monotonic(), 0.0),
+            }
+        return status
@@ -0,0 +1,130 @@
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from services.market_data.ticks import QUOTE, TRADE, tick
+
+# Header: Anzahl geschriebener Records, Kapazität, danach das Flag "Leser wartet auf ein Wecksignal"
+HEADER = struct.Struct("<QQ")
+HEADER_SIZE = 64
+WAITING_OFFSET = HEADER.size
+
+# Art eines Records
+KIND_QUOTE = 0  # Stand des Tickers nach einem Update
+KIND_TRADE = 1  # Einzelner Trade (Preis in last, Größe in last_size)
+
+# Record: Sequenznummer, Slot (Abo), Art, Zeit des Ticks (ns), Zeitpunkt des Schreibens (ns),
+# bid, ask, last, bidSize, askSize, lastSize, volume
+RECORD = struct.Struct("<Qiiqqddddddd")
+RECORD_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("slot", "<i4"),
+    ("kind", "<i4"),
+    ("time", "<i8"),
+    ("sent", "<i8"),
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+    ("last", "<f8"),
+    ("bid_size", "<f8"),
+    ("ask_size", "<f8"),
+    ("last_size", "<f8"),
+    ("volume", "<f8"),
+])
+SEQ = struct.Struct("<Q")
+
+
+class TickRing:
+    """
+    Ringpuffer für normalisierte Ticks im Shared Memory, mit genau einem schreibenden und einem lesenden Prozess.
+    Der lesende Prozess legt den Block an und gibt ihn wieder frei, der schreibende hängt sich nur an.
+    Der Schreiber überschreibt bei Überlauf die ältesten Records und wartet nie auf den Leser.
+    Jeder Record trägt seine Sequenznummer; der Leser erkennt daran überschriebene und während des Lesens
+    veränderte Records und zählt sie als verloren.
+    Statt ständig zu pollen, setzt der Leser nach dem Leeren des Puffers ein Flag; der Schreiber sieht es beim
+    nächsten Record und weckt den Leser (über einen beliebigen Kanal, z. B. die Pipe des Broker-Prozesses).
+    """
+    def __init__(self, name=None, capacity=65536, create=False):
+        """
+        :param name: Name des Shared-Memory-Blocks (beim Anlegen optional).
+        :param capacity: Anzahl der Records (nur beim Anlegen).
+        :param create: True im Prozess, der den Block anlegt.
+        """
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity * RECORD.size)
+            HEADER.pack_into(self.shm.buf, 0, 0, capacity)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            _, capacity = HEADER.unpack_from(self.shm.buf, 0)
+        self.name = self.shm.name
+        self.capacity = capacity
+        self.records = np.ndarray(capacity, dtype=RECORD_DTYPE, buffer=self.shm.buf, offset=HEADER_SIZE)
+        self._written = HEADER.unpack_from(self.shm.buf, 0)[0]
+        self._read = self._written
+        self.lost = 0
+
+    def write(self, slot, kind, time_ns, bid, ask, last, bid_size, ask_size, last_size, volume):
+        seq = self._written + 1
+        offset = HEADER_SIZE + (seq - 1) % self.capacity * RECORD.size
+        buf = self.shm.buf
+        # Sequenznummer zuerst ungültig machen, damit der Leser einen halb geschriebenen Record erkennt
+        SEQ.pack_into(buf, offset, 0)
+        RECORD.pack_into(
+            buf, offset, 0, slot, kind, time_ns, time.time_ns(), bid, ask, last, bid_size, ask_size, last_size, volume
+        )
+        SEQ.pack_into(buf, offset, seq)
+        SEQ.pack_into(buf, 0, seq)
+        self._written = seq
+
+    def request_signal(self):
+        """
+        Leser: Bittet um ein Wecksignal beim nächsten geschriebenen Record. Vor dem Lesen aufrufen,
+        damit kein Record zwischen Lesen und Warten unbemerkt bleibt.
+        """
+        SEQ.pack_into(self.shm.buf, WAITING_OFFSET, 1)
+
+    def take_signal(self):
+        """
+        Schreiber: True, wenn der Leser auf ein Wecksignal wartet; das Flag wird dabei zurückgesetzt.
+        """
+        if not SEQ.unpack_from(self.shm.buf, WAITING_OFFSET)[0]:
+            return False
+        SEQ.pack_into(self.shm.buf, WAITING_OFFSET, 0)
+        return True
+
+    def read(self, max_records=None):
+        """
+        Liest alle seit dem letzten Aufruf geschriebenen Records.
+        :return: numpy Array mit RECORD_DTYPE.
+        """
+        written = SEQ.unpack_from(self.shm.buf, 0)[0]
+        if written - self._read > self.capacity:
+            # Der Schreiber hat den Leser überrundet
+            self.lost += written - self._read - self.capacity
+            self._read = written - self.capacity
+        end = written if max_records is None else min(written, self._read + max_records)
+        if end <= self._read:
+            return self.records[:0].copy()
+        expected = np.arange(self._read + 1, end + 1, dtype=np.uint64)
+        index = (expected - 1) % self.capacity
+        batch = self.records[index]
+        # Records, die während des Kopierens überschrieben wurden, haben eine andere Sequenznummer
+        valid = (batch["seq"] == expected) & (self.records["seq"][index] == expected)
+        self.lost += int(len(batch) - valid.sum())
+        self._read = end
+        return batch[valid]
+
+    def close(self):
+        self.records = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def tick_dict(kind, time_ns, bid, ask, last, bid_size, ask_size, last_size, volume):
+    """
+    Wandelt einen Record in das einheitliche Marktdaten-Update um (siehe services.market_data.ticks.tick).
+    """
+    return tick(TRADE if kind == KIND_TRADE else QUOTE, time_ns / 1e9, bid, ask, last, bid_size, ask_size, last_size, volume)
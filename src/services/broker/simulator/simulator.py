@@ -1,17 +1,18 @@
 import asyncio
 import datetime
+import time
 from PySide6.QtWidgets import QApplication
 
-class SimulatorSettings:
-    def __init__(self):
-        self.read_only = True
+from services.broker.contracts import normalize_contract
+from services.broker.historical import (
+    bar_size_seconds, duration_seconds, read_through, table_to_rows, to_timestamp, utc_offset
+)
+from services.market_data.dispatch import DispatchPolicy
+from services.market_data.ticks import QUOTE, TRADE, tick
 
-    def to_dict(self):
-        return self.__dict__
+# Ablage der simulierten Bars, getrennt vom Datastore der echten Broker (data/bars)
+SIMULATOR_BAR_ROOT = "data/bars-sim"
 
-    def update_from_dict(self, data):
-        self.__dict__.update(data)
-        
 class Simulator:
     """
     Simulierter Broker, der dieselbe Schnittstelle wie Ib implementiert.
@@ -21,10 +22,20 @@ class Simulator:
         self.app = QApplication.instance()
         self.setting = self.app.settings
         self.active_market_data = {}
+        # Eigener Bar-Speicher, damit Dummy-Bars nie als echte Historie im gemeinsamen Datastore landen
+        self._bar_store = None
         # Simuliere eine schnelle Verbindung
         #asyncio.create_task(self.connect())
         self.connect()
 
+    @property
+    def bar_store(self):
+        if self._bar_store is None:
+            # Erst bei der ersten historischen Abfrage laden (pyarrow), wie app.bar_store
+            from database.datastore import BarStore
+            self._bar_store = BarStore(SIMULATOR_BAR_ROOT)
+        return self._bar_store
+
     async def connect(self):
         await asyncio.sleep(0.1)
         print("Simulator connected.")
@@ -34,53 +45,90 @@ class Simulator:
         print("Simulator disconnected.")
 
     # --- Live Market Data Methoden ---
-    async def subscribe_market_data(self, instrument, callback, request_id):
-        if request_id in self.active_market_data:
-            self.active_market_data[request_id]['observers'].append(callback)
+    async def subscribe_market_data(self, instrument, callback, request_id, priority=None, conflate=True,
+                                    policy=DispatchPolicy.DROP_OLDEST, executor=None):
+        if not conflate:
+            callback = self.app.dispatcher.channel(callback, policy=policy, executor=executor)
         else:
+            self.app.warm_start.deliver(instrument, callback)
+        if request_id not in self.active_market_data:
             self.active_market_data[request_id] = {
                 'instrument': instrument,
-                'observers': [callback]
+                'key': normalize_contract(instrument),
+                'observers': [],
+                'conflated': []
             }
             asyncio.create_task(self._simulate_market_data(request_id))
+        self.active_market_data[request_id]['conflated' if conflate else 'observers'].append(callback)
 
     async def _simulate_market_data(self, request_id):
         while request_id in self.active_market_data:
-            data = {"price": 100.0, "volume": 10}  # Dummy-Daten
-            for observer in self.active_market_data[request_id]['observers']:
-                try:
-                    observer(data)
-                except Exception as e:
-                    print(f"Simulator observer error: {e}")
+            subscription = self.active_market_data[request_id]
+            # Dummy-Daten im selben Format wie bei IB: ein Trade, danach der Stand des Instruments
+            now = time.time()
+            for data in (tick(TRADE, now, last=100.0, last_size=10), tick(QUOTE, now, 99.9, 100.1, 100.0, volume=10)):
+                self.app.warm_start.record_quote(subscription['key'], data)
+                for channel in subscription['observers']:
+                    channel.publish(data)
+                if subscription['conflated']:
+                    self.app.conflator.publish(request_id, data, subscription['conflated'])
             await asyncio.sleep(1)
 
     async def unsubscribe_market_data(self, request_id):
         if request_id in self.active_market_data:
-            del self.active_market_data[request_id]
+            for channel in self.active_market_data.pop(request_id)['observers']:
+                self.app.dispatcher.close(channel)
+            self.app.conflator.discard(request_id)
             print(f"Simulator unsubscribed market data for request_id {request_id}")
         else:
             print(f"No active subscription in simulator for request_id {request_id}")
 
     # --- Historische Daten ---
     async def fetch_historical_data(self, instrument, end_datetime: datetime.datetime, duration_str: str, bar_size: str, what_to_show="MIDPOINT", use_rth=False):
+        try:
+            table = await read_through(
+                self.bar_store, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth,
+                self._simulate_historical_data, self._exchange_utc_offset
+            )
+        except ValueError as e:
+            # Nicht speicherbare Barsizes (z. B. "tick") oder ungültige Durations
+            print(f"Simulator: historical data not available: {e}")
+            return None
+        if table is None:
+            return None
+        return table_to_rows(table, bar_size)
+
+    async def _exchange_utc_offset(self, instrument, timestamp):
+        # Ohne Contract Details gilt die Zeitzone der simulierten Börse (wie timeZoneId bei IB)
+        return utc_offset(self.setting.broker.simulator.time_zone, timestamp)
+
+    async def _simulate_historical_data(self, instrument, end_datetime, duration_str, bar_size, what_to_show, use_rth):
         await asyncio.sleep(0.1)
-        # Rückgabe von Dummy-Historischen Daten
+        # Rückgabe von Dummy-Historischen Daten: eine Bar pro Intervall im angefragten Zeitraum
+        step = bar_size_seconds(bar_size)
+        end = to_timestamp(end_datetime) // step * step
+        start = end - duration_seconds(duration_str)
         return [{
-            "date": end_datetime.strftime("%Y%m%d"),
+            "date": datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc),
             "open": 100,
             "high": 105,
             "low": 95,
-            "close": 102
-        }]
+            "close": 102,
+            "volume": 10
+        } for ts in range(start, end, step)]
 
     # --- Konto- und Portfoliodaten ---
     async def fetch_account_info(self):
         await asyncio.sleep(0.1)
-        return {"account": "SIM123", "balance": 10000}
+        account_info = {"account": "SIM123", "balance": 10000}
+        self.app.warm_start.record("account", account_info)
+        return account_info
 
     async def fetch_portfolio(self):
         await asyncio.sleep(0.1)
-        return [{"symbol": "SIM_STOCK", "position": 50, "avg_cost": 100}]
+        portfolio = [{"symbol": "SIM_STOCK", "position": 50, "avg_cost": 100}]
+        self.app.warm_start.record("portfolio", portfolio)
+        return portfolio
 
     # --- OptionChain Interface ---
     async def fetch_available_expirations(self, underlying):
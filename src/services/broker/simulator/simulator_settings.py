@@ -0,0 +1,14 @@
+from services.persistence import TrackedSettings
+
+
+class SimulatorSettings(TrackedSettings):
+    def __init__(self):
+        self.read_only = True
+        # Zeitzone der simulierten Börse für das Raster abgeleiteter Tages- und Stundenbars
+        self.time_zone = "US/Eastern"
+
+    def to_dict(self):
+        return self.__dict__
+
+    def update_from_dict(self, data):
+        self.__dict__.update(data)
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+
+class SingleFlight:
+    """
+    Fasst gleichzeitige, identische Anfragen zu einer einzigen zusammen.
+    Solange eine Anfrage zu einem Schlüssel läuft, warten weitere Aufrufer auf dasselbe Ergebnis,
+    statt selbst eine Anfrage an den Broker zu schicken. Optional bleibt das Ergebnis ttl Sekunden gültig.
+    Alle Aufrufer erhalten dasselbe Ergebnisobjekt.
+    """
+    def __init__(self):
+        # Schlüssel -> laufender Task
+        self._inflight = {}
+        # Schlüssel -> (gültig bis, Ergebnis)
+        self._results = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.cached = 0
+
+    async def do(self, key, factory, ttl=0.0):
+        """
+        :param key: Hashbarer Schlüssel aus den normalisierten Anfrageparametern.
+        :param factory: Funktion ohne Argumente, die die Coroutine der eigentlichen Anfrage liefert.
+        :param ttl: Sekunden, die ein Ergebnis (außer None) nach Abschluss wiederverwendet wird.
+        """
+        self.calls += 1
+        result = self._results.get(key)
+        if result is not None:
+            if result[0] > time.monotonic():
+                self.cached += 1
+                return result[1]
+            del self._results[key]
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda t: self._on_done(key, t, ttl))
+        else:
+            self.coalesced += 1
+        # Bricht ein Aufrufer ab, läuft die Anfrage für die übrigen weiter
+        return await asyncio.shield(task)
+
+    def _on_done(self, key, task, ttl):
+        self._inflight.pop(key, None)
+        if ttl > 0 and not task.cancelled() and task.exception() is None and task.result() is not None:
+            entry = self._results[key] = (time.monotonic() + ttl, task.result())
+            # Abgelaufene Ergebnisse auch dann freigeben, wenn der Schlüssel nie wieder angefragt wird
+            asyncio.get_event_loop().call_later(ttl, self._expire, key, entry)
+
+    def _expire(self, key, entry):
+        if self._results.get(key) is entry:
+            del self._results[key]
+
+    def invalidate(self, key=None):
+        """
+        Verwirft zwischengespeicherte Ergebnisse eines Schlüssels bzw. alle.
+        """
+        if key is None:
+            self._results.clear()
+        else:
+            self._results.pop(key, None)
+
+    def status(self):
+        return {
+            'in_flight': len(self._inflight),
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'cached': self.cached,
+            'results': len(self._results),
+        }
@@ -1,28 +1,85 @@
+import importlib
+
 from PySide6.QtWidgets import QApplication
-from services.broker.ib.ib import Ib
-from services.broker.simulator.simulator import Simulator
+from core.startup import timeline
+
+# Dienste der Application (app.bar_store usw.), die erst beim ersten Zugriff geladen und angelegt werden:
+# Name -> (Modul, Klasse). Der Bar-Speicher allein lädt pyarrow (~150 ms), was beim Start nicht nötig ist.
+SERVICES = {
+    # Gemeinsamer Bar-Speicher für alle Broker (Read-Through-Cache für historische Daten)
+    "bar_store": ("database.datastore", "BarStore"),
+    # Tick-Journale für Live-Daten (Replay, Rekonstruktion von Bars nach Abstürzen)
+    "tick_recorder": ("database.tick_journal", "TickRecorder"),
+    # Lokale Echtzeit-Bars aus dem Tick-Strom
+    "bar_builder": ("services.market_data.bar_builder", "BarBuilderService"),
+    # Verdichtet Live-Updates auf höchstens ein Update pro Frame für die Widgets
+    "conflator": ("services.market_data.conflation", "TickConflator"),
+    # Eigene, begrenzte Queues für Verbraucher, die jeden Tick erhalten
+    "dispatcher": ("services.market_data.dispatch", "ObserverDispatcher"),
+    # Letzter bekannter Zustand aus der vorigen Sitzung, sichtbar bevor der Broker verbunden ist
+    "warm_start": ("services.market_data.warm_start", "WarmStartCache"),
+}
+
+# Aufräumen beim Beenden: Name -> Methode; nie benutzte Dienste werden dafür nicht erst angelegt
+SHUTDOWN = (
+    ("tick_recorder", "close"),
+    ("bar_builder", "persist"),
+    ("dispatcher", "shutdown"),
+    ("warm_start", "close"),
+)
 
 class DataManager:
     def __init__(self):
         self.app = QApplication.instance()
         self.setting = self.app.settings
         self.app.broker = None
+        # Name -> bereits angelegter Dienst (siehe SERVICES)
+        self._services = {}
+
+        with timeline.phase(f"Broker ({self.setting.broker.selected_broker})"):
+            self.setBroker(self.setting.broker.selected_broker)
+
+    def service(self, name):
+        """
+        :param name: Name des Dienstes aus SERVICES, z. B. "bar_store".
+        :return: Den Dienst; sein Modul wird beim ersten Zugriff importiert und der Dienst angelegt.
+        """
+        service = self._services.get(name)
+        if service is None:
+            module, class_name = SERVICES[name]
+            with timeline.phase(class_name):
+                service = self._services[name] = getattr(importlib.import_module(module), class_name)()
+        return service
 
-        self.setBroker(self.setting.broker.selected_broker)
+    def shutdown(self):
+        """
+        Schließt die angelegten Dienste beim Beenden (Journale, offene Bars, Queues, Warmstart-Schnappschuss).
+        """
+        for name, method in SHUTDOWN:
+            service = self._services.get(name)
+            if service is not None:
+                getattr(service, method)()
 
     def setBroker(self, broker: str):
         if self.app.broker and (broker == self.setting.broker.selected_broker):
             pass
         if self.app.broker:
             self.broker.disconnect()
+        # Die Broker-Module werden erst geladen, wenn der Broker gewählt wird (ib_async allein kostet ~300 ms beim Start)
         match broker:
             case "Interactive Brokers":
+                if self.setting.broker.ib.separate_process:
+                    from services.broker.ib.remote import RemoteIb as Ib
+                else:
+                    from services.broker.ib.ib import Ib
                 self.app.broker = Ib()
                 self.setting.broker.selected_broker = "Interactive Brokers"
             case "Simulator":
+                from services.broker.simulator.simulator import Simulator
                 self.app.broker = Simulator()
                 self.setting.broker.selected_broker = "Simulator"
             case _:
+                from services.broker.simulator.simulator import Simulator
                 self.app.broker = Simulator()
                 self.setting.broker.selected_broker = "Simulator"
     
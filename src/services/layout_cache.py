@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+
+class LayoutCache:
+    """
+    Hält die ausgeblendeten Fenster nicht aktiver Layouts vor, damit ein Wechsel zurück ohne Neuaufbau auskommt.
+    Begrenzt wird die Anzahl der vorgehaltenen Layouts, nicht ihr Speicherbedarf (den Qt nicht zuverlässig
+    ermitteln lässt). Darüber hinaus werden die am längsten nicht benutzten Layouts freigegeben; sie werden beim
+    nächsten Wechsel wieder aus den gespeicherten Daten aufgebaut.
+    """
+    def __init__(self, max_layouts=3):
+        """
+        :param max_layouts: Höchstzahl vorgehaltener Layouts; 0 schaltet den Cache ab.
+        """
+        self.max_layouts = max_layouts
+        # Layoutname -> Fenster, zuletzt benutzte am Ende
+        self._entries = OrderedDict()
+
+    def put(self, name, windows):
+        """
+        Legt die (bereits ausgeblendeten) Fenster eines Layouts ab.
+        """
+        self.discard(name)
+        self._entries[name] = list(windows)
+        self._evict()
+
+    def take(self, name):
+        """
+        :return: Die Fenster des Layouts oder None, falls es nicht (mehr) vorgehalten wird.
+        """
+        return self._entries.pop(name, None)
+
+    def discard(self, name):
+        windows = self.take(name)
+        for window in windows or []:
+            window.deleteLater()
+
+    def set_max_layouts(self, max_layouts):
+        self.max_layouts = max_layouts
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_layouts:
+            name = next(iter(self._entries))
+            print(f"Layout '{name}' wird aus dem Cache entfernt (höchstens {self.max_layouts} Layouts).")
+            self.discard(name)
+
+    def status(self):
+        return {
+            'layouts': {name: len(windows) for name, windows in self._entries.items()},
+            'max_layouts': self.max_layouts,
+        }
@@ -3,7 +3,9 @@ import time
 from collections import deque 
 from PySide6.QtWidgets import QApplication
 
-class LoggerSettings:
+from services.persistence import TrackedSettings
+
+class LoggerSettings(TrackedSettings):
     def __init__(self):
         self.logcount = 1000
         self.persist_to_file = False
@@ -0,0 +1,227 @@
+import itertools
+import math
+import time
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
+
+from database.datastore import live_series
+from services.broker.contracts import normalize_contract
+from services.broker.historical import BAR_COLUMNS, format_bar_size
+from services.market_data.dispatch import DispatchPolicy
+from services.market_data.ticks import QUOTE, TRADE
+
+
+class BarBuilder:
+    """
+    Baut aus einem Tick-Strom OHLCV-Bars für ein festes Intervall.
+    Eine Bar bleibt bis late_tolerance Sekunden nach ihrem Ende offen, sodass verspätete oder
+    vertauschte Ticks noch eingerechnet werden. Ältere Ticks werden verworfen und gezählt.
+    Pro Tick ist der Aufwand konstant, da immer nur wenige Bars gleichzeitig offen sind.
+    """
+    def __init__(self, interval, late_tolerance=2.0):
+        self.interval = interval
+        self.late_tolerance = late_tolerance
+        # Bucket-Beginn -> [erster_ts, letzter_ts, open, high, low, close, volume, count]
+        self.open_bars = {}
+        self.closed_until = -math.inf
+        self.late_ticks = 0
+
+    def add(self, ts, price, size=0.0):
+        """
+        Rechnet einen Tick ein.
+        :return: Liste der dadurch abgeschlossenen Bars (meist leer).
+        """
+        start = int(ts // self.interval * self.interval)
+        if start < self.closed_until:
+            self.late_ticks += 1
+            return []
+        bar = self.open_bars.get(start)
+        if bar is None:
+            self.open_bars[start] = [ts, ts, price, price, price, price, size, 1]
+        else:
+            if ts < bar[0]:
+                bar[0] = ts
+                bar[2] = price
+            if ts >= bar[1]:
+                bar[1] = ts
+                bar[5] = price
+            if price > bar[3]:
+                bar[3] = price
+            if price < bar[4]:
+                bar[4] = price
+            bar[6] += size
+            bar[7] += 1
+        return self.advance(ts)
+
+    def advance(self, now):
+        """
+        Schließt alle Bars, deren Ende mehr als late_tolerance Sekunden vor now liegt.
+        Wird auch ohne neue Ticks regelmäßig aufgerufen, damit ruhige Instrumente ihre Bars erhalten.
+        :return: Liste der abgeschlossenen Bars als Dictionaries.
+        """
+        limit = now - self.late_tolerance - self.interval
+        if not self.open_bars or min(self.open_bars) > limit:
+            return []
+        finished = []
+        for start in sorted(self.open_bars):
+            if start > limit:
+                break
+            _, _, open, high, low, close, volume, count = self.open_bars.pop(start)
+            finished.append({
+                "time": start, "open": open, "high": high, "low": low, "close": close,
+                "volume": volume, "average": math.nan, "bar_count": count,
+            })
+            self.closed_until = start + self.interval
+        return finished
+
+
+def extract_ticks(data, what_to_show):
+    """
+    Liefert die (Zeit, Preis, Größe)-Tupel eines Marktdaten-Updates (siehe services.market_data.ticks.tick).
+    MIDPOINT wird aus den QUOTE-Updates berechnet, alle übrigen Datentypen aus den TRADE-Updates.
+    """
+    if what_to_show == "MIDPOINT":
+        midpoint = (data["bid"] + data["ask"]) / 2
+        if data["kind"] != QUOTE or math.isnan(midpoint):
+            return ()
+        return ((data["time"], midpoint, 0.0),)
+    if data["kind"] != TRADE or math.isnan(data["last"]):
+        return ()
+    return ((data["time"], data["last"], 0.0 if math.isnan(data["last_size"]) else data["last_size"]),)
+
+
+class BarBuilderService:
+    """
+    Gemeinsamer Dienst, der Live-Ticks lokal zu Echtzeit-Bars verdichtet.
+    Pro Instrument und Preisquelle (what_to_show) wird ein Marktdaten-Abo beim Broker gehalten; darauf laufen
+    beliebig viele BarBuilder mit unterschiedlichen Intervallen. Abgeschlossene Bars gehen an die Abonnenten und
+    werden gesammelt in eine eigene Live-Serie des Datastores geschrieben.
+    """
+    # Eigener Bereich für request_ids, damit sie nicht mit den IDs der Widgets kollidieren
+    _request_ids = itertools.count(1_000_000)
+
+    def __init__(self, late_tolerance=2.0, tick_interval=250, persist_interval=60):
+        """
+        :param late_tolerance: Sekunden, die eine Bar nach ihrem Ende für verspätete Ticks offen bleibt.
+        :param tick_interval: Millisekunden zwischen zwei Prüfungen auf abzuschließende Bars.
+        :param persist_interval: Sekunden zwischen zwei Schreibvorgängen in den Datastore.
+        """
+        self.app = QApplication.instance()
+        self.late_tolerance = late_tolerance
+        self.persist_interval = persist_interval
+        # (normalisierter Contract, what_to_show) -> {'instrument', 'request_id', 'what_to_show', 'builders': {interval: {...}}}
+        self.feeds = {}
+        # ((normalisierter Contract, what_to_show), interval) -> {'instrument', 'what_to_show', 'bars', 'store'} für den Datastore
+        self._pending = {}
+        self._last_persist = time.monotonic()
+
+        self.timer = QTimer()
+        self.timer.setInterval(tick_interval)
+        self.timer.timeout.connect(self._on_timer)
+
+    async def subscribe(self, instrument, interval, callback, what_to_show="TRADES"):
+        """
+        Abonniert Echtzeit-Bars für ein Instrument.
+        :param interval: Barlänge in Sekunden (z. B. 5 oder 60).
+        :param callback: Wird mit jeder abgeschlossenen Bar (Dictionary) aufgerufen.
+        :param what_to_show: Preisquelle der Bars; jede Preisquelle eines Instruments hat eigene BarBuilder.
+        """
+        key = (normalize_contract(instrument), what_to_show)
+        feed = self.feeds.get(key)
+        if feed is None:
+            feed = self.feeds[key] = {
+                'instrument': instrument,
+                'request_id': next(self._request_ids),
+                'what_to_show': what_to_show,
+                'builders': {},
+            }
+            # Jeder Tick wird benötigt, daher ohne Verdichtung; nur bei anhaltender Überlast verwirft
+            # der Kanal die ältesten Ticks (in den Kennzahlen des Dispatchers als "dropped" sichtbar)
+            await self.app.broker.subscribe_market_data(
+                instrument, lambda data: self._on_market_data(key, data), feed['request_id'],
+                conflate=False, policy=DispatchPolicy.DROP_OLDEST
+            )
+        entry = feed['builders'].get(interval)
+        if entry is None:
+            entry = feed['builders'][interval] = {
+                'builder': BarBuilder(interval, self.late_tolerance),
+                'subscribers': [],
+            }
+        entry['subscribers'].append(callback)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    async def unsubscribe(self, instrument, interval, callback, what_to_show="TRADES"):
+        """
+        Beendet ein Bar-Abo. Das Marktdaten-Abo wird gekündigt, sobald die Preisquelle des Instruments
+        keine Abonnenten mehr hat.
+        """
+        key = (normalize_contract(instrument), what_to_show)
+        feed = self.feeds.get(key)
+        if feed is None or interval not in feed['builders']:
+            return
+        entry = feed['builders'][interval]
+        if callback in entry['subscribers']:
+            entry['subscribers'].remove(callback)
+        if not entry['subscribers']:
+            self._emit(key, interval, entry, entry['builder'].advance(math.inf), feed)
+            del feed['builders'][interval]
+        if not feed['builders']:
+            del self.feeds[key]
+            await self.app.broker.unsubscribe_market_data(feed['request_id'])
+        if not self.feeds:
+            self.timer.stop()
+            self.persist()
+
+    def _on_market_data(self, key, data):
+        feed = self.feeds.get(key)
+        if feed is None:
+            return
+        for ts, price, size in extract_ticks(data, feed['what_to_show']):
+            for interval, entry in feed['builders'].items():
+                finished = entry['builder'].add(ts, price, size)
+                if finished:
+                    self._emit(key, interval, entry, finished, feed)
+
+    def _on_timer(self):
+        now = time.time()
+        for key, feed in self.feeds.items():
+            for interval, entry in feed['builders'].items():
+                finished = entry['builder'].advance(now)
+                if finished:
+                    self._emit(key, interval, entry, finished, feed)
+        if time.monotonic() - self._last_persist >= self.persist_interval:
+            self.persist()
+
+    def _emit(self, key, interval, entry, bars, feed):
+        pending = self._pending.get((key, interval))
+        if pending is None:
+            pending = self._pending[(key, interval)] = {
+                'instrument': feed['instrument'], 'what_to_show': feed['what_to_show'], 'bars': [],
+                # Datastore des liefernden Brokers, damit simulierte Bars nicht zu den echten gelangen
+                'store': self.app.broker.bar_store,
+            }
+        pending['bars'].extend(bars)
+        for bar in bars:
+            for subscriber in entry['subscribers']:
+                try:
+                    subscriber(bar)
+                except Exception as e:
+                    print(f"Error in bar subscriber: {e}")
+
+    def persist(self):
+        """
+        Schreibt alle gesammelten Bars in eine eigene Live-Serie des Datastores (siehe live_series).
+        Live-Bars markieren keinen Zeitraum als vollständig, da einzelne Ticks fehlen können.
+        """
+        self._last_persist = time.monotonic()
+        pending, self._pending = self._pending, {}
+        for (key, interval), entry in pending.items():
+            columns = {name: [bar[name] for bar in entry['bars']] for name in BAR_COLUMNS}
+            try:
+                entry['store'].write_bars(
+                    entry['instrument'], format_bar_size(interval), columns, what_to_show=live_series(entry['what_to_show'])
+                )
+            except Exception as e:
+                print(f"Error persisting live bars: {e}")
@@ -0,0 +1,76 @@
+from collections import defaultdict
+
+from PySide6.QtCore import QTimer
+
+
+class TickConflator:
+    """
+    Verdichtet Marktdaten-Updates zwischen Broker-Callbacks und Qt-Widgets.
+    Pro Instrument wird nur der letzte Stand (feldweise zusammengeführt, ohne fehlende Werte) gehalten und
+    höchstens einmal pro Frame an die Observer ausgeliefert. Der letzte Wert geht nie verloren,
+    übersprungene Zwischenstände werden pro Instrument gezählt.
+    """
+    def __init__(self, frame_rate=60):
+        """
+        :param frame_rate: Maximale Anzahl an Auslieferungen pro Sekunde.
+        """
+        # key -> [letzter Stand, Observer-Liste]
+        self._pending = {}
+        self.updates = defaultdict(int)  # Empfangene Updates je Instrument
+        self.dropped = defaultdict(int)  # Davon durch Verdichtung übersprungene Updates
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.set_frame_rate(frame_rate)
+
+    def set_frame_rate(self, frame_rate):
+        self.frame_rate = frame_rate
+        self.timer.setInterval(max(int(1000 / frame_rate), 1))
+
+    def publish(self, key, data, observers):
+        """
+        Nimmt ein Update entgegen. Die Auslieferung erfolgt gesammelt beim nächsten Frame.
+        :param key: Schlüssel des Instruments.
+        :param data: Marktdaten-Update (Dictionary, siehe services.market_data.ticks.tick).
+        :param observers: Liste der Observer; wird erst beim Ausliefern gelesen, sodass Abmeldungen berücksichtigt werden.
+        """
+        self.updates[key] += 1
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [dict(data), observers]
+            if not self.timer.isActive():
+                # Timer läuft nur, solange etwas auszuliefern ist
+                self.timer.start()
+            return
+        self.dropped[key] += 1
+        # NaN (z. B. last/last_size in Quote-Updates, bid/ask in Trade-Updates) überschreibt keinen bekannten Wert
+        pending[0].update({name: value for name, value in data.items() if value == value})
+
+    def flush(self):
+        """
+        Liefert alle gesammelten Stände an die Observer aus.
+        """
+        pending, self._pending = self._pending, {}
+        for data, observers in pending.values():
+            for observer in list(observers):
+                try:
+                    observer(data)
+                except Exception as e:
+                    print(f"Error in market data observer: {e}")
+
+    def dropped_updates(self, key=None):
+        """
+        Liefert die Anzahl übersprungener Updates für ein Instrument bzw. für alle Instrumente.
+        """
+        if key is not None:
+            return self.dropped.get(key, 0)
+        return dict(self.dropped)
+
+    def discard(self, key):
+        """
+        Verwirft ausstehende Updates und Zähler eines Instruments, z. B. nach dem Abbestellen.
+        """
+        self._pending.pop(key, None)
+        self.updates.pop(key, None)
+        self.dropped.pop(key, None)
@@ -0,0 +1,197 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+
+
+class DispatchPolicy(Enum):
+    """
+    Verhalten eines Observer-Kanals, wenn der Verbraucher nicht hinterherkommt.
+    """
+    DROP_OLDEST = "drop_oldest"  # Älteste Updates verwerfen, die Queue bleibt begrenzt
+    CONFLATE = "conflate"  # Nur das jeweils letzte Update behalten
+
+
+class ObserverChannel:
+    """
+    Eigene Queue mit eigenem Worker-Task für genau einen Observer.
+    Der Broker-Callback legt Updates nur ab und kehrt sofort zurück, sodass ein langsamer Verbraucher
+    weder die übrigen Observer noch den Socket-Reader von IB aufhält.
+    """
+    def __init__(self, dispatcher, handler, policy, maxsize, executor, on_result, name):
+        """
+        :param handler: Funktion (oder Coroutine-Funktion) mit dem Update als einzigem Argument.
+        :param policy: DispatchPolicy des Kanals.
+        :param maxsize: Maximale Queue-Länge (DROP_OLDEST).
+        :param executor: None (Event-Loop), "thread" oder "process" für rechenintensive Verbraucher.
+            Updates sind stets Dictionaries (services.market_data.ticks) und damit picklebar.
+        :param on_result: Optionale Funktion, die im Event-Loop mit dem Rückgabewert des Handlers aufgerufen wird.
+        """
+        self.dispatcher = dispatcher
+        self.handler = handler
+        self.policy = policy
+        self.maxsize = maxsize
+        self.executor = executor
+        self.on_result = on_result
+        self.name = name or getattr(handler, "__qualname__", repr(handler))
+
+        # (Zeitpunkt des Eingangs, Update)
+        self._items = deque()
+        self._wakeup = None
+        self._task = None
+        self.closed = False
+
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self.total_handler_time = 0.0
+
+    def __call__(self, data):
+        self.publish(data)
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def publish(self, data):
+        """
+        Legt ein Update ab. Kehrt immer sofort zurück.
+        Der Feed lässt sich nicht anhalten; ein überlasteter Kanal begrenzt seine Queue daher durch Verwerfen.
+        """
+        if self.closed:
+            return
+        self.received += 1
+        now = time.monotonic()
+        if self.policy is DispatchPolicy.CONFLATE:
+            if self._items:
+                self._items[-1] = (self._items[-1][0], data)
+                self.dropped += 1
+            else:
+                self._items.append((now, data))
+        else:
+            if len(self._items) >= self.maxsize:
+                if self.dropped == 0:
+                    print(f"Observer {self.name} kommt nicht hinterher, älteste Updates werden verworfen.")
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append((now, data))
+        self.max_depth = max(self.max_depth, len(self._items))
+
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while not self.closed:
+            if not self._items:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            enqueued, data = self._items.popleft()
+            started = time.monotonic()
+            try:
+                if self.executor is None:
+                    result = self.handler(data)
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                else:
+                    result = await loop.run_in_executor(self.dispatcher.pool(self.executor), self.handler, data)
+                if self.on_result is not None and result is not None:
+                    self.on_result(result)
+            except Exception as e:
+                print(f"Error in market data observer {self.name}: {e}")
+            finished = time.monotonic()
+            self.delivered += 1
+            self.total_handler_time += finished - started
+            self.last_latency = finished - enqueued
+            self.total_latency += self.last_latency
+            self.max_latency = max(self.max_latency, self.last_latency)
+            if self.executor is None:
+                # Event-Loop zwischen zwei Updates freigeben, damit andere Kanäle und der Feed zum Zug kommen
+                await asyncio.sleep(0)
+
+    def close(self):
+        self.closed = True
+        self._items.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def metrics(self):
+        """
+        :return: Dictionary mit Queue-Tiefe, Verlusten und Latenzen (Sekunden) des Kanals.
+        """
+        delivered = max(self.delivered, 1)
+        return {
+            'name': self.name,
+            'policy': self.policy.value,
+            'executor': self.executor,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'received': self.received,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'last_latency': self.last_latency,
+            'avg_latency': self.total_latency / delivered,
+            'max_latency': self.max_latency,
+            'avg_handler_time': self.total_handler_time / delivered,
+        }
+
+
+class ObserverDispatcher:
+    """
+    Verwaltet die Observer-Kanäle und die gemeinsamen Thread- bzw. Prozess-Pools für rechenintensive Verbraucher.
+    """
+    def __init__(self, thread_workers=4, process_workers=2):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.channels = []
+        self._pools = {}
+
+    def channel(self, handler, policy=DispatchPolicy.DROP_OLDEST, maxsize=1000, executor=None, on_result=None, name=None):
+        """
+        Erstellt einen isolierten Kanal für einen Observer. Der Kanal ist selbst aufrufbar und kann
+        direkt als Callback registriert werden.
+        :param executor: None, "thread" oder "process". Bei "process" muss der Handler picklebar sein.
+        """
+        if executor not in (None, "thread", "process"):
+            raise ValueError(f"Unbekannter Executor: {executor}")
+        channel = ObserverChannel(self, handler, policy, maxsize, executor, on_result, name)
+        self.channels.append(channel)
+        return channel
+
+    def close(self, channel):
+        channel.close()
+        if channel in self.channels:
+            self.channels.remove(channel)
+
+    def pool(self, executor):
+        pool = self._pools.get(executor)
+        if pool is None:
+            if executor == "process":
+                pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            else:
+                pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="observer")
+            self._pools[executor] = pool
+        return pool
+
+    def metrics(self):
+        """
+        :return: Liste mit den Kennzahlen aller Kanäle, die vollsten Queues zuerst.
+        """
+        return sorted((channel.metrics() for channel in self.channels), key=lambda m: -m['depth'])
+
+    def shutdown(self):
+        for channel in self.channels:
+            channel.close()
+        self.channels.clear()
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
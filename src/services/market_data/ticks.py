@@ -0,0 +1,57 @@
+import math
+import time
+
+# IB Tick-Typen, die einen Trade (Preis + Größe) enthalten: LAST und DELAYED_LAST
+TRADE_TICK_TYPES = (4, 68)
+
+# Art eines Marktdaten-Updates
+QUOTE = "quote"  # Stand des Instruments nach einem Update
+TRADE = "trade"  # Einzelner Trade (Preis in last, Größe in last_size)
+
+
+def tick(kind, ts, bid=math.nan, ask=math.nan, last=math.nan, bid_size=math.nan, ask_size=math.nan,
+         last_size=math.nan, volume=math.nan):
+    """
+    Einheitliches Marktdaten-Update, das alle Broker (im GUI-Prozess, im Broker-Prozess, Simulator)
+    an ihre Observer liefern. Fehlende Werte sind NaN; "price" entspricht dem letzten Preis.
+    :param kind: QUOTE oder TRADE.
+    :param ts: Zeitpunkt in Epoch-Sekunden.
+    """
+    return {
+        "kind": kind,
+        "time": ts,
+        "price": last,
+        "bid": bid,
+        "ask": ask,
+        "last": last,
+        "bid_size": bid_size,
+        "ask_size": ask_size,
+        "last_size": last_size,
+        "volume": volume,
+    }
+
+
+def quote_dict(ticker):
+    """
+    Momentaufnahme eines ib_async Tickers als QUOTE-Update.
+    Ein Ticker wird von ib_async laufend verändert; Observer, die ein Update später oder in einem anderen Prozess
+    verarbeiten, benötigen daher eine Kopie des Stands zum Zeitpunkt des Updates.
+    """
+    return tick(
+        QUOTE, ticker.time.timestamp() if ticker.time else time.time(), ticker.bid, ticker.ask, ticker.last,
+        ticker.bidSize, ticker.askSize, ticker.lastSize, ticker.volume
+    )
+
+
+def ticker_updates(ticker):
+    """
+    Zerlegt ein Update eines ib_async Tickers wie der Broker-Prozess: ein TRADE-Update je Trade-Tick,
+    danach der Stand des Tickers als QUOTE-Update.
+    """
+    updates = [
+        tick(TRADE, item.time.timestamp(), last=item.price, last_size=item.size)
+        for item in ticker.ticks
+        if item.tickType in TRADE_TICK_TYPES and not math.isnan(item.price)
+    ]
+    updates.append(quote_dict(ticker))
+    return updates
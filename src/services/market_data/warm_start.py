@@ -0,0 +1,205 @@
+import datetime
+import json
+import math
+import time
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+
+from PySide6.QtCore import QTimer
+
+from services.broker.contracts import normalize_contract
+from services.market_data.ticks import QUOTE, tick
+from services.persistence import FileWriter
+
+# Felder eines Kurses im Schnappschuss (Namen wie in den Marktdaten-Updates, siehe services.market_data.ticks)
+QUOTE_FIELDS = ("bid", "ask", "last", "close", "bid_size", "ask_size", "last_size", "volume")
+
+
+def is_stale(data):
+    """
+    True, wenn ein an einen Observer ausgelieferter Stand aus dem Warmstart-Schnappschuss stammt.
+    """
+    return isinstance(data, dict) and data.get("stale", False)
+
+
+def portable(value):
+    """
+    Wandelt Broker-Ergebnisse (ib_async Dataclasses und NamedTuples, Dictionaries des Simulators) in JSON-taugliche Werte um.
+    Leere Felder von Dataclasses werden ausgelassen, damit der Schnappschuss kompakt bleibt.
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        result = {}
+        for field in fields(value):
+            item = getattr(value, field.name)
+            if item not in (None, "", [], {}):
+                result[field.name] = portable(item)
+        return result
+    if isinstance(value, tuple) and hasattr(value, "_asdict"):
+        return {name: portable(item) for name, item in value._asdict().items()}
+    if isinstance(value, dict):
+        return {str(name): portable(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [portable(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class WarmStartCache:
+    """
+    Hält den zuletzt bekannten Zustand (Kurse, Portfolio, Kontowerte, Gerüste der Option Chains) und speichert ihn
+    beim Beenden und periodisch. Beim Start stehen diese Daten sofort zur Verfügung, bevor der Broker verbunden ist;
+    sie sind als veraltet ("stale") markiert und werden durch Live-Daten ersetzt, sobald diese eintreffen.
+    """
+    def __init__(self, path="data/warm_start.json", interval=60.0, max_age=7 * 24 * 3600):
+        """
+        :param path: Datei des Schnappschusses.
+        :param interval: Sekunden zwischen zwei periodischen Sicherungen (nur bei Änderungen).
+        :param max_age: Ältere Kurse werden beim Speichern verworfen.
+        """
+        self.path = Path(path)
+        self.max_age = max_age
+        # normalisierter Contract -> aktueller Stand (zusammengeführte Marktdaten-Updates) aus dieser Sitzung
+        self.quotes = {}
+        # normalisierter Contract -> Kurs-Dictionary aus dem letzten Schnappschuss
+        self.stale_quotes = {}
+        # Name ("portfolio", "account") -> {'data', 'time', 'stale'}
+        self.values = {}
+        # normalisiertes Underlying -> {'expirations', 'strikes', 'time', 'stale'}
+        self.chains = {}
+        self._dirty = False
+        self._writer = FileWriter()
+        self.load()
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.save)
+        self.timer.start(int(interval * 1000))
+
+    # --- Live-Daten festhalten ---
+    def record_quote(self, key, data):
+        """
+        Merkt sich den letzten Stand eines Instruments. Wird für jedes Update aufgerufen.
+        :param key: Normalisierter Contract.
+        :param data: Marktdaten-Update (Dictionary).
+        """
+        quote = self.quotes.get(key)
+        if quote is None:
+            quote = self.quotes[key] = {}
+        # NaN (z. B. bid/ask in Trade-Updates) überschreibt keinen bekannten Wert
+        quote.update({name: value for name, value in data.items() if value == value})
+        self._dirty = True
+
+    def record(self, name, data):
+        """
+        Merkt sich ein Ergebnis wie "portfolio" oder "account".
+        """
+        if data is None:
+            return
+        self.values[name] = {'data': portable(data), 'time': time.time(), 'stale': False}
+        self._dirty = True
+
+    def record_chain(self, underlying, expirations, strikes):
+        """
+        Merkt sich das Gerüst einer Option Chain (Expiration Dates und Strikes, ohne Contract Details).
+        :param strikes: Dictionary Expiration -> sortierte Strikes.
+        """
+        self.chains[normalize_contract(underlying)] = {
+            'expirations': list(expirations),
+            'strikes': {expiration: list(values) for expiration, values in strikes.items()},
+            'time': time.time(),
+            'stale': False,
+        }
+        self._dirty = True
+
+    # --- Abfragen ---
+    def quote(self, instrument):
+        """
+        :return: Kurs des letzten Schnappschusses als QUOTE-Update mit "stale": True, solange keine Live-Daten
+            vorliegen, sonst None.
+        """
+        key = normalize_contract(instrument)
+        if key in self.quotes or key not in self.stale_quotes:
+            return None
+        quote = self.stale_quotes[key]
+        update = {**tick(QUOTE, quote.get("time", 0)), **quote, "stale": True}
+        update["price"] = update["last"]
+        return update
+
+    def deliver(self, instrument, callback):
+        """
+        Liefert einem neuen Observer sofort den veralteten Stand aus dem Schnappschuss, falls vorhanden.
+        """
+        quote = self.quote(instrument)
+        if quote is not None:
+            try:
+                callback(quote)
+            except Exception as e:
+                print(f"Error delivering warm start quote for {instrument}: {e}")
+
+    def get(self, name):
+        """
+        :return: {'data', 'time', 'stale'} für "portfolio" bzw. "account" oder None.
+        """
+        return self.values.get(name)
+
+    def chain(self, underlying):
+        """
+        :return: {'expirations', 'strikes', 'time', 'stale'} oder None.
+        """
+        return self.chains.get(normalize_contract(underlying))
+
+    # --- Persistenz ---
+    def _quote_dict(self, data):
+        quote = {name: data[name] for name in QUOTE_FIELDS if name in data}
+        quote["time"] = data.get("time") or time.time()
+        return {name: value for name, value in quote.items() if value is not None and value == value}
+
+    def to_dict(self):
+        oldest = time.time() - self.max_age
+        quotes = {key: quote for key, quote in self.stale_quotes.items() if quote.get("time", 0) >= oldest}
+        for key, data in self.quotes.items():
+            quotes[key] = self._quote_dict(data)
+        return {
+            'saved': time.time(),
+            'quotes': [{'key': [list(pair) for pair in key], 'quote': quote} for key, quote in quotes.items()],
+            'values': {name: {'data': value['data'], 'time': value['time']} for name, value in self.values.items()},
+            'chains': [
+                {'key': [list(pair) for pair in key], 'expirations': chain['expirations'], 'strikes': chain['strikes'],
+                 'time': chain['time']}
+                for key, chain in self.chains.items()
+            ],
+        }
+
+    def save(self, force=False):
+        if not (self._dirty or force):
+            return
+        self._dirty = False
+        self._writer.write(self.path, json.dumps(portable(self.to_dict())))
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            for entry in data.get('quotes', []):
+                self.stale_quotes[tuple(tuple(pair) for pair in entry['key'])] = entry['quote']
+            for name, value in data.get('values', {}).items():
+                self.values[name] = dict(value, stale=True)
+            for entry in data.get('chains', []):
+                self.chains[tuple(tuple(pair) for pair in entry['key'])] = {
+                    'expirations': entry['expirations'], 'strikes': entry['strikes'], 'time': entry['time'], 'stale': True,
+                }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Warmstart-Schnappschuss konnte nicht geladen werden: {e}")
+
+    def close(self):
+        """
+        Speichert den Schnappschuss beim Beenden und wartet, bis er geschrieben ist.
+        """
+        self.timer.stop()
+        self.save(force=True)
+        self._writer.wait()
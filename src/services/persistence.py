@@ -0,0 +1,84 @@
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Beobachter der Einstellungsobjekte; außerhalb von __dict__, da to_dict() häufig __dict__ direkt liefert
+_listeners = weakref.WeakKeyDictionary()
+
+
+class ChangeNotifier:
+    """
+    Meldet Änderungen eines Einstellungsobjekts an einen Beobachter (z. B. Settings für das Autosave).
+    """
+    def track(self, on_change):
+        """
+        :param on_change: Funktion ohne Argumente, die bei jeder Änderung aufgerufen wird.
+        """
+        _listeners[self] = on_change
+
+    def changed(self):
+        on_change = _listeners.get(self)
+        if on_change is not None:
+            on_change()
+
+
+class TrackedSettings(ChangeNotifier):
+    """
+    Einstellungen, deren Attributzuweisungen automatisch als Änderung gemeldet werden (nur bei neuem Wert).
+    update_from_dict() schreibt direkt in __dict__ und löst daher keine Meldung aus;
+    Änderungen innerhalb von Listen oder Dictionaries müssen mit changed() gemeldet werden.
+    """
+    def __setattr__(self, name, value):
+        unchanged = name.startswith("_") or (name in self.__dict__ and self.__dict__[name] == value)
+        super().__setattr__(name, value)
+        if not unchanged:
+            self.changed()
+
+
+def atomic_write_text(path, text):
+    """
+    Schreibt eine Textdatei atomar: erst in eine temporäre Datei, dann per os.replace an den Zielort.
+    Nach einem Absturz liegt so immer entweder der alte oder der neue Stand vollständig vor.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class FileWriter:
+    """
+    Schreibt Dateien in einem Hintergrund-Thread, in der Reihenfolge der Aufträge.
+    """
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="settings-writer")
+        self._pending = []
+        # Zuletzt geschriebener Inhalt je Datei, um unveränderte Stände nicht erneut zu schreiben
+        self._written = {}
+
+    def write(self, path, text):
+        if self._written.get(str(path)) == text:
+            return
+        self._written[str(path)] = text
+        self._pending = [future for future in self._pending if not future.done()]
+        self._pending.append(self._executor.submit(self._write, path, text))
+
+    @staticmethod
+    def _write(path, text):
+        try:
+            atomic_write_text(path, text)
+        except OSError as e:
+            print(f"Fehler beim Speichern von {path}: {e}")
+
+    def wait(self):
+        """
+        Wartet, bis alle Schreibaufträge erledigt sind.
+        """
+        for future in self._pending:
+            future.result()
+        self._pending = []
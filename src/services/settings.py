@@ -1,13 +1,23 @@
 import sys
 import json
 import os
+import time
+from pathlib import Path
 
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import Signal, QObject
+from PySide6.QtCore import Signal, QObject, QTimer
 
 from services.workspace import WorkspaceSettings
 from services.logger.logger import LoggerSettings
 from services.broker.broker_settings import BrokerSettings
+from services.persistence import FileWriter, atomic_write_text
+
+# Große Abschnitte liegen in eigenen Dateien neben der Einstellungsdatei und werden kompakt geschrieben,
+# damit eine kleine Änderung nicht den ganzen Workspace neu serialisiert
+SECTION_FILES = {"workspace": "workspace.json"}
+# Autosave: Wartezeit nach der letzten Änderung und längste Verzögerung bei fortlaufenden Änderungen (ms)
+AUTOSAVE_DELAY = 2000
+AUTOSAVE_MAX_DELAY = 10000
 
 class Settings(QObject):
     def __init__(self, filename):
@@ -21,6 +31,21 @@ class Settings(QObject):
 
         self.load_from_file()
 
+        # Geänderte Abschnitte seit dem letzten Speichern
+        self.dirty = set()
+        self._writer = FileWriter()
+        self._autosave = QTimer(self)
+        self._autosave.setSingleShot(True)
+        self._autosave.timeout.connect(self.flush)
+        self._dirty_since = None
+        self.workspace.track(lambda: self.mark_dirty("workspace"))
+        self.logger.track(lambda: self.mark_dirty("logger"))
+        for section in (self.broker, self.broker.ib, self.broker.simulator):
+            section.track(lambda: self.mark_dirty("broker"))
+
+    def section_path(self, section):
+        return Path(self.settings_file).with_name(SECTION_FILES[section])
+
     def to_dict(self):
         return {
             "workspace": self.workspace.to_dict(),
@@ -29,14 +54,54 @@ class Settings(QObject):
         }
 
     def update_from_dict(self, data):
-        self.workspace.update_from_dict(data["workspace"])
-        self.logger.update_from_dict(data["logger"])
-        self.broker.update_from_dict(data["broker"])
+        if "workspace" in data:
+            self.workspace.update_from_dict(data["workspace"])
+        if "logger" in data:
+            self.logger.update_from_dict(data["logger"])
+        if "broker" in data:
+            self.broker.update_from_dict(data["broker"])
+
+    def mark_dirty(self, section):
+        """
+        Merkt einen geänderten Abschnitt vor und startet das verzögerte Speichern neu.
+        """
+        self.dirty.add(section)
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        # Bei fortlaufenden Änderungen spätestens nach AUTOSAVE_MAX_DELAY speichern
+        remaining = AUTOSAVE_MAX_DELAY - (now - self._dirty_since) * 1000
+        self._autosave.start(max(0, min(AUTOSAVE_DELAY, int(remaining))))
+
+    def flush(self):
+        """
+        Speichert die geänderten Abschnitte im Hintergrund. Serialisiert wird hier, geschrieben im Writer-Thread.
+        """
+        sections = set(self.dirty)
+        if "workspace" in sections:
+            if self.workspace.restorer is not None and self.workspace.restorer.pending:
+                # Nicht mitten in der Wiederherstellung speichern, das würde sie erzwingen
+                sections.discard("workspace")
+            else:
+                self.workspace.save_workspace()
+        self.dirty -= sections
+        self._dirty_since = None
+        if self.dirty:
+            self._autosave.start(AUTOSAVE_DELAY)
+        if "workspace" in sections:
+            self._writer.write(self.section_path("workspace"), json.dumps(self.workspace.to_dict()))
+        if sections - set(SECTION_FILES):
+            data = {key: value for key, value in self.to_dict().items() if key not in SECTION_FILES}
+            self._writer.write(self.settings_file, json.dumps(data, indent=4))
 
     def save_to_file(self):
-        """Save the settings to a JSON file."""
-        with open(self.settings_file, 'w') as f:
-            json.dump(self.to_dict(), f, indent=4)
+        """Save all settings now and wait until they are written."""
+        self._autosave.stop()
+        self.dirty.update(["workspace", "logger", "broker"])
+        # Schließt eine laufende Wiederherstellung ab, damit flush() den Workspace nicht zurückstellt
+        self.workspace.save_workspace()
+        self.flush()
+        self._writer.wait()
 
     def load_from_file(self):
         """Load settings from a JSON file."""
@@ -47,4 +112,26 @@ class Settings(QObject):
         with open(self.settings_file, 'r') as f:
             data = json.load(f)
         self.update_from_dict(data)
-        
\ No newline at end of file
+        workspace_path = self.section_path("workspace")
+        if workspace_path.exists():
+            # Die eigene Datei ist maßgeblich, auch wenn die Einstellungsdatei noch einen älteren Workspace enthält
+            try:
+                self.workspace.update_from_dict(json.loads(workspace_path.read_text(encoding='utf-8')))
+            except (OSError, ValueError) as e:
+                print(f"Workspace '{workspace_path}' konnte nicht geladen werden: {e}")
+                return
+        if "workspace" in data:
+            self._migrate_workspace(data, workspace_path)
+
+    def _migrate_workspace(self, data, workspace_path):
+        """
+        Überträgt den Workspace älterer Einstellungsdateien einmalig in die eigene Datei: erst wird workspace.json
+        geschrieben (sofern noch nicht vorhanden), dann die Einstellungsdatei ohne den Workspace.
+        """
+        try:
+            if not workspace_path.exists():
+                atomic_write_text(workspace_path, json.dumps(data["workspace"]))
+            data = {key: value for key, value in data.items() if key not in SECTION_FILES}
+            atomic_write_text(self.settings_file, json.dumps(data, indent=4))
+        except OSError as e:
+            print(f"Workspace '{workspace_path}' konnte nicht ausgelagert werden: {e}")
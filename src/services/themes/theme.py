@@ -17,9 +17,7 @@ class Theme(QObject):
 
         self.custom_font = None
         self.loadFonts()
-
-        with open("src/resources/stylesheet.qss", "r") as file:
-            self.app.setStyleSheet(file.read())
+        # Das Stylesheet (Theme und eigene Regeln) setzt der ThemeManager in einem Schritt
 
     def setMode(self, state):
         """Setzt den Zustand der Applikation"""
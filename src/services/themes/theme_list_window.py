@@ -130,9 +130,8 @@ class ThemeListWindow(QMainWindow):
             if not os.path.exists(theme["file_path"]):
                 self.logger.log("ThemeListWindow", f"Theme file for '{theme_name}' not found, attempting download", level="WARNING")
                 self.theme_manager.download_theme(theme["theme_url"], theme["file_path"])
-            theme_data = self.theme_manager.load_theme(theme["file_path"])
-            stylesheet = self.theme_manager.apply_theme(theme_data)
-            QApplication.instance().setStyleSheet(stylesheet)
+            stylesheet = self.theme_manager.theme_stylesheet(theme)
+            QApplication.instance().setStyleSheet(self.theme_manager.full_stylesheet(stylesheet))
             self.theme_manager.set_active_theme(theme_name)
             self.logger.log("ThemeListWindow", f"Theme '{theme_name}' applied successfully", level="INFO")
             self.update_active_theme_label()
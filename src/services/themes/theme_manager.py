@@ -1,17 +1,62 @@
+import hashlib
 import json
 import os
 import re
 import urllib.request
+from pathlib import Path
 
 from PySide6.QtWidgets import QApplication
 
+from services.persistence import atomic_write_text
+
+# Platzhalter der Vorlage, z. B. ${editor.background}
+PLACEHOLDER = re.compile(r'\$\{([a-zA-Z0-9_.]+)\}')
+# Erhöhen, wenn sich die Erzeugung des QSS ändert, damit alte Cache-Dateien nicht mehr passen
+QSS_CACHE_VERSION = b"1"
+
+
+class CompiledTemplate:
+    """
+    QSS-Vorlage, einmalig in feste Textsegmente und Platzhalter zerlegt.
+    Das Einsetzen der Farben ist danach ein einfaches Zusammenfügen ohne erneute Regex-Suche.
+    """
+    def __init__(self, template):
+        parts = PLACEHOLDER.split(template)
+        # Abwechselnd Text und Platzhalter: Text, Schlüssel, Text, ..., Text
+        self.segments = parts[0::2]
+        self.keys = parts[1::2]
+
+    def render(self, colors):
+        """
+        Setzt die Farben ein; unbekannte Platzhalter bleiben unverändert stehen.
+        """
+        result = [self.segments[0]]
+        for key, segment in zip(self.keys, self.segments[1:]):
+            result.append(colors.get(key, "${" + key + "}"))
+            result.append(segment)
+        return "".join(result)
+
+
 class ThemeManager:
     THEMES_FILE = "themes.json"
 
-    def __init__(self, template_path="src/resources/themes/template.qss"):
+    def __init__(self, template_path="src/resources/themes/template.qss", base_stylesheet_path="src/resources/stylesheet.qss",
+                 cache_dir="data/qss_cache", cache_size=20):
+        """
+        :param template_path: QSS-Vorlage mit Platzhaltern für die Farben eines VS Code Themes.
+        :param base_stylesheet_path: Eigene Regeln der Anwendung (MainWindow, BaseWidget), die an das Theme angehängt werden.
+        :param cache_dir: Verzeichnis für das erzeugte QSS, adressiert über Hashes von Vorlage und Theme.
+        :param cache_size: Anzahl der vorgehaltenen Cache-Dateien.
+        """
         self.logger = QApplication.instance().logger  # Logger aus der Application abrufen
 
         self.template_path = template_path
+        self.base_stylesheet_path = base_stylesheet_path
+        self.cache_dir = Path(cache_dir)
+        self.cache_size = cache_size
+        # Kompilierte Vorlage und Hash des Inhalts, aus dem sie erzeugt wurde
+        self._compiled = None
+        self._compiled_hash = None
         self.themes = []
         self.active_theme = None
         try:
@@ -32,11 +77,25 @@ class ThemeManager:
             self.logger.log("ThemeManager", f"Error loading template from {self.template_path}: {e}", level="ERROR")
             raise e
 
-    def load_theme(self, theme_path):
-        """Liest das VS Code Theme (JSON) ein."""
+    def read_theme(self, theme_path):
+        """Liest die Theme-Datei unverarbeitet ein (Grundlage des Cache-Schlüssels)."""
+        try:
+            with open(theme_path, 'rb') as file:
+                return file.read()
+        except Exception as e:
+            self.logger.log("ThemeManager", f"Error loading theme from {theme_path}: {e}", level="ERROR")
+            raise e
+
+    def load_theme(self, theme_path, content=None):
+        """
+        Liest das VS Code Theme (JSON) ein.
+        :param content: Bereits eingelesener Inhalt der Datei (optional).
+        """
         try:
-            with open(theme_path, 'r') as file:
-                theme = json.load(file)
+            if content is None:
+                with open(theme_path, 'rb') as file:
+                    content = file.read()
+            theme = json.loads(content)
             self.logger.log("ThemeManager", f"Theme loaded from {theme_path}", level="DEBUG")
             return theme
         except Exception as e:
@@ -44,17 +103,27 @@ class ThemeManager:
             raise e
 
     def apply_theme_on_css(self, template, colors):
-        def replace_color(match):
-            key = match.group(1)
-            return colors.get(key, match.group(0))
-        return re.sub(r'\$\{([a-zA-Z0-9_.]+)\}', replace_color, template)
+        return self.compiled_template(template).render(colors)
+
+    def compiled_template(self, template=None):
+        """
+        Liefert die kompilierte Vorlage; neu kompiliert wird nur, wenn sich ihr Inhalt geändert hat.
+        :param template: Bereits eingelesener Inhalt der Vorlage (optional).
+        """
+        if template is None:
+            template = self.load_template()
+        template_hash = hashlib.sha256(template.encode()).digest()
+        if template_hash != self._compiled_hash:
+            self._compiled = CompiledTemplate(template)
+            self._compiled_hash = template_hash
+            self.logger.log("ThemeManager", "Template compiled", level="DEBUG")
+        return self._compiled
 
     def apply_theme(self, theme):
         """Ersetzt die Platzhalter im Template durch die Farben aus dem Theme."""
         try:
-            template = self.load_template()
             colors = theme.get("colors", {})
-            stylesheet = self.apply_theme_on_css(template, colors)
+            stylesheet = self.compiled_template().render(colors)
             self.logger.log("ThemeManager", "Theme applied successfully", level="DEBUG")
             return stylesheet
         except Exception as e:
@@ -173,19 +242,65 @@ class ThemeManager:
                 else:
                     raise FileNotFoundError(f"Theme file '{theme['file_path']}' not found and no URL provided.")
 
-            theme_data = self.load_theme(theme["file_path"])
-            stylesheet = self.apply_theme(theme_data)
+            stylesheet = self.theme_stylesheet(theme)
             self.logger.log("ThemeManager", f"Active theme '{self.active_theme}' loaded successfully", level="INFO")
             return stylesheet
         except Exception as e:
             self.logger.log("ThemeManager", f"Error loading active theme: {e}", level="ERROR")
             raise e
 
+    def theme_stylesheet(self, theme):
+        """
+        Liefert das QSS eines Themes aus dem Cache. Der Schlüssel ist ein Hash über Vorlage und Theme-Datei;
+        solange sich beide nicht ändern, wird weder das Theme-JSON geparst noch die Vorlage kompiliert.
+        :param theme: Eintrag aus themes.json.
+        """
+        template = self.load_template()
+        theme_content = self.read_theme(theme["file_path"])
+        key = hashlib.sha256(QSS_CACHE_VERSION + b"\0" + template.encode() + b"\0" + theme_content).hexdigest()
+        cache_file = self.cache_dir / f"{key}.qss"
+        try:
+            stylesheet = cache_file.read_text(encoding='utf-8')
+            self.logger.log("ThemeManager", f"Stylesheet for '{theme['name']}' loaded from cache", level="DEBUG")
+            return stylesheet
+        except OSError:
+            pass
+
+        colors = self.load_theme(theme["file_path"], theme_content).get("colors", {})
+        stylesheet = self.apply_theme_on_css(template, colors)
+        try:
+            atomic_write_text(cache_file, stylesheet)
+            self._prune_cache()
+        except OSError as e:
+            self.logger.log("ThemeManager", f"Error writing stylesheet cache {cache_file}: {e}", level="WARNING")
+        return stylesheet
+
+    def _prune_cache(self):
+        files = sorted(self.cache_dir.glob("*.qss"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in files[self.cache_size:]:
+            path.unlink(missing_ok=True)
+
+    def full_stylesheet(self, theme_stylesheet=""):
+        """
+        Fügt das QSS des Themes und die eigenen Regeln der Anwendung zu einem Stylesheet zusammen.
+        Die eigenen Regeln stehen am Ende und haben damit Vorrang.
+        """
+        try:
+            with open(self.base_stylesheet_path, 'r', encoding='utf-8') as file:
+                base = file.read()
+        except OSError as e:
+            self.logger.log("ThemeManager", f"Error loading {self.base_stylesheet_path}: {e}", level="ERROR")
+            base = ""
+        return theme_stylesheet + "\n" + base
+
     def setStylesheet(self):
+        """
+        Setzt genau ein Stylesheet: das aktive Theme samt den eigenen Regeln, ohne Theme nur die eigenen Regeln.
+        """
         try:
             stylesheet = self.load_active_theme()
-            QApplication.instance().setStyleSheet(stylesheet)
-            self.logger.log("ThemeManager", "Stylesheet set successfully", level="INFO")
         except Exception as e:
-            self.logger.log("ThemeManager", f"Failed to set stylesheet: {e}", level="ERROR")
-            pass
\ No newline at end of file
+            self.logger.log("ThemeManager", f"Failed to load theme, using base stylesheet only: {e}", level="ERROR")
+            stylesheet = ""
+        QApplication.instance().setStyleSheet(self.full_stylesheet(stylesheet))
+        self.logger.log("ThemeManager", "Stylesheet set successfully", level="INFO")
\ No newline at end of file
@@ -1,23 +1,47 @@
 import sys
+import copy
 import json
+import time
 import uuid
 
 from PySide6.QtCore import Signal
 from PySide6.QtWidgets import QApplication
 
 from windows.main_window import MainWindow
-from widgets.base_widget import BaseWidget
-from widgets.custom_label_widget import CustomLabelWidget
-from widgets.custom_button_widget import CustomButtonWidget
-from widgets.custom_data_widget import CustomDataWidget
+from widgets.registry import registry
+from services.layout_cache import LayoutCache
+from services.persistence import ChangeNotifier
+from services.workspace_restore import WorkspaceRestorer
 
-class WorkspaceSettings:
+DEFAULT_LAYOUT = "Standard"
+
+class WorkspaceSettings(ChangeNotifier):
     workspace_settings_updated = Signal(dict)
     def __init__(self):
-        self.workspace = {}
+        # Benannte Layouts: Name -> Fensterdaten wie bisher der einzelne Workspace
+        self.layouts = {DEFAULT_LAYOUT: {}}
+        self.active_layout = DEFAULT_LAYOUT
+        # Fenster des aktiven Layouts
         self.windows = []
+        # Laufende Wiederherstellung (Widgets werden im Leerlauf nachgebaut)
+        self.restorer = None
+        # Ausgeblendete Fenster bereits besuchter Layouts
+        self.layout_cache_size = 3
+        self.layout_cache = LayoutCache(self.layout_cache_size)
+
+    @property
+    def workspace(self):
+        # Fensterdaten des aktiven Layouts
+        return self.layouts.setdefault(self.active_layout, {})
+
+    @workspace.setter
+    def workspace(self, data):
+        self.layouts[self.active_layout] = data
 
     def save_workspace(self):
+        if self.restorer is not None and self.restorer.pending:
+            # Noch nicht aufgebaute Widgets würden sonst beim Speichern fehlen
+            self.restorer.finish()
         workspace_data = {}
         for window in self.windows:
             workspace_data[window.objectName] = {
@@ -31,6 +55,7 @@ class WorkspaceSettings:
                 },
                 "name": window.windowTitle(),
                 "is_fullscreen": window.isFullScreen(),
+                "is_active": window.isActiveWindow(),
                 "widgets": self.save_widgets(window),
             }
         self.workspace = workspace_data
@@ -55,25 +80,36 @@ class WorkspaceSettings:
 
     def load_workspace(self):
         if self.workspace:  # Prüfe, ob Fensterdaten vorhanden sind
-            for window_data in self.workspace:
-                self.restore_window(self.workspace[window_data])
+            # Das zuletzt fokussierte Fenster zuerst (ohne Angabe das erste), danach in gespeicherter Reihenfolge
+            windows_data = sorted(self.workspace.values(), key=lambda window_data: not window_data.get("is_active", False))
+            self.restorer = WorkspaceRestorer(self.build_widget)
+            windows = [self.restore_window(window_data) for window_data in windows_data]
+            for rank, (window, window_data) in enumerate(zip(windows, windows_data)):
+                self.restorer.add_window(window, window_data, rank)
+            focused = windows[0]
+            focused.raise_()
+            focused.activateWindow()
+            self.restorer.start()
         else:
             print("Keine Fenster in der Layout-Datei gefunden, starte mit Standardfenster.")
             self.create_default_window()
   
     def restore_window(self, window_data):
+        """
+        Erzeugt und zeigt ein Fenster ohne seine Widgets; diese baut der WorkspaceRestorer auf.
+        """
         window = MainWindow()
         self.windows.append(window)
         window.objectName = window_data["objectname"]
         geometry = window_data["geometry"]
-        window.setGeometry(geometry["x"], geometry["y"], geometry["width"], geometry["height"])
+        window.saved_geometry = (geometry["x"], geometry["y"], geometry["width"], geometry["height"])
+        window.setGeometry(*window.saved_geometry)
         window.setWindowTitle(window_data["name"])
         if window_data["is_fullscreen"]:
             window.showFullScreen()
         else:
             window.show()
-
-        self.restore_widgets(window, window_data["widgets"])
+        return window
 
     def create_default_window(self):
         default_window = MainWindow()
@@ -81,41 +117,126 @@ class WorkspaceSettings:
         default_window.objectName = str(uuid.uuid4())
         default_window.show()
 
+    def widget_class(self, class_name):
+        # Das Widget-Modul wird erst beim ersten Bedarf importiert
+        return registry.get(class_name)
+
+    def build_widget(self, parent, widget_data):
+        """
+        Erzeugt ein einzelnes Widget ohne Kinder und zeigt es im Elternelement an.
+        :return: Das Widget oder None bei unbekannter Klasse.
+        """
+        widget_cls = self.widget_class(widget_data.get("class"))
+        if widget_cls is None:
+            return None  # Überspringe unbekannte Klassen
+
+        widget = widget_cls()  # Instanziiere das Widget
+        geometry = widget_data["geometry"]
+        widget.objectName = widget_data["objectname"]
+        widget.setGeometry(geometry["x"], geometry["y"], geometry["width"], geometry["height"])
+
+        # Sicherstellen, dass ein Dictionary übergeben wird
+        params = widget_data.get("parameters") or {}
+        widget.restore_parameters(params)
+
+        widget.setParent(parent)
+        widget.show()
+        return widget
+
     def restore_widgets(self, parent, widgets_data):
-        # Mapping von Klassennamen zu den tatsächlichen Klassen
-        widget_class_mapping = {
-            "BaseWidget": BaseWidget,
-            "CustomLabelWidget": CustomLabelWidget,
-            "CustomButtonWidget": CustomButtonWidget,
-            "CustomDataWidget": CustomDataWidget,
-            # weitere Widget-Klassen hier hinzufügen
-        }
-        
+        """
+        Baut Widgets samt Kindern sofort auf (ohne Priorisierung).
+        """
         for item in widgets_data:
-            widget_data = widgets_data[item]
-            class_name = widget_data.get("class")
-            widget_cls = widget_class_mapping.get(class_name)
-            if widget_cls is None:
-                continue  # Überspringe unbekannte Klassen
-            
-            widget = widget_cls()  # Instanziiere das Widget
-            geometry = widget_data["geometry"]
-            widget.objectName = widget_data["objectname"]
-            widget.setGeometry(geometry["x"], geometry["y"], geometry["width"], geometry["height"])
-
-            # Sicherstellen, dass ein Dictionary übergeben wird
-            params = widget_data.get("parameters") or {}
-            widget.restore_parameters(params)
-
-            widget.setParent(parent)
-            widget.show()
-            self.restore_widgets(widget, widget_data["children"])
+            widget = self.build_widget(parent, widgets_data[item])
+            if widget is not None:
+                self.restore_widgets(widget, widgets_data[item]["children"])
+
+    def instruments(self):
+        """
+        Liefert alle Instrumente, die Widgets in den gespeicherten Layouts verwenden.
+        Widgets legen Instrumente als Dictionary mit Contract-Feldern unter den Parametern
+        "instrument" bzw. als Liste unter "instruments" ab.
+        """
+        instruments = []
+
+        def collect(widgets_data):
+            for widget_data in widgets_data.values():
+                params = widget_data.get("parameters") or {}
+                if params.get("instrument"):
+                    instruments.append(params["instrument"])
+                instruments.extend(params.get("instruments") or [])
+                collect(widget_data.get("children") or {})
+
+        for workspace in self.layouts.values():
+            for window_data in workspace.values():
+                collect(window_data.get("widgets") or {})
+        return instruments
+
+    def switch_layout(self, name):
+        """
+        Wechselt zum Layout name. Die Fenster des bisherigen Layouts werden ausgeblendet und vorgehalten;
+        bereits besuchte Layouts werden aus dem Cache eingeblendet statt neu aufgebaut.
+        """
+        if name == self.active_layout or name not in self.layouts:
+            return
+        started = time.perf_counter()
+        # Stand des bisherigen Layouts festhalten, solange seine Fenster noch existieren
+        self.save_workspace()
+        previous_name, previous_windows = self.active_layout, self.windows
+        self.active_layout = name
+        self.windows = self.layout_cache.take(name) or []
+        cached = bool(self.windows)
+        if cached:
+            for window in self.windows:
+                window.show()
+            self.windows[0].raise_()
+            self.windows[0].activateWindow()
+        else:
+            self.load_workspace()
+        for window in previous_windows:
+            window.hide()
+        self.layout_cache.put(previous_name, previous_windows)
+        self.changed()
+        source = "aus dem Cache" if cached else "neu aufgebaut"
+        print(f"Layout '{name}' in {(time.perf_counter() - started) * 1000:.1f} ms geladen ({source}).")
+
+    def create_layout(self, name):
+        """
+        Legt ein neues Layout als Kopie des aktiven an und wechselt dorthin.
+        """
+        if not name or name in self.layouts:
+            return False
+        self.save_workspace()
+        self.layouts[name] = copy.deepcopy(self.workspace)
+        self.switch_layout(name)
+        return True
+
+    def delete_layout(self, name):
+        """
+        Löscht ein Layout; das aktive wird vorher gegen ein anderes getauscht. Das letzte Layout bleibt erhalten.
+        """
+        if name not in self.layouts or len(self.layouts) == 1:
+            return False
+        if name == self.active_layout:
+            self.switch_layout(next(other for other in self.layouts if other != name))
+        self.layout_cache.discard(name)
+        del self.layouts[name]
+        self.changed()
+        return True
 
     def to_dict(self):
-        return self.workspace
-        # return {
-        #     "layout": self.layout
-        # }
+        return {
+            "active_layout": self.active_layout,
+            "layouts": self.layouts,
+            "layout_cache_size": self.layout_cache_size,
+        }
 
     def update_from_dict(self, data):
-        self.workspace = data
+        if "layouts" not in data:
+            # Älteres Format: genau ein Workspace mit den Fenstern auf oberster Ebene
+            data = {"active_layout": DEFAULT_LAYOUT, "layouts": {DEFAULT_LAYOUT: data}}
+        self.layouts = data["layouts"] or {DEFAULT_LAYOUT: {}}
+        self.active_layout = data.get("active_layout") if data.get("active_layout") in self.layouts else next(iter(self.layouts))
+        self.layout_cache_size = data.get("layout_cache_size", self.layout_cache_size)
+        self.layout_cache.set_max_layouts(self.layout_cache_size)
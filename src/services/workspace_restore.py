@@ -0,0 +1,149 @@
+import heapq
+import itertools
+import time
+from bisect import insort
+from collections import defaultdict
+
+from PySide6.QtCore import QRect, QTimer
+
+from core.startup import timeline
+
+# Zeitbudget einer Scheibe im Leerlauf des Event-Loops (Sekunden), damit die Oberfläche bedienbar bleibt
+SLICE_BUDGET = 0.008
+
+
+def geometry_rect(geometry):
+    return QRect(geometry["x"], geometry["y"], geometry["width"], geometry["height"])
+
+
+class WorkspaceRestorer:
+    """
+    Baut die Widgets eines Workspaces in der Reihenfolge ihrer Sichtbarkeit auf.
+    Die sichtbaren Widgets des fokussierten Fensters entstehen sofort, alle übrigen (weitere Fenster,
+    Widgets außerhalb des sichtbaren Bereichs ihres Elternelements) in kurzen Scheiben, wenn der Event-Loop
+    frei ist. Die Stapelreihenfolge unter Geschwistern entspricht trotzdem der gespeicherten.
+    """
+    def __init__(self, build_widget, slice_budget=SLICE_BUDGET):
+        """
+        :param build_widget: Funktion (parent, widget_data), die ein Widget erzeugt und anzeigt (oder None liefert).
+        :param slice_budget: Sekunden, die eine Scheibe höchstens mit dem Aufbau von Widgets verbringt.
+        """
+        self.build_widget = build_widget
+        self.slice_budget = slice_budget
+        # (Fensterrang, verdeckt, Reihenfolge, Index unter den Geschwistern, Elternelement, widget_data)
+        self._queue = []
+        self._order = itertools.count()
+        # Elternelement -> sortierte Liste (Index, Reihenfolge, Widget) der bereits erzeugten Kinder
+        self._built = defaultdict(list)
+        self._scheduled = False
+        # Je erzeugtem Widget: Klasse, objectName, Fensterrang, Sekunden für Konstruktion und Parameter
+        self.costs = []
+        self.started = None
+        self.interactive_after = None
+        self.completed_after = None
+
+    @property
+    def pending(self):
+        return len(self._queue)
+
+    def add_window(self, window, window_data, rank):
+        """
+        Stellt die Widgets eines Fensters in die Warteschlange.
+        :param rank: Priorität des Fensters, 0 für das fokussierte Fenster.
+        """
+        geometry = window_data["geometry"]
+        self._enqueue(window, window_data.get("widgets") or {}, QRect(0, 0, geometry["width"], geometry["height"]), rank, False)
+
+    def _enqueue(self, parent, widgets_data, visible_area, rank, hidden):
+        for index, widget_data in enumerate(widgets_data.values()):
+            covered = hidden or not visible_area.intersects(geometry_rect(widget_data["geometry"]))
+            heapq.heappush(self._queue, (rank, covered, next(self._order), index, parent, widget_data))
+
+    def start(self):
+        """
+        Baut die sichtbaren Widgets des fokussierten Fensters sofort auf und den Rest im Leerlauf.
+        """
+        self.started = time.perf_counter()
+        while self._queue and self._queue[0][:2] == (0, False):
+            self._build_next()
+        self.interactive_after = time.perf_counter() - self.started
+        self._schedule()
+
+    def finish(self):
+        """
+        Baut alle noch ausstehenden Widgets sofort auf, z. B. bevor der Workspace gespeichert wird.
+        """
+        while self._queue:
+            self._build_next()
+        self._complete()
+
+    def _schedule(self):
+        if self._queue and not self._scheduled:
+            self._scheduled = True
+            QTimer.singleShot(0, self._slice)
+        elif not self._queue:
+            self._complete()
+
+    def _slice(self):
+        self._scheduled = False
+        deadline = time.perf_counter() + self.slice_budget
+        while self._queue and time.perf_counter() < deadline:
+            self._build_next()
+        self._schedule()
+
+    def _build_next(self):
+        rank, hidden, order, index, parent, widget_data = heapq.heappop(self._queue)
+        started = time.perf_counter()
+        try:
+            widget = self.build_widget(parent, widget_data)
+        except RuntimeError as e:
+            # Elternelement wurde zwischenzeitlich geschlossen
+            print(f"Widget {widget_data.get('objectname')} konnte nicht wiederhergestellt werden: {e}")
+            return
+        if widget is None:
+            return
+        self.costs.append({
+            'class': widget_data.get("class"),
+            'objectname': widget_data.get("objectname"),
+            'rank': rank,
+            'seconds': time.perf_counter() - started,
+        })
+        self._restack(parent, index, order, widget)
+        self._enqueue(widget, widget_data.get("children") or {}, widget.rect(), rank, hidden)
+
+    def _restack(self, parent, index, order, widget):
+        siblings = self._built[parent]
+        insort(siblings, (index, order, widget), key=lambda entry: entry[:2])
+        position = next(i for i, entry in enumerate(siblings) if entry[2] is widget)
+        if position + 1 < len(siblings):
+            # Ein später gespeichertes Geschwister existiert schon: unter dieses schieben
+            widget.stackUnder(siblings[position + 1][2])
+
+    def _complete(self):
+        if self.completed_after is not None or self.started is None:
+            return
+        self.completed_after = time.perf_counter() - self.started
+        self._built.clear()
+        timeline.mark("Workspace vollständig")
+        print(self.report())
+
+    def cost_by_class(self):
+        """
+        :return: Dictionary Klassenname -> {'count', 'seconds'}, absteigend nach Gesamtzeit.
+        """
+        totals = defaultdict(lambda: {'count': 0, 'seconds': 0.0})
+        for cost in self.costs:
+            totals[cost['class']]['count'] += 1
+            totals[cost['class']]['seconds'] += cost['seconds']
+        return dict(sorted(totals.items(), key=lambda item: item[1]['seconds'], reverse=True))
+
+    def report(self, top=5):
+        lines = [
+            f"Workspace: {len(self.costs)} Widgets, bedienbar nach {self.interactive_after * 1000:.1f} ms, "
+            f"vollständig nach {self.completed_after * 1000:.1f} ms"
+        ]
+        for name, total in self.cost_by_class().items():
+            lines.append(f"  {name:<28} {total['count']:5}x  {total['seconds'] * 1000:8.1f} ms")
+        for cost in sorted(self.costs, key=lambda cost: cost['seconds'], reverse=True)[:top]:
+            lines.append(f"  langsam: {cost['class']} ({cost['objectname']}) {cost['seconds'] * 1000:.1f} ms")
+        return "\n".join(lines)
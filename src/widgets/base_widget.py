@@ -16,6 +16,7 @@ class BaseWidget(QFrame):
 
         # Standard-Properties setzen
         self.setProperty("hover", False)
+        self.setProperty("stale", False)
 
     def enterEvent(self, event):
         """Aktualisiert die 'hover'-Property, wenn die Maus über das Widget fährt."""
@@ -61,6 +62,9 @@ class BaseWidget(QFrame):
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
+            if self.dragging or self.resizing:
+                # Geänderte Position bzw. Größe im Workspace vormerken (Autosave)
+                self.settings.workspace.changed()
             self.dragging = False
             self.resizing = False
             self.setCursor(Qt.ArrowCursor)
@@ -89,6 +93,16 @@ class BaseWidget(QFrame):
 
         return value
 
+    def set_stale(self, stale):
+        """
+        Markiert die angezeigten Daten als veraltet (Warmstart-Schnappschuss) bzw. wieder als live.
+        Widgets rufen dies z. B. mit warm_start.is_stale(data) für jedes Update auf.
+        """
+        if self.property("stale") != stale:
+            self.setProperty("stale", stale)
+            self.style().unpolish(self)
+            self.style().polish(self)
+
     def save_parameters(self):
         # Standardimplementierung: Keine Parameter
         return {}
@@ -0,0 +1,98 @@
+import importlib
+from importlib.metadata import entry_points
+
+# Gruppe der Entry Points, über die andere Pakete eigene Widgets bereitstellen:
+#   [project.entry-points."my_sweet_investment_suite.widgets"]
+#   "Chart Widget" = "mein_paket.chart:ChartWidget"
+# Der Name erscheint im Kontextmenü, der Klassenname wird im Workspace gespeichert.
+ENTRY_POINT_GROUP = "my_sweet_investment_suite.widgets"
+
+
+class WidgetRegistry:
+    """
+    Verzeichnis der Widget-Klassen mit Klassenname und Modulpfad. Ein Widget-Modul wird erst importiert,
+    wenn ein gespeichertes Layout oder das Kontextmenü die Klasse tatsächlich benötigt.
+    """
+    def __init__(self, group=ENTRY_POINT_GROUP):
+        """
+        :param group: Entry-Point-Gruppe für Widgets aus anderen Paketen.
+        """
+        self.group = group
+        # Klassenname -> {'module', 'label', 'kwargs'}
+        self._specs = {}
+        # Klassenname -> bereits importierte Klasse
+        self._classes = {}
+        self._discovered = False
+
+    def register(self, class_name, module, label=None, **kwargs):
+        """
+        Registriert eine Widget-Klasse, ohne ihr Modul zu importieren.
+        :param class_name: Name der Klasse, wie er im Workspace gespeichert wird.
+        :param module: Modulpfad, z. B. "widgets.custom_label_widget".
+        :param label: Eintrag im Menü "Widget hinzufügen"; None für Widgets ohne Menüeintrag.
+        :param kwargs: Argumente für neue Widgets aus dem Menü.
+        """
+        self._specs[class_name] = {'module': module, 'label': label, 'kwargs': kwargs}
+
+    def discover(self):
+        """
+        Registriert die Widgets aus den Entry Points installierter Pakete (einmalig, ohne Import).
+        """
+        if self._discovered:
+            return
+        self._discovered = True
+        for entry_point in entry_points(group=self.group):
+            module, _, class_name = entry_point.value.partition(":")
+            if not class_name:
+                print(f"Ungültiger Widget-Entry-Point {entry_point.name}: {entry_point.value}")
+                continue
+            # Eingebaute Widgets haben Vorrang
+            if class_name not in self._specs:
+                self.register(class_name, module.strip(), label=entry_point.name)
+
+    def get(self, class_name):
+        """
+        :return: Die Widget-Klasse (importiert beim ersten Zugriff) oder None, falls unbekannt bzw. nicht ladbar.
+        """
+        cls = self._classes.get(class_name)
+        if cls is not None:
+            return cls
+        if class_name not in self._specs:
+            self.discover()
+        spec = self._specs.get(class_name)
+        if spec is None:
+            return None
+        try:
+            cls = getattr(importlib.import_module(spec['module']), class_name)
+        except (ImportError, AttributeError) as e:
+            print(f"Widget {class_name} aus {spec['module']} konnte nicht geladen werden: {e}")
+            return None
+        self._classes[class_name] = cls
+        return cls
+
+    def create(self, class_name):
+        """
+        Erzeugt ein neues Widget mit den registrierten Argumenten (für das Kontextmenü).
+        """
+        cls = self.get(class_name)
+        if cls is None:
+            return None
+        return cls(**self._specs[class_name]['kwargs'])
+
+    def menu_entries(self):
+        """
+        :return: Liste (Menütext, Klassenname) aller Widgets mit Menüeintrag, ohne Import.
+        """
+        self.discover()
+        return [(spec['label'], name) for name, spec in self._specs.items() if spec['label']]
+
+    def is_loaded(self, class_name):
+        return class_name in self._classes
+
+
+registry = WidgetRegistry()
+registry.register("BaseWidget", "widgets.base_widget")
+registry.register("CustomTabWidget", "widgets.custom_tab_widget", label="Tab Widget", text="Tab Widget")
+registry.register("CustomLabelWidget", "widgets.custom_label_widget", label="Label Widget")
+registry.register("CustomButtonWidget", "widgets.custom_button_widget", label="Button Widget", title="Button Widget")
+registry.register("CustomDataWidget", "widgets.custom_data_widget", label="Data Widget")
@@ -6,10 +6,7 @@ from PySide6.QtGui import QCursor, QPen, QColor, QPainter, QPixmap, QFont
 from qframelesswindow import FramelessWindow
 
 from widgets.base_widget import BaseWidget
-from widgets.custom_label_widget import CustomLabelWidget
-from widgets.custom_button_widget import CustomButtonWidget
-from widgets.custom_tab_widget import CustomTabWidget
-from widgets.custom_data_widget import CustomDataWidget
+from widgets.registry import registry
 #import widgets
 from services.themes.theme_list_window import ThemeListWindow
 from services.themes.theme import AppState
@@ -28,6 +25,8 @@ class MainWindow(FramelessWindow):
         self.titleBar.minBtn.hide()
         self.titleBar.maxBtn.hide()
         self.setWindowTitle("My sweet Investment Suite")
+        # Zuletzt gemeldete bzw. wiederhergestellte Geometrie (x, y, Breite, Höhe), siehe geometry_changed()
+        self.saved_geometry = None
         self.setGeometry(100, 100, 600, 400)
         self.fullscreen = False
 
@@ -96,6 +95,24 @@ class MainWindow(FramelessWindow):
     def resizeEvent(self, event):
         """Update the grid and resize the graphics view when the window is resized."""
         super().resizeEvent(event)
+        self.geometry_changed()
+
+    def moveEvent(self, event):
+        super().moveEvent(event)
+        self.geometry_changed()
+
+    def geometry_changed(self):
+        """
+        Meldet dem Workspace eine geänderte Fenstergeometrie. Resize- und Move-Events beim Anzeigen eines
+        wiederhergestellten Fensters bringen keine neue Geometrie und lösen daher kein Speichern aus;
+        der Vollbildmodus wird von toggle_fullscreen() gemeldet.
+        """
+        rect = self.geometry()
+        geometry = (rect.x(), rect.y(), rect.width(), rect.height())
+        if self.isFullScreen() or geometry == self.saved_geometry:
+            return
+        self.saved_geometry = geometry
+        self.workspace.changed()
 
     def closeEvent(self, event):
         # Prüfe, ob das Programm bereits im Beenden-Modus ist
@@ -136,6 +153,7 @@ class MainWindow(FramelessWindow):
             self.hide()
             self.workspace.windows.remove(self)
             self.deleteLater()
+            self.workspace.changed()
         #self.close_app()
 
     def close_app(self):
@@ -160,10 +178,10 @@ class MainWindow(FramelessWindow):
         # Widgets hinzufügen, nur im Bearbeitungsmodus
         if self.app.property("appState") == "Edit":
             add_widget_menu = menu.addMenu("Widget hinzufügen")
-            add_resizable_action = add_widget_menu.addAction("Tab Widget")
-            add_label_action = add_widget_menu.addAction("Label Widget")
-            add_button_action = add_widget_menu.addAction("Button Widget")
-            add_data_action = add_widget_menu.addAction("Data Widget")
+            # Menütexte aus der Registry; die Module werden erst bei Auswahl importiert
+            add_widget_actions = {
+                add_widget_menu.addAction(label): class_name for label, class_name in registry.menu_entries()
+            }
             remove_action = menu.addAction("Widget entfernen")
             add_window_action = menu.addAction("Neues Fenster")
             rename_title_action = menu.addAction("Fenstertitel ändern")
@@ -173,21 +191,39 @@ class MainWindow(FramelessWindow):
             fullscreen_action = menu.addAction(
                 "Vollbild aktivieren" if not self.fullscreen else "Vollbild deaktivieren"
             )
-
-            # Submenu: Layout
-            layout_menu = menu.addMenu("Layout")
-            layout_dummy1_action = layout_menu.addAction("Dummy1")
-            layout_dummy2_action = layout_menu.addAction("Dummy2")
         else:
             # Submenu: Schließen
             close_menu = menu.addMenu("Schließen")
             close_window_action = close_menu.addAction("Fenster schließen")
             close_program_action = close_menu.addAction("Programm beenden")
 
+        # Submenu: Layout (Wechsel auch außerhalb des Bearbeitungsmodus)
+        layout_menu = menu.addMenu("Layout")
+        layout_actions = {}
+        for layout_name in self.workspace.layouts:
+            layout_action = layout_menu.addAction(layout_name)
+            layout_action.setCheckable(True)
+            layout_action.setChecked(layout_name == self.workspace.active_layout)
+            layout_actions[layout_action] = layout_name
+        layout_menu.addSeparator()
+        new_layout_action = layout_menu.addAction("Neues Layout...")
+        delete_layout_action = layout_menu.addAction("Layout löschen")
+        delete_layout_action.setEnabled(len(self.workspace.layouts) > 1)
+
 
         # Zeige das Kontextmenü und führe die ausgewählte Aktion aus
         action = menu.exec(QCursor.pos())
 
+        if action in layout_actions:
+            self.workspace.switch_layout(layout_actions[action])
+            return
+        if action == new_layout_action:
+            self.new_layout()
+            return
+        if action == delete_layout_action:
+            self.delete_layout()
+            return
+
         if self.app.property("appState") == "Production" and action == setEditModeAction:
             self.app.theme.setMode("Edit")
             return
@@ -198,30 +234,17 @@ class MainWindow(FramelessWindow):
 
         #if self.settings.edit_mode:
         if self.app.property("appState") == "Edit":
-            if action == add_resizable_action:
-                widget = CustomTabWidget("Tab Widget")
-                # widget.move(pos)
-                # widget.setParent(self)
-                # widget.show()
-            elif action == add_label_action:
-                widget = CustomLabelWidget("Label Widget")
-                # widget.move(pos)
-                # widget.setParent(self)
-                # widget.show()
-            elif action == add_button_action:
-                widget = CustomButtonWidget("Button Widget")
-                # widget.move(pos)
-                # widget.setParent(self)
-                # widget.show()
-            elif action == add_data_action:
-                widget = CustomDataWidget()
-
+            if action in add_widget_actions:
+                widget = registry.create(add_widget_actions[action])
+                if widget is None:
+                    return
             elif action == remove_action:
                 for child in self.children():
                     if isinstance(child, BaseWidget):
                         widget_rect = child.geometry()
                         if widget_rect.contains(mouse_pos):
                             child.deleteLater()
+                            self.workspace.changed()
                             break
                 return
             elif action == add_window_action:
@@ -237,12 +260,6 @@ class MainWindow(FramelessWindow):
             elif action == fullscreen_action:
                 self.toggle_fullscreen()
                 return
-            elif action == layout_dummy1_action:
-                print("Layout Dummy1 ausgewählt")
-                return
-            elif action == layout_dummy2_action:
-                print("Layout Dummy2 ausgewählt")
-                return
             
             # Position setzen und anzeigen
             widget.setParent(self)
@@ -250,6 +267,7 @@ class MainWindow(FramelessWindow):
            
             widget.objectName = str(uuid.uuid4())
             widget.show()
+            self.workspace.changed()
 
         #elif not self.settings.edit_mode:
         elif not self.app.property("appState") == "Edit":
@@ -266,6 +284,7 @@ class MainWindow(FramelessWindow):
         else:
             self.showNormal()
         self.fullscreen = not self.fullscreen
+        self.workspace.changed()
 
     def keyPressEvent(self, event):
         # Vollbild mit ESC beenden
@@ -277,6 +296,7 @@ class MainWindow(FramelessWindow):
         self.workspace.windows.append(new_window)
         new_window.objectName = str(uuid.uuid4())
         new_window.show()
+        self.workspace.changed()
 
     def rename_window_title(self):
         """
@@ -284,4 +304,22 @@ class MainWindow(FramelessWindow):
         """
         new_title, ok = QInputDialog.getText(self, "Fenstertitel ändern", "Neuer Titel:")
         if ok and new_title:
-            self.setWindowTitle(new_title)
\ No newline at end of file
+            self.setWindowTitle(new_title)
+            self.workspace.changed()
+
+    def new_layout(self):
+        """
+        Fragt nach einem Namen und legt ein neues Layout als Kopie des aktiven an.
+        """
+        name, ok = QInputDialog.getText(self, "Neues Layout", "Name des Layouts:")
+        if ok and name and not self.workspace.create_layout(name):
+            QMessageBox.warning(self, "Neues Layout", f"Das Layout '{name}' existiert bereits.")
+
+    def delete_layout(self):
+        """
+        Löscht nach Rückfrage das aktive Layout und wechselt zu einem anderen.
+        """
+        name = self.workspace.active_layout
+        result = QMessageBox.question(self, "Layout löschen", f"Layout '{name}' wirklich löschen?")
+        if result == QMessageBox.Yes:
+            self.workspace.delete_layout(name)